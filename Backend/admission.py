@@ -0,0 +1,262 @@
+"""
+Admission control for API traffic.
+
+Agent runs hold a worker for many seconds, while library and search requests
+finish in milliseconds. Each route class gets its own concurrency limit, all
+classes share a global limit, and requests that cannot start wait in one
+bounded queue ordered by class priority (library, then search, then chat).
+When a class's queue is full the request is answered with 429; when the
+shared queue is full, or a request waits longer than its class allows, with
+503. Both carry a Retry-After estimated from recent service times.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.responses import JSONResponse
+
+from result_cache import LatencyHistogram
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Below the 40 threads of the default threadpool, so unclassified routes (health, debug, jobs) still run
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "32"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "64"))
+MAX_RETRY_AFTER_SECONDS = 60
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    prefixes: Tuple[str, ...]
+    priority: int  # lower is admitted first
+    limit: int
+    max_queue: int
+    max_wait: float  # seconds
+
+
+def route_classes_from_env() -> List[RouteClass]:
+    def setting(name: str, key: str, default) -> float:
+        return type(default)(os.environ.get(f"ADMISSION_{name.upper()}_{key}", default))
+
+    defaults = [
+        ("library", ("/api/library",), 0, 16, 32, 2.0),
+        ("search", ("/api/search", "/api/papers", "/api/passages/search"), 1, 8, 32, 5.0),
+        ("chat", ("/api/chat",), 2, 4, 8, 30.0),
+    ]
+    return [
+        RouteClass(name, prefixes, priority, setting(name, "LIMIT", limit), setting(name, "MAX_QUEUE", max_queue),
+                   setting(name, "MAX_WAIT", max_wait))
+        for name, prefixes, priority, limit, max_queue, max_wait in defaults
+    ]
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {429: 0, 503: 0}
+        self.timeouts = 0
+        self.shed = 0
+        self.service_seconds: Optional[float] = None
+        self.wait = LatencyHistogram()
+
+    def observe_service(self, seconds: float) -> None:
+        if self.service_seconds is None:
+            self.service_seconds = seconds
+        else:
+            self.service_seconds += SERVICE_TIME_SMOOTHING * (seconds - self.service_seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_429": self.rejected[429],
+            "rejected_503": self.rejected[503],
+            "timeouts": self.timeouts,
+            "shed": self.shed,
+            "avg_service_seconds": round(self.service_seconds or 0.0, 4),
+            "wait": self.wait.as_dict(),
+        }
+
+
+class _Waiter:
+    __slots__ = ("route", "future")
+
+    def __init__(self, route: RouteClass, future: asyncio.Future):
+        self.route = route
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Per-class and global concurrency limits with one priority wait queue.
+    State is only touched from the event loop, so it needs no locks.
+    """
+
+    def __init__(self, route_classes: Optional[Sequence[RouteClass]] = None,
+                 max_concurrent: int = ADMISSION_MAX_CONCURRENT, max_queue: int = ADMISSION_MAX_QUEUE):
+        self.routes = list(route_classes_from_env() if route_classes is None else route_classes)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.active: Dict[str, int] = {route.name: 0 for route in self.routes}
+        self.waiting: Dict[str, int] = {route.name: 0 for route in self.routes}
+        self.metrics: Dict[str, RouteMetrics] = {route.name: RouteMetrics() for route in self.routes}
+        self.active_total = 0
+        self.max_queue_depth = 0
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+
+    def classify(self, path: str) -> Optional[RouteClass]:
+        for route in self.routes:
+            if any(path == prefix or path.startswith(prefix + "/") for prefix in route.prefixes):
+                return route
+        return None
+
+    def _has_room(self, route: RouteClass) -> bool:
+        return self.active[route.name] < route.limit and self.active_total < self.max_concurrent
+
+    def _start(self, route: RouteClass) -> None:
+        self.active[route.name] += 1
+        self.active_total += 1
+        self.metrics[route.name].admitted += 1
+
+    def retry_after(self, route: RouteClass) -> int:
+        """Seconds until the queue ahead of a new request has likely drained"""
+        service = self.metrics[route.name].service_seconds or 1.0
+        estimate = service * (self.waiting[route.name] + 1) / max(1, route.limit)
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(estimate)))
+
+    def _reject(self, route: RouteClass, status_code: int, detail: str) -> Rejected:
+        self.metrics[route.name].rejected[status_code] += 1
+        return Rejected(status_code, detail, self.retry_after(route))
+
+    def _remove(self, waiter: _Waiter) -> None:
+        self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+        heapq.heapify(self._queue)
+        self.waiting[waiter.route.name] -= 1
+
+    def _shed_for(self, route: RouteClass) -> bool:
+        """Make room in a full queue by rejecting the newest waiter of a lower priority class"""
+        victims = [entry for entry in self._queue if entry[0] > route.priority]
+        if not victims:
+            return False
+        victim = max(victims)[2]
+        self._remove(victim)
+        self.metrics[victim.route.name].shed += 1
+        victim.future.set_exception(self._reject(victim.route, 503, "Shed for higher priority traffic"))
+        return True
+
+    async def acquire(self, route: RouteClass) -> None:
+        """Wait for a slot in the route's class, or raise Rejected"""
+        if self._has_room(route) and not self.waiting[route.name]:
+            self._start(route)
+            return
+
+        if self.waiting[route.name] >= route.max_queue:
+            raise self._reject(route, 429, f"Too many concurrent {route.name} requests")
+        if len(self._queue) >= self.max_queue and not self._shed_for(route):
+            raise self._reject(route, 503, "Server is saturated")
+
+        waiter = _Waiter(route, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, (route.priority, next(self._sequence), waiter))
+        self.waiting[route.name] += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        metrics = self.metrics[route.name]
+        metrics.queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({waiter.future}, timeout=route.max_wait)
+        except asyncio.CancelledError:
+            # Client went away while queued; give back a slot handed over meanwhile
+            if waiter.future.done() and not waiter.future.exception():
+                self.release(route)
+            elif not waiter.future.done():
+                self._remove(waiter)
+                waiter.future.cancel()
+            raise
+        metrics.wait.observe(time.perf_counter() - started)
+
+        if not waiter.future.done():
+            self._remove(waiter)
+            waiter.future.cancel()
+            metrics.timeouts += 1
+            raise self._reject(route, 503, f"Timed out waiting for a {route.name} slot")
+        waiter.future.result()  # raises Rejected when shed
+
+    def _dispatch(self) -> None:
+        """Start queued requests, highest priority first, while their classes have room"""
+        for entry in sorted(self._queue):
+            waiter = entry[2]
+            if self.active_total >= self.max_concurrent:
+                break
+            if self._has_room(waiter.route):
+                self._remove(waiter)
+                self._start(waiter.route)
+                waiter.future.set_result(None)
+
+    def release(self, route: RouteClass, service_seconds: Optional[float] = None) -> None:
+        self.active[route.name] -= 1
+        self.active_total -= 1
+        if service_seconds is not None:
+            self.metrics[route.name].observe_service(service_seconds)
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active_total,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self.max_queue_depth,
+            "routes": {
+                route.name: {
+                    "active": self.active[route.name],
+                    "waiting": self.waiting[route.name],
+                    "limit": route.limit,
+                    **self.metrics[route.name].as_dict(),
+                }
+                for route in self.routes
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that holds a slot for the whole response, streaming included"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        route = self.controller.classify(scope["path"]) if scope["type"] == "http" else None
+        if route is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(route)
+        except Rejected as e:
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code,
+                                    headers={"Retry-After": str(e.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route, time.perf_counter() - started)
@@ -1,11 +1,14 @@
 import os
 import arxiv
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from http_responses import json_response, strong_etag, etag_matches
+import orjson
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import uuid
+import copy
 import re
 from datetime import datetime
 
@@ -38,6 +41,39 @@ def extract_arxiv_id(text: str) -> Optional[str]:
     
     return None
 
+# Shared outbound policy: connection pools, rate limits, retries and circuit breakers
+from outbound import Upstream, GuardedEmbeddings, GuardedChatFireworks, register_upstream, outbound_metrics
+
+# arXiv asks clients to make no more than one request every three seconds
+arxiv_upstream = register_upstream(Upstream("arxiv", rate=1 / 3, burst=1, max_retries=3, base_delay=3.0, max_delay=15.0, timeout=20.0))
+openai_upstream = register_upstream(Upstream("openai", rate=50, burst=20, max_retries=4, timeout=20.0, pool_size=20))
+fireworks_upstream = register_upstream(Upstream("fireworks", rate=10, burst=5, max_retries=3, timeout=60.0))
+
+arxiv_client = arxiv.Client(delay_seconds=0, num_retries=0)
+arxiv_client._session = arxiv_upstream.session
+
+def arxiv_results(search: arxiv.Search) -> list:
+    """Run an arXiv search through the shared arXiv upstream"""
+    return arxiv_upstream.call(lambda: list(arxiv_client.results(search)))
+
+# Background searches fetch in pages of this size so they can report progress between pages
+ARXIV_JOB_PAGE_SIZE = 25
+arxiv_page_client = arxiv.Client(page_size=ARXIV_JOB_PAGE_SIZE, delay_seconds=0, num_retries=0)
+arxiv_page_client._session = arxiv_upstream.session
+
+def arxiv_result_pages(search: arxiv.Search):
+    """Yield an arXiv search page by page, one request through the shared arXiv upstream per page"""
+    offset = 0
+    while offset < search.max_results:
+        page_search = copy.copy(search)
+        page_search.max_results = min(offset + ARXIV_JOB_PAGE_SIZE, search.max_results)
+        page = arxiv_upstream.call(lambda: list(arxiv_page_client.results(page_search, offset=offset)))
+        if page:
+            yield page
+        if len(page) < page_search.max_results - offset:
+            return
+        offset += len(page)
+
 # Data ingestion into MongoDB vector database
 from numpy import var
 import pandas as pd
@@ -62,7 +98,18 @@ print("Data ingestion into MongoDB completed")
 from langchain_openai import OpenAIEmbeddings
 from langchain_mongodb import MongoDBAtlasVectorSearch
 
-embedding_model = OpenAIEmbeddings(model="text-embedding-3-small", dimensions=256)
+import httpx
+
+embedding_model = GuardedEmbeddings(
+    OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        dimensions=256,
+        max_retries=0,
+        http_client=httpx.Client(limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)),
+        http_async_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)),
+    ),
+    openai_upstream,
+)
 
 # Vector Store Creation
 vector_store = MongoDBAtlasVectorSearch.from_connection_string(
@@ -73,20 +120,174 @@ vector_store = MongoDBAtlasVectorSearch.from_connection_string(
     text_key="abstract"
 )
 
-retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 5})
+# Results are over-fetched so near-duplicates removed at query time can be replaced
+from dedup import diversify, diversity_metrics, canonical_arxiv_id
+
+RESULTS_PER_QUERY = 5
+retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": RESULTS_PER_QUERY * 2})
+
+def retrieve_distinct(query: str, k: int = RESULTS_PER_QUERY) -> list:
+    """Top-k knowledge base documents with versions and near-duplicate copies removed"""
+    return diversify(
+        retriever.invoke(query), k,
+        get_id=lambda doc: doc.metadata.get("id"),
+        get_text=lambda doc: doc.page_content,
+    )
+
+# Maximal marginal relevance over over-fetched candidates and their stored embeddings
+import time
+import numpy as np
+from mmr import rerank, mmr_metrics, MMR_DEFAULT_LAMBDA, MMR_FETCH_MULTIPLIER
+
+def retrieve_results(query: str, k: int = RESULTS_PER_QUERY, mmr_lambda: Optional[float] = MMR_DEFAULT_LAMBDA) -> list:
+    """Top-k knowledge base documents, diversified with MMR unless mmr_lambda is None or 1"""
+    started = time.perf_counter()
+    if mmr_lambda is None or mmr_lambda >= 1:
+        docs = retrieve_distinct(query, k)
+        mmr_metrics.observe_retrieval("similarity", time.perf_counter() - started)
+        return docs
+
+    query_vector = embedding_model.embed_query(query)
+    hits = vector_store._similarity_search_with_score(query_vector, k=k * MMR_FETCH_MULTIPLIER, include_embeddings=True)
+    # Exact copies are dropped first so MMR spends its picks on distinct papers
+    candidates = diversify(
+        [doc for doc, _ in hits], len(hits),
+        get_id=lambda doc: doc.metadata.get("id"),
+        get_text=lambda doc: doc.page_content,
+        get_embedding=lambda doc: doc.metadata.get("embedding"),
+    )
+    candidates = [doc for doc in candidates if doc.metadata.get("embedding") is not None]
+    if not candidates:
+        return []
+    matrix = np.array([doc.metadata.pop("embedding") for doc in candidates], dtype=np.float32)
+    docs = [candidates[i] for i in rerank(query_vector, matrix, k, mmr_lambda)]
+    mmr_metrics.observe_retrieval("mmr", time.perf_counter() - started)
+    return docs
+
+# Passage-level index over the full text of papers
+from passages import PassageIndexer, PASSAGE_COLLECTION_NAME, MAX_PASSAGE_K, MAX_PASSAGE_PAPERS
+
+passage_collection = client.get_database(DB_NAME).get_collection(PASSAGE_COLLECTION_NAME)
+passage_indexer = PassageIndexer(passage_collection, embedding_model)
+
+# Latest structured search results per chat session
+from session_results import SessionResultStore, SESSION_RESULTS_COLLECTION_NAME, current_session_id
+
+session_results = SessionResultStore(client.get_database(DB_NAME).get_collection(SESSION_RESULTS_COLLECTION_NAME))
+
+# Multi-query search, against Atlas or an in-process matrix of the stored embeddings
+from vector_index import LocalVectorIndex
+from multi_query import MultiQuerySearcher, union_results, MAX_BATCH_QUERIES, MAX_BATCH_K
+
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "atlas")
+KNOWLEDGE_FIELDS = ["id", "title", "authors", "abstract", "categories", "update_date"]
+
+def build_local_index() -> LocalVectorIndex:
+    """Load the stored knowledge embeddings into an in-process index"""
+    index = LocalVectorIndex(dimensions=256)
+    projection = {field: 1 for field in KNOWLEDGE_FIELDS + ["embedding"]}
+    projection["_id"] = 0
+    for record in collection.find({"embedding": {"$exists": True}}, projection):
+        index.add(record["id"], record.pop("embedding"), record)
+    print(f"📐 Loaded {len(index)} embeddings into the local vector index")
+    return index
+
+local_index = build_local_index() if SEARCH_BACKEND == "local" else None
+multi_query_searcher = MultiQuerySearcher(embedding_model, vector_store=vector_store, local_index=local_index)
+
+def record_to_paper(record: dict) -> dict:
+    """Convert a knowledge collection record into the Paper response shape"""
+    authors = record.get("authors") or ""
+    if isinstance(authors, str):
+        authors = [author.strip() for author in authors.split(',') if author.strip()]
+    categories = record.get("categories") or ""
+    if isinstance(categories, str):
+        categories = categories.split()
+    arxiv_id = str(record.get("id", ""))
+    return {
+        "id": arxiv_id,
+        "title": record.get("title", ""),
+        "authors": authors,
+        "abstract": record.get("abstract", ""),
+        "subjects": categories,
+        "date": record.get("update_date") or "2024-01-01",
+        "arxiv_id": arxiv_id or None,
+    }
+
+# Related papers from stored embeddings, with an optional precomputed neighbour table
+from related import RelatedPapers, RELATED_COLLECTION_NAME, id_candidates
+
+related_papers = RelatedPapers(
+    collection,
+    client.get_database(DB_NAME).get_collection(RELATED_COLLECTION_NAME),
+    index_name=ATLAS_VECTOR_SEARCH_INDEX_NAME,
+)
+
+# Cache of structured arXiv paper details
+from arxiv_cache import ArxivPaperCache, ARXIV_CACHE_COLLECTION_NAME, result_to_detail, resolve_paper
+
+arxiv_cache = ArxivPaperCache(client.get_database(DB_NAME).get_collection(ARXIV_CACHE_COLLECTION_NAME))
+
+# Search results cached per knowledge index version, with an optional shared tier
+from result_cache import (
+    VersionedResultCache, IndexVersion, MongoResultTier, FileResultTier, normalize_query,
+    KNOWLEDGE_META_COLLECTION_NAME, RESULT_CACHE_COLLECTION_NAME, RESULT_CACHE_SHARED,
+)
+
+index_version = IndexVersion(client.get_database(DB_NAME).get_collection(KNOWLEDGE_META_COLLECTION_NAME))
+if RESULT_CACHE_SHARED == "mongo":
+    result_cache_tier = MongoResultTier(client.get_database(DB_NAME).get_collection(RESULT_CACHE_COLLECTION_NAME))
+elif RESULT_CACHE_SHARED == "file":
+    result_cache_tier = FileResultTier()
+else:
+    result_cache_tier = None
+result_cache = VersionedResultCache(index_version, shared=result_cache_tier)
+
+# Server-side query log, replayed after a deploy to warm the caches
+import threading
+from fastapi.responses import JSONResponse
+from query_log import (
+    QueryLog, Readiness, warm_caches, QUERY_LOG_COLLECTION_NAME, WARMUP_ON_STARTUP, WARMUP_HEADER,
+    WARMUP_TOP_QUERIES, WARMUP_TOP_PAPERS, SEARCH, KNOWLEDGE_BASE, PAPER,
+)
+
+query_log = QueryLog(client.get_database(DB_NAME).get_collection(QUERY_LOG_COLLECTION_NAME))
+readiness = Readiness()
 
 # Configure LLM using Fireworks AI
 from langchain_openai import ChatOpenAI
 from langchain_fireworks import Fireworks, ChatFireworks
 
-llm = ChatFireworks(
-    model="accounts/fireworks/models/llama4-scout-instruct-basic",
-    max_tokens=4096)
+from model_tiers import (
+    TieredChatModel, MODEL_TIERS_ENABLED, ROUTER_MODEL, ROUTER_MAX_TOKENS, SYNTHESIS_MODEL, SYNTHESIS_MAX_TOKENS,
+)
+
+llm = GuardedChatFireworks(
+    model=SYNTHESIS_MODEL,
+    max_tokens=SYNTHESIS_MAX_TOKENS,
+    max_retries=0,
+    request_timeout=fireworks_upstream.timeout,
+    upstream=fireworks_upstream)
+
+# Small, low-cap model for the tool selection steps of the agent
+router_llm = GuardedChatFireworks(
+    model=ROUTER_MODEL,
+    max_tokens=ROUTER_MAX_TOKENS,
+    temperature=0,
+    max_retries=0,
+    request_timeout=fireworks_upstream.timeout,
+    upstream=fireworks_upstream)
+
+tiered_llm = TieredChatModel(router_llm, llm) if MODEL_TIERS_ENABLED else None
 
 # Create tools for the agent
 from langchain.agents import tool
 from langchain.tools.retriever import create_retriever_tool
 from langchain_community.document_loaders import ArxivLoader
+from tool_compaction import ToolOutputCompactor, short_authors, start_request as start_tool_token_usage
+
+# Tool outputs are compacted to per-tool token budgets before they reach the agent
+tool_compactor = ToolOutputCompactor()
 
 @tool
 def knowledge_base(query: str = "") -> str:
@@ -102,22 +303,49 @@ def knowledge_base(query: str = "") -> str:
         return "No query provided. Please specify a topic to search for."
     
     try:
-        docs = retriever.invoke(query)
-        print(f"🔍 Retrieved {len(docs)} documents")
+        # Shares cached results with /api/search, so one warmup covers both
+        papers, tier = cached_search(query)
+        docs = [
+            {
+                "id": paper['arxiv_id'] or '',
+                "title": paper['title'],
+                "authors": ", ".join(paper['authors']),
+                "summary": paper['abstract'],
+            }
+            for paper in papers if paper['id'] != NO_PAPERS_FOUND['id']
+        ]
+        print(f"🔍 Retrieved {len(docs)} documents ({tier})")
+        query_log.record(KNOWLEDGE_BASE, query, [doc['id'] for doc in docs])
         
         if not docs:
             return "No relevant papers found."
-        
+
+        session_results.save(
+            current_session_id.get(), "knowledge_base", query,
+            [{"arxiv_id": doc['id'], "title": doc['title']} for doc in docs]
+        )
+        if prefetcher is not None:
+            prefetcher.schedule(current_session_id.get(), [doc['id'] for doc in docs])
+
         output = []
         for i, doc in enumerate(docs, 1):
-            paper_id = doc.metadata.get('id', 'Unknown')
+            paper_id = doc['id'] or 'Unknown'
             output.append(
-                f"{i}. Title: {doc.metadata.get('title')}\n"
-                f"   Authors: {doc.metadata.get('authors')}\n"
+                f"{i}. Title: {doc['title']}\n"
+                f"   Authors: {doc['authors']}\n"
                 f"   arXiv ID: {paper_id}\n"
-                f"   Summary: {doc.page_content[:300]}...\n"
+                f"   Summary: {doc['summary'][:300]}...\n"
             )
-        result = "\n".join(output)
+        result = tool_compactor.compact_records(
+            "knowledge_base",
+            f"{len(docs)} papers for '{query}'",
+            ["arxiv_id", "title", "authors"],
+            [{"arxiv_id": doc['id'] or 'Unknown', "title": doc['title'], "authors": short_authors(doc['authors']),
+              "summary": doc['summary']} for doc in docs],
+            "summary",
+            raw_text="\n".join(output),
+            session_id=current_session_id.get(),
+        )
         print(f"🔍 knowledge_base tool returning {len(output)} papers")
         return result
     except Exception as e:
@@ -125,7 +353,7 @@ def knowledge_base(query: str = "") -> str:
         return f"Error searching knowledge base: {str(e)}"
 
 @tool
-def get_metadata_information_from_arxiv(word: str) -> list:
+def get_metadata_information_from_arxiv(word: str) -> str:
     """
     GET METADATA FOR MULTIPLE PAPERS. Use this tool to fetch and return metadata for up to ten documents from arXiv that match a given query word.
     """
@@ -137,7 +365,7 @@ def get_metadata_information_from_arxiv(word: str) -> list:
         )
         
         results = []
-        for result in search.results():
+        for result in arxiv_results(search):
             paper_info = {
                 "title": result.title,
                 "authors": [author.name for author in result.authors],
@@ -148,10 +376,139 @@ def get_metadata_information_from_arxiv(word: str) -> list:
                 "categories": result.categories
             }
             results.append(paper_info)
-        
-        return results
+
+        if not results:
+            return f"No arXiv papers found for '{word}'."
+        session_results.save(current_session_id.get(), "get_metadata_information_from_arxiv", word, results)
+        return tool_compactor.compact_records(
+            "get_metadata_information_from_arxiv",
+            f"{len(results)} arXiv papers for '{word}', newest first",
+            ["arxiv_id", "title", "authors", "published", "categories"],
+            [{**paper, "authors": short_authors(paper["authors"])} for paper in results],
+            "summary",
+            raw_text=str(results),
+            session_id=current_session_id.get(),
+        )
     except Exception as e:
-        return [{"error": f"Failed to fetch papers: {str(e)}"}]
+        return f"Failed to fetch papers: {str(e)}"
+
+def normalize_arxiv_id(arxiv_id: str) -> str:
+    """
+    Convert the ID format to match arXiv API expectations.
+    Handles short formats from the knowledge base like "712.2262" -> "0712.02262".
+    """
+    if '.' in arxiv_id and len(arxiv_id.split('.')[0]) <= 3:
+        # This looks like a short format, try to convert it
+        parts = arxiv_id.split('.')
+        if len(parts) == 2:
+            year_part = parts[0]
+            number_part = parts[1]
+            
+            # Handle different year formats
+            if len(year_part) == 3:
+                # Format like "712" -> "0712"
+                year_part = "0" + year_part
+            elif len(year_part) == 2:
+                year_num = int(year_part)
+                if year_num >= 50:  # 50-99 -> 1950-1999
+                    year_part = "19" + year_part
+                else:  # 00-49 -> 2000-2049
+                    year_part = "20" + year_part
+            elif len(year_part) == 1:
+                year_part = "200" + year_part
+            
+            # Pad number part to 5 digits
+            number_part = number_part.zfill(5)
+            
+            converted_id = f"{year_part}.{number_part}"
+            print(f"🔄 Converting arXiv ID from {arxiv_id} to {converted_id}")
+            return converted_id
+    return arxiv_id
+
+def knowledge_paper_detail(arxiv_id: str) -> Optional[dict]:
+    """
+    Look a paper up in the knowledge collection and return it in the structured
+    paper detail shape, or None when it is not part of the knowledge base.
+    """
+    record = collection.find_one({"id": {"$in": id_candidates(arxiv_id)}}, {"_id": 0, "embedding": 0})
+    if not record:
+        return None
+
+    paper = record_to_paper(record)
+    full_id = normalize_arxiv_id(paper["id"])
+    return {
+        "arxiv_id": paper["id"],
+        "title": paper["title"],
+        "authors": paper["authors"],
+        "abstract": paper["abstract"],
+        "published_date": record.get("update_date"),
+        "categories": paper["subjects"],
+        "pdf_url": f"https://arxiv.org/pdf/{full_id}",
+        "entry_url": f"http://arxiv.org/abs/{full_id}",
+        "journal_ref": record.get("journal-ref"),
+        "doi": record.get("doi"),
+    }
+
+def fetch_arxiv_paper(arxiv_id: str, follow_up: bool = False) -> Optional[dict]:
+    """
+    Return structured details for a paper, from the arXiv cache when possible
+    and from the arXiv API otherwise. Follow-up lookups after a search are
+    reported to the prefetcher.
+    """
+    arxiv_id = arxiv_id.strip()
+    started = time.perf_counter()
+    detail = arxiv_cache.get(arxiv_id)
+    cached = detail is not None
+    if not cached:
+        detail = lookup_arxiv_paper(arxiv_id)
+    if follow_up and prefetcher is not None:
+        prefetcher.observe(arxiv_id, cached, time.perf_counter() - started)
+    return detail
+
+def lookup_arxiv_paper(arxiv_id: str) -> Optional[dict]:
+    """Fetch one paper from the arXiv API and cache it"""
+    converted_id = normalize_arxiv_id(arxiv_id)
+    search = arxiv.Search(id_list=[converted_id])
+    result = next(iter(arxiv_results(search)), None)
+
+    if not result and converted_id != arxiv_id:
+        # Try with the original ID if conversion failed
+        print(f"🔄 Trying original ID: {arxiv_id}")
+        search = arxiv.Search(id_list=[arxiv_id])
+        result = next(iter(arxiv_results(search)), None)
+
+    if not result:
+        return None
+
+    detail = result_to_detail(result)
+    arxiv_cache.put(arxiv_id, detail)
+    return detail
+
+def fetch_arxiv_papers(arxiv_ids: List[str]) -> dict:
+    """
+    Fetch several papers in one arXiv request and cache them under the requested IDs.
+    The query uses canonical IDs, since one malformed ID fails the whole batch.
+    """
+    requested: dict = {}
+    for arxiv_id in arxiv_ids:
+        requested.setdefault(canonical_arxiv_id(arxiv_id), []).append(arxiv_id)
+    search = arxiv.Search(id_list=list(requested), max_results=len(requested))
+    found = {}
+    for result in arxiv_results(search):
+        detail = result_to_detail(result)
+        for arxiv_id in requested.get(canonical_arxiv_id(detail["arxiv_id"]), []):
+            arxiv_cache.put(arxiv_id, detail)
+            found[arxiv_id] = detail
+    return found
+
+# Background detail fetches for the top results of each search
+from prefetch import Prefetcher, PREFETCH_ENABLED
+
+prefetcher = Prefetcher(
+    fetch_arxiv_papers,
+    is_cached=lambda arxiv_id: arxiv_cache.get(arxiv_id, record=False) is not None,
+    bucket=arxiv_upstream.bucket,
+) if PREFETCH_ENABLED else None
 
 @tool
 def get_information_from_arxiv(id: str) -> str:
@@ -163,83 +520,123 @@ def get_information_from_arxiv(id: str) -> str:
         # Extract arXiv ID if it's embedded in text
         arxiv_id = extract_arxiv_id(id)
         if not arxiv_id:
-            arxiv_id = id.strip()
+            # Resolve references like "paper 2" or a title against the session's latest results
+            reference = session_results.resolve(current_session_id.get(), id)
+            arxiv_id = reference["arxiv_id"] if reference else id.strip()
         
         print(f"🔍 Attempting to fetch paper with ID: {arxiv_id}")
         
-        # Convert the ID format to match arXiv API expectations
-        # Handle different formats like "712.2262" -> "0712.02262"
-        if '.' in arxiv_id and len(arxiv_id.split('.')[0]) <= 3:
-            # This looks like a short format, try to convert it
-            parts = arxiv_id.split('.')
-            if len(parts) == 2:
-                year_part = parts[0]
-                number_part = parts[1]
-                
-                # Handle different year formats
-                if len(year_part) == 3:
-                    # Format like "712" -> "0712"
-                    year_part = "0" + year_part
-                elif len(year_part) == 2:
-                    year_num = int(year_part)
-                    if year_num >= 50:  # 50-99 -> 1950-1999
-                        year_part = "19" + year_part
-                    else:  # 00-49 -> 2000-2049
-                        year_part = "20" + year_part
-                elif len(year_part) == 1:
-                    year_part = "200" + year_part
-                
-                # Pad number part to 5 digits
-                number_part = number_part.zfill(5)
-                
-                # Try the converted format
-                converted_id = f"{year_part}.{number_part}"
-                print(f"🔄 Converting arXiv ID from {arxiv_id} to {converted_id}")
-                arxiv_id = converted_id
-        
-        # Search for the paper
-        search = arxiv.Search(id_list=[arxiv_id])
-        result = next(search.results(), None)
-        
-        if not result:
-            # Try with the original ID if conversion failed
-            if arxiv_id != id.strip():
-                print(f"🔄 Trying original ID: {id.strip()}")
-                search = arxiv.Search(id_list=[id.strip()])
-                result = next(search.results(), None)
+        paper = fetch_arxiv_paper(arxiv_id, follow_up=True)
         
-        if not result:
+        if not paper:
             return f"Paper with arXiv ID {arxiv_id} not found. Please check the ID format. The ID might be in a format that arXiv doesn't recognize."
         
-        # Format the response with actual paper information
+        # The verbose rendering is no longer returned; it is only counted as the baseline for the savings report
         response = f"""
 **Paper Details:**
 
-**Title:** {result.title}
-**Authors:** {', '.join([author.name for author in result.authors])}
-**arXiv ID:** {result.entry_id.split('/')[-1]}
-**Published:** {result.published.strftime("%Y-%m-%d")}
-**Categories:** {', '.join(result.categories)}
+**Title:** {paper['title']}
+**Authors:** {', '.join(paper['authors'])}
+**arXiv ID:** {paper['arxiv_id']}
+**Published:** {paper['published_date']}
+**Categories:** {', '.join(paper['categories'])}
 
 **Abstract:**
-{result.summary}
+{paper['abstract']}
 
 **Additional Information:**
-- **PDF URL:** {result.pdf_url}
-- **Entry URL:** {result.entry_id}
-- **Journal Reference:** {result.journal_ref if result.journal_ref else 'Not available'}
-- **DOI:** {result.doi if result.doi else 'Not available'}
+- **PDF URL:** {paper['pdf_url']}
+- **Entry URL:** {paper['entry_url']}
+- **Journal Reference:** {paper['journal_ref'] if paper['journal_ref'] else 'Not available'}
+- **DOI:** {paper['doi'] if paper['doi'] else 'Not available'}
 
 **Summary:**
-This paper presents research in the field of {', '.join(result.categories)}. The work contributes to the understanding of {result.title.lower()} and provides insights into {', '.join(result.categories)}.
+This paper presents research in the field of {', '.join(paper['categories'])}. The work contributes to the understanding of {paper['title'].lower()} and provides insights into {', '.join(paper['categories'])}.
 """
-        
-        return response
-        
+
+        details = " | ".join(
+            f"{label}: {value}" for label, value in [
+                ("arXiv ID", paper['arxiv_id']),
+                ("Title", paper['title']),
+                ("Authors", ', '.join(paper['authors'])),
+                ("Published", paper['published_date']),
+                ("Categories", ' '.join(paper['categories'])),
+                ("PDF", paper['pdf_url']),
+                ("Journal", paper['journal_ref']),
+                ("DOI", paper['doi']),
+            ] if value
+        )
+        return tool_compactor.compact_text(
+            "get_information_from_arxiv",
+            f"{details}\nAbstract: {' '.join(paper['abstract'].split())}",
+            raw_text=response,
+            session_id=current_session_id.get(),
+        )
+
     except Exception as e:
         return f"Error retrieving paper information: {str(e)}"
 
-tools = [knowledge_base, get_metadata_information_from_arxiv, get_information_from_arxiv]
+def load_paper_text(arxiv_id: str) -> dict:
+    """
+    Load the full text of a paper from arXiv for passage indexing.
+    """
+    docs = arxiv_upstream.call(ArxivLoader(query=arxiv_id, load_max_docs=1).load)
+    if not docs:
+        return {"id": arxiv_id, "title": "", "text": ""}
+    return {"id": arxiv_id, "title": docs[0].metadata.get("Title", ""), "text": docs[0].page_content}
+
+@tool
+def knowledge_base_passages(query: str = "") -> str:
+    """
+    SEARCH INSIDE PAPERS. Use this tool when the user asks about the methods, experiments or results described inside papers.
+    Returns the passages from indexed full paper text that best match the query, grouped by paper.
+    """
+    print(f"🔍 knowledge_base_passages tool called with query: '{query}'")
+
+    if not query or query.strip() == "":
+        return "No query provided. Please specify what to look for inside the papers."
+
+    try:
+        papers = passage_indexer.search(query)
+        if not papers:
+            return "No relevant passages found."
+
+        output = []
+        for i, paper in enumerate(papers, 1):
+            passages = "\n".join(f"   - {passage['text'][:400]}..." for passage in paper["passages"][:3])
+            output.append(
+                f"{i}. Title: {paper['title']}\n"
+                f"   arXiv ID: {paper['paper_id']}\n"
+                f"   Passages:\n{passages}\n"
+            )
+        return tool_compactor.compact_records(
+            "knowledge_base_passages",
+            f"Best matching passages for '{query}', grouped by paper",
+            ["arxiv_id", "title"],
+            [
+                {"arxiv_id": paper['paper_id'], "title": paper['title'], "passage": passage['text']}
+                for paper in papers for passage in paper["passages"][:3]
+            ],
+            "passage",
+            raw_text="\n".join(output),
+            session_id=current_session_id.get(),
+        )
+    except Exception as e:
+        print(f"❌ Error in knowledge_base_passages tool: {str(e)}")
+        return f"Error searching paper passages: {str(e)}"
+
+@tool
+def expand_tool_result(handle: str) -> str:
+    """
+    EXPAND A COMPACTED TOOL RESULT. Use this tool only when a summary or passage in an earlier tool result was cut short and the full text is needed to answer.
+    Takes a handle such as "R3.2" from that result and returns the complete record.
+    """
+    text = tool_compactor.expand(current_session_id.get(), handle)
+    if text is None:
+        return f"Unknown or expired handle {handle}. Run the original search again."
+    return text
+
+tools = [knowledge_base, get_metadata_information_from_arxiv, get_information_from_arxiv, knowledge_base_passages, expand_tool_result]
 
 # Prompting the agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -247,11 +644,13 @@ agent_purpose = """
 You are a helpful research assistant equipped with various tools to assist with your tasks efficiently. 
 You have access to conversational history stored in your input as chat_history.
 
-You have three tools available:
+You have five tools available:
 
 1. knowledge_base - SEARCH FOR PAPERS BY TOPIC
 2. get_metadata_information_from_arxiv - GET METADATA FOR MULTIPLE PAPERS  
 3. get_information_from_arxiv - GET DETAILS ABOUT A SPECIFIC PAPER BY ITS ARXIV ID
+4. knowledge_base_passages - SEARCH INSIDE PAPERS FOR METHODS, EXPERIMENTS OR RESULTS
+5. expand_tool_result - GET THE FULL TEXT BEHIND A HANDLE (e.g. R3.2) IN A COMPACTED TOOL RESULT
 
 CRITICAL TOOL SELECTION RULES:
 
@@ -276,6 +675,10 @@ EXAMPLES:
 - User: "Search for papers about BERT" → USE knowledge_base with query="BERT"
 - User: "I'd like a summary of the paper: Adaptive thresholds for neural networks with synaptic noise" → USE get_information_from_arxiv with arXiv ID "708.0328" from previous response
 
+FOR QUESTIONS ABOUT THE CONTENT OF PAPERS (use knowledge_base_passages):
+- When user asks: "How do papers on [topic] evaluate [something]" → use knowledge_base_passages
+- When user asks: "What results were reported for [method]" → use knowledge_base_passages
+
 IMPORTANT: 
 - NEVER use get_information_from_arxiv for topic searches
 - ALWAYS use knowledge_base for topic searches
@@ -288,32 +691,61 @@ For follow-up requests about specific papers:
 - Extract the arXiv ID from that paper in the previous response
 - Use get_information_from_arxiv with that specific arXiv ID
 
+Tool results are compact: one line per paper, fields separated by "|" and starting with a handle.
+Long summaries are cut to fit; only call expand_tool_result when the cut text is not enough to answer.
+
+If a "Resolved reference" note follows these instructions, use the arXiv ID given there directly instead of searching chat_history.
+
 REMEMBER: When someone asks for details about a specific paper, you MUST use get_information_from_arxiv with the arXiv ID from the previous conversation, not knowledge_base.
 """
 
 prompt = ChatPromptTemplate.from_messages(
     [
-        ("system", agent_purpose),
+        # The resolved reference is a prompt variable rather than part of the input,
+        # so it is never stored in the chat history
+        ("system", agent_purpose + "{reference_note}"),
         MessagesPlaceholder("chat_history"),
         ("human", "{input}"),
         MessagesPlaceholder("agent_scratchpad")
     ]
-)
+).partial(reference_note="")
 
 # Agent creation
 from langchain.agents import AgentExecutor, create_tool_calling_agent
-agent = create_tool_calling_agent(llm, tools, prompt)
+agent = create_tool_calling_agent(tiered_llm or llm, tools, prompt)
+
+# Per-request deadlines and cancellation for agent runs
+from deadlines import RequestBudget, PartialResultCollector, ClientDisconnected, run_with_deadline, AGENT_STOPPED_OUTPUT
+from outbound import DeadlineExceeded
 
 # Create the agent's long-term memory using MongoDB
-from langchain_mongodb.chat_message_histories import MongoDBChatMessageHistory
 from langchain.memory import ConversationBufferMemory
+from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.chat_history import BaseChatMessageHistory
+from history_store import HistoryStore, HISTORY_MIGRATE_ON_STARTUP
+from session_history import SessionHistoryStore, HISTORY_BACKEND
+
+# TTL-managed chat history sharing the application's MongoClient: one document per
+# message (default) or one document per session with HISTORY_BACKEND=session
+if HISTORY_BACKEND == "session":
+    history_store = SessionHistoryStore(client, DB_NAME)
+else:
+    history_store = HistoryStore(client, DB_NAME)
 
-def get_session_history(session_id: str) -> MongoDBChatMessageHistory:
-    return MongoDBChatMessageHistory(MONGO_URI, session_id, database_name=DB_NAME, collection_name="history")
+def get_session_history(session_id: str) -> BaseChatMessageHistory:
+    return history_store.session(session_id)
 
 # FastAPI app setup
 app = FastAPI(title="ResearchPal API", description="AI-powered research assistant API")
 
+# Per-route concurrency limits with a priority wait queue, so agent runs cannot starve
+# library and search requests. Added before CORS so rejections still carry CORS headers.
+from admission import AdmissionController, AdmissionMiddleware, ADMISSION_ENABLED
+
+admission = AdmissionController()
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -331,9 +763,13 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     session_id: str
+    partial: bool = False
 
 class SearchRequest(BaseModel):
     query: str
+    # MMR trade-off between relevance (1) and diversity (0); None keeps plain similarity search
+    # unless MMR_LAMBDA sets a server default
+    mmr_lambda: Optional[float] = Field(None, ge=0, le=1)
 
 class Paper(BaseModel):
     id: str
@@ -348,6 +784,37 @@ class SearchResponse(BaseModel):
     papers: List[Paper]
     total: int
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(..., max_length=MAX_BATCH_QUERIES)
+    k: int = Field(5, ge=1, le=MAX_BATCH_K)
+    union: bool = False
+
+class BatchSearchResult(BaseModel):
+    query: str
+    papers: List[Paper]
+    total: int
+
+class UnionPaper(Paper):
+    score: float
+    queries: List[str]
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchResult]
+    union: Optional[List[UnionPaper]] = None
+
+class PaperDetailResponse(BaseModel):
+    arxiv_id: str
+    title: str
+    authors: List[str]
+    abstract: str
+    published_date: Optional[str] = None
+    categories: List[str] = []
+    pdf_url: Optional[str] = None
+    entry_url: Optional[str] = None
+    journal_ref: Optional[str] = None
+    doi: Optional[str] = None
+    source: str
+
 class LibraryPaper(BaseModel):
     id: str
     title: str
@@ -370,13 +837,151 @@ class LibraryResponse(BaseModel):
     papers: List[LibraryPaper]
     total: int
 
+class PassageIngestRequest(BaseModel):
+    arxiv_ids: List[str]
+
+class PassageSearchRequest(BaseModel):
+    query: str
+    k: int = Field(20, ge=1, le=MAX_PASSAGE_K)
+    max_papers: int = Field(5, ge=1, le=MAX_PASSAGE_PAPERS)
+
 # Simple in-memory storage for library (in production, this would be a database)
 library_storage: dict[str, dict] = {}
+# Bumped on every library change; used for the library ETag together with a per-process
+# boot ID, since the in-memory library and its counter both start over on restart
+library_version = 0
+library_boot_id = uuid.uuid4().hex
+
+# Vector and tag/note index over the library, kept in step with library_storage
+from library_index import LibraryIndex
+from starlette.concurrency import run_in_threadpool
+
+def stored_embedding(arxiv_id: str) -> Optional[list]:
+    """The knowledge base embedding of a paper, if it is part of the knowledge base"""
+    record = collection.find_one({"id": {"$in": id_candidates(arxiv_id)}}, {"_id": 0, "embedding": 1})
+    return record.get("embedding") if record else None
+
+library_index = LibraryIndex(embedding_model.embed_query, lookup_embedding=stored_embedding)
+
+def index_library_paper(arxiv_id: str, paper: dict) -> None:
+    try:
+        source = library_index.add(arxiv_id, paper)
+        print(f"📚 Indexed library paper {arxiv_id} ({source} embedding)")
+    except Exception as e:
+        print(f"⚠️  Could not index library paper {arxiv_id}: {str(e)}")
+
+class LibrarySearchRequest(BaseModel):
+    query: str = ""
+    k: int = 20
+    tags: List[str] = []
+    notes: str = ""
+
+class LibrarySearchPaper(LibraryPaper):
+    score: Optional[float] = None
+
+class LibrarySearchResponse(BaseModel):
+    papers: List[LibrarySearchPaper]
+    total: int
+
+@app.on_event("startup")
+async def ensure_indexes():
+    try:
+        passage_indexer.ensure_indexes()
+        arxiv_cache.ensure_indexes()
+        history_store.ensure_indexes()
+        query_log.ensure_indexes()
+        if result_cache_tier is not None:
+            result_cache_tier.ensure_indexes()
+    except Exception as e:
+        print(f"⚠️  Could not ensure indexes: {str(e)}")
+
+def migrate_history() -> None:
+    try:
+        history_store.migrate()
+    except Exception as e:
+        print(f"⚠️  Chat history migration failed: {str(e)}")
+
+@app.on_event("startup")
+async def start_history_migration():
+    # Legacy per-message documents have no ExpiresAt, so the TTL index would never drop them
+    if HISTORY_MIGRATE_ON_STARTUP and isinstance(history_store, HistoryStore):
+        threading.Thread(target=migrate_history, name="history-migration", daemon=True).start()
+
+def warm_query(query: str) -> None:
+    cached_search(query)
+
+def warm_paper(arxiv_id: str) -> None:
+    # Knowledge base papers are read from Mongo directly; only the others need arXiv
+    if knowledge_paper_detail(arxiv_id) is None:
+        fetch_arxiv_paper(arxiv_id)
+
+def run_warmup() -> None:
+    """Replay the most frequent logged queries and papers, then report ready"""
+    readiness.begin()
+    try:
+        queries = query_log.top_queries(WARMUP_TOP_QUERIES)
+        paper_ids = query_log.top_papers(WARMUP_TOP_PAPERS)
+        print(f"🔥 Warming caches with {len(queries)} queries and {len(paper_ids)} papers")
+        report = warm_caches(queries, paper_ids, warm_query, warm_paper)
+        print(f"✅ Cache warmup finished in {report['seconds']}s")
+        readiness.finish(report)
+    except Exception as e:
+        print(f"⚠️  Cache warmup failed: {str(e)}")
+        readiness.finish(error=str(e))
+
+@app.on_event("startup")
+async def start_warmup():
+    query_log.start()
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
+    else:
+        readiness.finish()
+
+@app.on_event("shutdown")
+async def stop_query_log():
+    query_log.stop()
+
+@app.on_event("startup")
+async def start_prefetcher():
+    if prefetcher is not None:
+        prefetcher.start()
+
+@app.on_event("shutdown")
+async def stop_prefetcher():
+    if prefetcher is not None:
+        prefetcher.stop()
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the startup cache warmup has finished"""
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content=readiness.as_dict())
+    return readiness.as_dict()
 
 @app.get("/")
 async def root():
     return {"message": "ResearchPal API is running"}
 
+@app.get("/debug/metrics")
+async def debug_metrics():
+    """Debug endpoint exposing outbound call metrics"""
+    return {
+        "outbound": outbound_metrics(),
+        "related_papers": related_papers.stats(),
+        "history": history_store.stats(include_size=True),
+        "result_cache": result_cache.stats(),
+        "tool_compaction": tool_compactor.stats(),
+        "model_tiers": tiered_llm.stats() if tiered_llm else None,
+        "jobs": job_queue.stats(),
+        "library_index": library_index.stats(),
+        "dedup": diversity_metrics.stats(),
+        "mmr": mmr_metrics.stats(),
+        "prefetch": prefetcher.stats() if prefetcher else None,
+        "query_log": query_log.stats(),
+        "warmup": readiness.as_dict(),
+        "admission": admission.stats() if ADMISSION_ENABLED else None,
+    }
+
 @app.get("/debug/memory/{session_id}")
 async def debug_memory(session_id: str):
     """Debug endpoint to check conversation memory for a session"""
@@ -391,6 +996,7 @@ async def debug_memory(session_id: str):
         return {
             "session_id": session_id,
             "message_count": len(messages),
+            "archived_message_count": len(memory.chat_memory.archived_messages()),
             "messages": [
                 {
                     "type": msg.type,
@@ -402,13 +1008,26 @@ async def debug_memory(session_id: str):
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/debug/results/{session_id}")
+async def debug_results(session_id: str):
+    """Debug endpoint to check the latest structured search results of a session"""
+    entry = session_results.get(session_id)
+    if not entry:
+        return {"session_id": session_id, "results": []}
+    return {"session_id": session_id, "source": entry["source"], "query": entry["query"], "results": entry["results"]}
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     try:
         session_id = request.session_id or str(uuid.uuid4())
         print(f"🔍 Processing chat request: {request.message}")
         print(f"📝 Session ID: {session_id}")
         
+        current_session_id.set(session_id)
+        budget = RequestBudget()
+        budget.install()
+        token_usage = start_tool_token_usage()
+
         # Create memory for this session
         memory = ConversationBufferMemory(
             memory_key="chat_history",
@@ -416,13 +1035,14 @@ async def chat(request: ChatRequest):
             return_messages=True
         )
         
-        # Create agent executor with memory for this session
+        # The executor only reads the history; the turn is saved below once the final
+        # answer is known, so a stopped or partial run never stores its placeholder output
         agent_executor = AgentExecutor(
             agent=agent,
             tools=tools,
             verbose=False,  # Hide verbose output from user
             handle_parsing_errors=True,
-            memory=memory,
+            **budget.executor_limits(),
         )
         
         # Debug: Print current conversation history
@@ -435,9 +1055,45 @@ async def chat(request: ChatRequest):
         memory_variables = memory.load_memory_variables({})
         print(f"📝 Memory variables for agent: {memory_variables}")
         
-        # Invoke the agent
-        result = agent_executor.invoke({"input": request.message})
-        
+        # Resolve follow-up references against the session's latest results
+        agent_input = request.message
+        reference_note = ""
+        reference = session_results.resolve(session_id, request.message)
+        if reference:
+            print(f"🔗 Resolved reference to {reference['arxiv_id']}: {reference['title']}")
+            reference_note = f"\nResolved reference: \"{reference['title']}\" has arXiv ID {reference['arxiv_id']}"
+
+        # Invoke the agent within the request budget, cancelling it if the client goes away
+        collector = PartialResultCollector()
+        try:
+            result = await run_with_deadline(
+                agent_executor.ainvoke(
+                    {"input": agent_input, "reference_note": reference_note, **memory_variables},
+                    config={"callbacks": [collector]},
+                ),
+                budget,
+                http_request.is_disconnected,
+            )
+        except DeadlineExceeded:
+            print(f"⏱️ Chat request ran out of its {budget.seconds:.0f}s budget, returning partial answer")
+            fallback = collector.fallback_answer()
+            memory.chat_memory.add_messages([HumanMessage(content=agent_input), AIMessage(content=fallback)])
+            return ChatResponse(response=fallback, session_id=session_id, partial=True)
+        except ClientDisconnected:
+            print(f"🔌 Client disconnected, cancelled agent run for session {session_id}")
+            return ChatResponse(response="", session_id=session_id, partial=True)
+
+        if token_usage["calls"]:
+            saved = token_usage["raw_tokens"] - token_usage["compact_tokens"]
+            print(f"🪙 Tool outputs: {token_usage['raw_tokens']} → {token_usage['compact_tokens']} tokens "
+                  f"over {token_usage['calls']} calls ({saved} saved)")
+
+        if result["output"].strip() == AGENT_STOPPED_OUTPUT:
+            print("⏱️ Agent hit its iteration or time limit, returning partial answer")
+            fallback = collector.fallback_answer()
+            memory.chat_memory.add_messages([HumanMessage(content=agent_input), AIMessage(content=fallback)])
+            return ChatResponse(response=fallback, session_id=session_id, partial=True)
+
         # Clean up the response to remove tool invocation artifacts
         cleaned_response = result["output"]
         
@@ -462,6 +1118,7 @@ async def chat(request: ChatRequest):
         cleaned_response = cleaned_response.strip()
         
         print(f"✅ Agent response: {cleaned_response[:200]}...")
+        memory.chat_memory.add_messages([HumanMessage(content=agent_input), AIMessage(content=cleaned_response)])
         
         return ChatResponse(
             response=cleaned_response,
@@ -471,95 +1128,157 @@ async def chat(request: ChatRequest):
         print(f"❌ Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+NO_PAPERS_FOUND = {"id": "no-papers-found", "authors": [], "abstract": "Try a different search term or check your spelling.", "subjects": [], "date": "2024-01-01", "arxiv_id": None}
+
+def search_papers(query: str, mmr_lambda: Optional[float] = MMR_DEFAULT_LAMBDA) -> list:
+    """Run a knowledge base search and return the results as Paper dicts"""
+    docs = retrieve_results(query, mmr_lambda=mmr_lambda)
+    papers = []
+    for i, doc in enumerate(docs, 1):
+        record = dict(doc.metadata)
+        record["abstract"] = doc.page_content
+        paper = record_to_paper(record)
+        if not paper["id"]:
+            paper["id"] = paper["arxiv_id"] = f"paper-{i}"
+            print(f"⚠️  Paper {i} has no arXiv ID, using fallback: {paper['id']}")
+        papers.append(paper)
+    if not papers:
+        papers = [{**NO_PAPERS_FOUND, "title": f"No papers found for '{query}'"}]
+    return papers
+
+def cached_search(query: str, mmr_lambda: Optional[float] = MMR_DEFAULT_LAMBDA):
+    """search_papers through the result cache; returns (papers, tier)"""
+    return result_cache.get_or_compute(
+        "search", query, RESULTS_PER_QUERY, lambda: search_papers(query, mmr_lambda), {"mmr_lambda": mmr_lambda})
+
+def search_response(query: str, request: Request, mmr_lambda: Optional[float] = None):
+    print(f"🔍 Processing search request: {query}")
+    mmr_lambda = MMR_DEFAULT_LAMBDA if mmr_lambda is None else mmr_lambda
+    # Results only change when the knowledge index does, so revalidation needs no search
+    etag = strong_etag("search", index_version.current(), normalize_query(query), mmr_lambda)
+    logged = WARMUP_HEADER not in request.headers
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        if logged:
+            query_log.record(SEARCH, query)
+        return json_response(request, None, etag=etag)
+    papers, tier = cached_search(query, mmr_lambda)
+    print(f"✅ Found {len(papers)} papers for query: {query} ({tier})")
+    if logged:
+        query_log.record(SEARCH, query, [paper["arxiv_id"] for paper in papers])
+        # No prefetch here: these are knowledge base papers, which GET /api/papers reads
+        # from the knowledge collection, so arXiv details would never be used
+    return json_response(request, {"papers": papers, "total": len(papers)}, etag=etag)
+
 @app.post("/api/search", response_model=SearchResponse)
-async def search(request: SearchRequest):
+def search(search_request: SearchRequest, request: Request):
     try:
-        print(f"🔍 Processing search request: {request.query}")
-        
-        # Use the knowledge_base tool to search for papers
-        search_result = knowledge_base.invoke(request.query)
-        
-        print(f"🔍 Raw search result from knowledge_base:")
-        print(search_result)
-        print("=" * 50)
-        
-        # Parse the search result to extract paper information
-        papers = []
-        
-        # The knowledge_base tool returns format like:
-        # "1. Title: Paper Title\n   Authors: Author1, Author2\n   arXiv ID: 1234.5678v1\n   Summary: Abstract text...\n"
-        lines = search_result.split('\n')
-        current_paper = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            print(f"🔍 Processing line: '{line}'")
-                
-            if re.match(r'^\d+\.\s*Title:', line):
-                if current_paper: papers.append(current_paper)
-                title = line.split('Title:', 1)[1].strip()
-                current_paper = {"id": "", "title": title, "authors": [], "abstract": "", "subjects": [], "date": "2024-01-01", "arxiv_id": None}
-                print(f"📝 Processing paper: {title}")
-            elif line.startswith('Authors:'):
-                if current_paper:
-                    authors_text = line.replace('Authors:', '').strip()
-                    current_paper["authors"] = [author.strip() for author in authors_text.split(',')]
-                    print(f"👥 Authors: {authors_text}")
-            elif line.startswith('arXiv ID:'):
-                if current_paper:
-                    arxiv_id = line.replace('arXiv ID:', '').strip()
-                    current_paper["arxiv_id"] = arxiv_id
-                    current_paper["id"] = arxiv_id
-                    print(f"📄 Found paper with arXiv ID: {arxiv_id}")
-            elif line.startswith('Summary:'):
-                if current_paper:
-                    summary = line.replace('Summary:', '').strip()
-                    current_paper["abstract"] = summary
-                    print(f"📖 Summary length: {len(summary)} chars")
-            elif current_paper and line and not line.startswith('Title:') and not line.startswith('Authors:') and not line.startswith('arXiv ID:') and not line.startswith('Summary:') and not re.match(r'^\d+\.', line):
-                if current_paper["abstract"]:
-                    current_paper["abstract"] += " " + line.strip()
-        
-        if current_paper: papers.append(current_paper)
-        
-        if not papers or search_result.strip() == "No relevant papers found.":
-            papers = [{"id": "no-papers-found", "title": f"No papers found for '{request.query}'", "authors": [], "abstract": "Try a different search term or check your spelling.", "subjects": [], "date": "2024-01-01", "arxiv_id": None}]
-        
-        for i, paper in enumerate(papers):
-            if not paper["id"] or paper["id"] == "":
-                paper["id"] = f"paper-{i+1}"
-                paper["arxiv_id"] = f"paper-{i+1}"
-                print(f"⚠️  Paper {i+1} has no arXiv ID, using fallback: {paper['id']}")
-            else:
-                print(f"✅ Paper {i+1} has arXiv ID: {paper['id']}")
-        
-        print(f"✅ Found {len(papers)} papers for query: {request.query}")
-        return SearchResponse(papers=papers, total=len(papers))
+        return search_response(search_request.query, request, search_request.mmr_lambda)
     except Exception as e:
         print(f"❌ Error in search endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing search request: {str(e)}")
 
+@app.get("/api/search", response_model=SearchResponse)
+def search_get(request: Request, query: str, mmr_lambda: Optional[float] = Query(None, ge=0, le=1)):
+    """Cacheable variant of /api/search; browsers revalidate it with If-None-Match"""
+    try:
+        return search_response(query, request, mmr_lambda)
+    except Exception as e:
+        print(f"❌ Error in search endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing search request: {str(e)}")
+
+@app.post("/api/search/batch", response_model=BatchSearchResponse)
+def search_batch(request: BatchSearchRequest):
+    """Search several queries with one embedding request and concurrent vector searches"""
+    try:
+        queries = [query.strip() for query in request.queries if query.strip()]
+        print(f"🔍 Processing batch search for {len(queries)} queries")
+
+        results = multi_query_searcher.search(queries, k=request.k)
+        print(f"⏱️ Batch search timings: {multi_query_searcher.last_timings}")
+
+        response = BatchSearchResponse(results=[
+            BatchSearchResult(
+                query=query,
+                papers=[record_to_paper(record) for record, _ in hits],
+                total=len(hits),
+            )
+            for query, hits in zip(queries, results)
+        ])
+        if request.union:
+            response.union = [
+                UnionPaper(**record_to_paper(entry["record"]), score=entry["score"], queries=entry["queries"])
+                for entry in union_results(results, queries)
+            ]
+        return response
+    except Exception as e:
+        print(f"❌ Error in search_batch endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing batch search request: {str(e)}")
+
+PAPER_CACHE_CONTROL = "public, max-age=86400"
+
+@app.get("/api/papers/{arxiv_id}", response_model=PaperDetailResponse)
+def get_paper(arxiv_id: str, request: Request):
+    """Structured paper details from the knowledge base, the arXiv cache or live arXiv"""
+    try:
+        print(f"📄 Fetching paper details for: {arxiv_id}")
+
+        detail, source = resolve_paper(arxiv_id, knowledge_paper_detail, arxiv_cache, lookup_arxiv_paper)
+        if detail is None:
+            raise HTTPException(status_code=404, detail=f"Paper {arxiv_id} not found")
+        if WARMUP_HEADER not in request.headers:
+            query_log.record(PAPER, paper_ids=[arxiv_id])
+
+        body = {**detail, "source": source}
+        etag = strong_etag(orjson.dumps(body, option=orjson.OPT_SORT_KEYS))
+        return json_response(request, body, etag=etag, cache_control=PAPER_CACHE_CONTROL)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error in get_paper endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving paper: {str(e)}")
+
+@app.get("/api/papers/{arxiv_id}/related", response_model=SearchResponse)
+def get_related_papers(arxiv_id: str, request: Request, k: int = Query(5, ge=1, le=MAX_BATCH_K)):
+    """Papers similar to the given one, found with its stored embedding"""
+    try:
+        print(f"🔗 Finding papers related to: {arxiv_id}")
+        found = related_papers.related(arxiv_id, k=k)
+        if found is None:
+            raise HTTPException(status_code=404, detail=f"Paper {arxiv_id} not found in the knowledge base")
+
+        neighbours, source = found
+        papers = [record_to_paper(record) for record, _ in neighbours]
+        print(f"✅ Found {len(papers)} related papers ({source})")
+        etag = strong_etag("related", arxiv_id, k, *[paper["id"] for paper in papers])
+        return json_response(request, {"papers": papers, "total": len(papers)}, etag=etag)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error in get_related_papers endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error finding related papers: {str(e)}")
+
 @app.get("/api/library", response_model=LibraryResponse)
-async def get_library():
+async def get_library(request: Request):
     """Get all papers in the user's library"""
     try:
+        # The version changes on every save and delete, so a matching ETag
+        # means the client's copy is current and nothing needs to be built
+        etag = strong_etag("library", library_boot_id, library_version)
         papers = []
-        for arxiv_id, paper_data in library_storage.items():
-            papers.append(LibraryPaper(
-                id=arxiv_id,
-                title=paper_data["title"],
-                authors=paper_data["authors"],
-                abstract=paper_data["abstract"],
-                arxiv_id=arxiv_id,
-                date_added=paper_data["date_added"],
-                tags=paper_data.get("tags", []),
-                notes=paper_data.get("notes", "")
-            ))
+        if not etag_matches(request.headers.get("if-none-match"), etag):
+            for arxiv_id, paper_data in library_storage.items():
+                papers.append({
+                    "id": arxiv_id,
+                    "title": paper_data["title"],
+                    "authors": paper_data["authors"],
+                    "abstract": paper_data["abstract"],
+                    "arxiv_id": arxiv_id,
+                    "date_added": paper_data["date_added"],
+                    "tags": paper_data.get("tags", []),
+                    "notes": paper_data.get("notes", "")
+                })
         
-        return LibraryResponse(papers=papers, total=len(papers))
+        return json_response(request, {"papers": papers, "total": len(papers)}, etag=etag)
     except Exception as e:
         print(f"❌ Error in get_library endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving library: {str(e)}")
@@ -567,6 +1286,7 @@ async def get_library():
 @app.post("/api/library")
 async def save_to_library(request: LibraryRequest):
     """Save a paper to the user's library"""
+    global library_version
     try:
         print(f"💾 Saving paper to library: {request.title}")
         
@@ -579,20 +1299,51 @@ async def save_to_library(request: LibraryRequest):
             "tags": request.tags or [],
             "notes": request.notes or ""
         }
+        library_version += 1
+        await run_in_threadpool(index_library_paper, request.arxiv_id, library_storage[request.arxiv_id])
         
         return {"message": "Paper saved to library", "arxiv_id": request.arxiv_id}
     except Exception as e:
         print(f"❌ Error in save_to_library endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error saving to library: {str(e)}")
 
+@app.post("/api/library/search", response_model=LibrarySearchResponse)
+def search_library(request: LibrarySearchRequest):
+    """Semantic search over saved papers, restricted to the given tags and note keywords"""
+    try:
+        hits = library_index.search(request.query, k=request.k, tags=request.tags, notes=request.notes)
+        papers = []
+        for arxiv_id, score in hits:
+            paper_data = library_storage.get(arxiv_id)
+            if paper_data is None:
+                continue
+            papers.append(LibrarySearchPaper(
+                id=arxiv_id,
+                arxiv_id=arxiv_id,
+                title=paper_data["title"],
+                authors=paper_data["authors"],
+                abstract=paper_data["abstract"],
+                date_added=paper_data["date_added"],
+                tags=paper_data.get("tags", []),
+                notes=paper_data.get("notes", ""),
+                score=score,
+            ))
+        return {"papers": papers, "total": len(papers)}
+    except Exception as e:
+        print(f"❌ Error in search_library endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error searching library: {str(e)}")
+
 @app.delete("/api/library/{arxiv_id}")
 async def remove_from_library(arxiv_id: str):
     """Remove a paper from the user's library"""
+    global library_version
     try:
         print(f"🗑️ Removing paper from library: {arxiv_id}")
         
         if arxiv_id in library_storage:
             del library_storage[arxiv_id]
+            library_version += 1
+            library_index.remove(arxiv_id)
             return {"message": "Paper removed from library", "arxiv_id": arxiv_id}
         else:
             raise HTTPException(status_code=404, detail="Paper not found in library")
@@ -600,6 +1351,138 @@ async def remove_from_library(arxiv_id: str):
         print(f"❌ Error in remove_from_library endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error removing from library: {str(e)}")
 
+@app.post("/api/passages/ingest")
+def ingest_passages(request: PassageIngestRequest):
+    """Load, chunk and index the full text of the given arXiv papers"""
+    try:
+        print(f"📥 Indexing full text for {len(request.arxiv_ids)} papers")
+        # Versions of the same paper are indexed once
+        arxiv_ids = list({canonical_arxiv_id(arxiv_id): arxiv_id for arxiv_id in request.arxiv_ids}.values())
+        papers = [load_paper_text(arxiv_id) for arxiv_id in arxiv_ids]
+        stats = passage_indexer.ingest_papers(papers)
+        print(f"✅ Indexed {stats.chunks} passages from {stats.papers} papers ({stats.chunks_per_second:.1f} chunks/s)")
+        return {"ingestion": stats.as_dict(), "index": passage_indexer.index_size()}
+    except Exception as e:
+        print(f"❌ Error in ingest_passages endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error indexing passages: {str(e)}")
+
+@app.post("/api/passages/search")
+def search_passages(request: PassageSearchRequest):
+    """Search full paper text and return the matching passages grouped by paper"""
+    try:
+        papers = passage_indexer.search(request.query, k=request.k, max_papers=request.max_papers)
+        return {"papers": papers, "total": len(papers)}
+    except Exception as e:
+        print(f"❌ Error in search_passages endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error searching passages: {str(e)}")
+
+@app.get("/api/passages/stats")
+def passage_stats():
+    """Report the size of the passage index"""
+    try:
+        return passage_indexer.index_size()
+    except Exception as e:
+        print(f"❌ Error in passage_stats endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error reading passage index stats: {str(e)}")
+
+# Background jobs for slow operations
+import asyncio
+from fastapi.responses import StreamingResponse
+from jobs import JobQueue, UnknownJobKind, FINISHED_STATES, DEFAULT_PRIORITY
+
+JOB_EVENT_POLL_SECONDS = 0.5
+
+job_queue = JobQueue()
+
+def arxiv_search_job(params: dict, report) -> list:
+    """Live arXiv search; results also warm the paper detail cache"""
+    search = arxiv.Search(
+        query=params["query"],
+        max_results=min(int(params.get("max_results", 10)), 50),
+        sort_by=arxiv.SortCriterion.SubmittedDate
+    )
+    papers = []
+    report(0.0, "Querying arXiv")
+    for page in arxiv_result_pages(search):
+        for result in page:
+            detail = result_to_detail(result)
+            arxiv_cache.put(detail["arxiv_id"], detail)
+            papers.append(detail)
+            report(len(papers) / search.max_results, f"Fetched {len(papers)} papers")
+    return papers
+
+def arxiv_paper_job(params: dict, report) -> dict:
+    paper = fetch_arxiv_paper(params["arxiv_id"])
+    if not paper:
+        raise ValueError(f"Paper {params['arxiv_id']} not found on arXiv")
+    return paper
+
+def ingest_passages_job(params: dict, report) -> dict:
+    arxiv_ids = list({canonical_arxiv_id(arxiv_id): arxiv_id for arxiv_id in params["arxiv_ids"]}.values())
+    papers = []
+    for i, arxiv_id in enumerate(arxiv_ids, 1):
+        papers.append(load_paper_text(arxiv_id))
+        report(0.8 * i / len(arxiv_ids), f"Loaded {i}/{len(arxiv_ids)} papers")
+    report(0.8, "Embedding passages")
+    stats = passage_indexer.ingest_papers(papers)
+    return {"ingestion": stats.as_dict(), "index": passage_indexer.index_size()}
+
+job_queue.register("arxiv_search", arxiv_search_job)
+job_queue.register("arxiv_paper", arxiv_paper_job)
+job_queue.register("ingest_passages", ingest_passages_job)
+
+class JobRequest(BaseModel):
+    kind: str
+    params: dict = {}
+    priority: int = DEFAULT_PRIORITY  # lower runs first
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    job_queue.stop()
+
+@app.post("/api/jobs", status_code=202)
+def create_job(request: JobRequest):
+    """Enqueue a slow operation; identical pending jobs are returned instead of duplicated"""
+    try:
+        job, created = job_queue.submit(request.kind, request.params, request.priority)
+        return {**job, "created": created}
+    except UnknownJobKind as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Error in create_job endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating job: {str(e)}")
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-sent events with the job record on every change, until it finishes"""
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def events():
+        last_version = -1
+        while not await request.is_disconnected():
+            version = job_queue.version(job_id)
+            if version != last_version:
+                last_version = version
+                job = job_queue.get(job_id)
+                yield f"event: job\ndata: {orjson.dumps(job).decode()}\n\n"
+                if job["status"] in FINISHED_STATES:
+                    return
+            await asyncio.sleep(JOB_EVENT_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
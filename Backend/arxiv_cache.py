@@ -0,0 +1,131 @@
+"""
+Cache of structured arXiv paper metadata.
+
+Paper details change rarely, while arXiv only allows one request every three
+seconds. Fetched papers are kept in an in-process LRU backed by a MongoDB
+collection whose TTL index expires entries after `ARXIV_CACHE_TTL_SECONDS`.
+Both tiers also check the age on read, since the LRU has no TTL index and
+MongoDB only removes expired documents once a minute.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional, Tuple
+
+ARXIV_CACHE_COLLECTION_NAME = "arxiv_cache"
+ARXIV_CACHE_TTL_SECONDS = int(os.environ.get("ARXIV_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+DEFAULT_CAPACITY = 2048
+
+
+def result_to_detail(result) -> dict:
+    """Convert an arxiv.Result into the structured paper detail shape"""
+    return {
+        "arxiv_id": result.entry_id.split('/')[-1],
+        "title": result.title,
+        "authors": [author.name for author in result.authors],
+        "abstract": result.summary,
+        "published_date": result.published.strftime("%Y-%m-%d"),
+        "categories": list(result.categories),
+        "pdf_url": result.pdf_url,
+        "entry_url": result.entry_id,
+        "journal_ref": result.journal_ref,
+        "doi": result.doi,
+    }
+
+
+class ArxivPaperCache:
+    """Structured paper details keyed by the requested arXiv ID"""
+
+    def __init__(self, collection=None, capacity: int = DEFAULT_CAPACITY, ttl_seconds: float = ARXIV_CACHE_TTL_SECONDS):
+        self.collection = collection
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        # arXiv ID -> (time.monotonic() expiry, detail)
+        self._cache: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def ensure_indexes(self) -> None:
+        if self.collection is not None:
+            self.collection.create_index("fetched_at", expireAfterSeconds=int(self.ttl_seconds))
+
+    def _remember(self, arxiv_id: str, detail: dict, age: float = 0.0) -> None:
+        with self._lock:
+            self._cache[arxiv_id] = (time.monotonic() + self.ttl_seconds - age, detail)
+            self._cache.move_to_end(arxiv_id)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def get(self, arxiv_id: str, record: bool = True) -> Optional[dict]:
+        """Cached details or None; `record=False` leaves the hit counters alone, e.g. for prefetch checks"""
+        with self._lock:
+            entry = self._cache.get(arxiv_id)
+            if entry is not None:
+                expires_at, detail = entry
+                if time.monotonic() < expires_at:
+                    self._cache.move_to_end(arxiv_id)
+                    self.hits += record
+                    return detail
+                del self._cache[arxiv_id]
+
+        detail, age = None, 0.0
+        if self.collection is not None:
+            try:
+                document = self.collection.find_one({"_id": arxiv_id})
+                if document:
+                    fetched_at = document["fetched_at"]
+                    if fetched_at.tzinfo is None:
+                        fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+                    age = (datetime.now(timezone.utc) - fetched_at).total_seconds()
+                    if age < self.ttl_seconds:
+                        detail = document["detail"]
+            except Exception as e:
+                print(f"⚠️  Could not read arXiv cache for {arxiv_id}: {str(e)}")
+        if detail is None:
+            self.misses += record
+            return None
+        self.hits += record
+        self._remember(arxiv_id, detail, age)
+        return detail
+
+    def put(self, arxiv_id: str, detail: dict) -> None:
+        self._remember(arxiv_id, detail)
+        if self.collection is not None:
+            try:
+                self.collection.replace_one(
+                    {"_id": arxiv_id},
+                    {"detail": detail, "fetched_at": datetime.now(timezone.utc)},
+                    upsert=True,
+                )
+            except Exception as e:
+                print(f"⚠️  Could not write arXiv cache for {arxiv_id}: {str(e)}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def resolve_paper(
+    arxiv_id: str,
+    knowledge_lookup: Callable[[str], Optional[dict]],
+    cache: ArxivPaperCache,
+    fetch: Callable[[str], Optional[dict]],
+) -> Tuple[Optional[dict], Optional[str]]:
+    """Paper details and their source, trying the knowledge base, then the cache, then arXiv"""
+    detail = knowledge_lookup(arxiv_id)
+    if detail is not None:
+        return detail, "knowledge"
+    detail = cache.get(arxiv_id)
+    if detail is not None:
+        return detail, "cache"
+    detail = fetch(arxiv_id)
+    return detail, "arxiv" if detail is not None else None
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the chat history store.
+
+Seeds a scratch collection with long sessions the way the plain
+MongoDBChatMessageHistory writes them, measures collection size and per-turn
+read and append latency, then migrates the collection with HistoryStore
+(timestamps, TTL expiry, compaction) and measures again. Finally the sessions
+are copied into SessionHistoryStore (one document per session) and measured
+the same way.
+
+Usage: python bench_history.py [sessions] [messages_per_session]
+Requires MONGO_URI; the scratch collections are dropped afterwards.
+"""
+
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_mongodb.chat_message_histories import MongoDBChatMessageHistory
+from pymongo import MongoClient
+
+from history_store import HistoryStore, percentile
+from session_history import SessionHistoryStore
+
+load_dotenv()
+
+DB_NAME = "agent_demo"
+COLLECTION_NAME = "history_bench"
+ARCHIVE_COLLECTION_NAME = "history_bench_archive"
+SESSION_COLLECTION_NAME = "history_bench_sessions"
+
+def turn(number: int) -> list:
+    return [
+        HumanMessage(content=f"Question {number} about the paper " + "context " * 40),
+        AIMessage(content=f"Answer {number} " + "details " * 120),
+    ]
+
+def read_latencies(histories, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        for history in histories:
+            started = time.perf_counter()
+            history.messages
+            samples.append(time.perf_counter() - started)
+    return samples
+
+def write_latencies(histories, turns: int, first: int) -> list:
+    """Time appending whole turns, the way the chat endpoint saves them"""
+    samples = []
+    for number in range(first, first + turns):
+        for history in histories:
+            started = time.perf_counter()
+            history.add_messages(turn(number))
+            samples.append(time.perf_counter() - started)
+    return samples
+
+def report(label: str, store, reads: list, writes: list) -> None:
+    size = store.collection_size()
+    print(f"📦 {label}")
+    print(f"   documents: {size['documents']}, data: {size['size_bytes'] / 1024:.1f} KiB, "
+          f"indexes: {size['index_bytes'] / 1024:.1f} KiB")
+    print(f"   per-turn read p50: {percentile(reads, 0.5) * 1000:.2f} ms, "
+          f"p95: {percentile(reads, 0.95) * 1000:.2f} ms")
+    print(f"   per-turn append p50: {percentile(writes, 0.5) * 1000:.2f} ms, "
+          f"p95: {percentile(writes, 0.95) * 1000:.2f} ms")
+
+def main(sessions: int, messages_per_session: int) -> None:
+    client = MongoClient(os.environ["MONGO_URI"])
+    database = client.get_database(DB_NAME)
+    database.drop_collection(COLLECTION_NAME)
+    database.drop_collection(ARCHIVE_COLLECTION_NAME)
+    database.drop_collection(SESSION_COLLECTION_NAME)
+    store = HistoryStore(client, DB_NAME, collection_name=COLLECTION_NAME, archive_collection_name=ARCHIVE_COLLECTION_NAME)
+    session_store = SessionHistoryStore(client, DB_NAME, collection_name=SESSION_COLLECTION_NAME)
+    turns = messages_per_session // 2
+
+    try:
+        session_ids = [f"paper-detail-bench-{i}" for i in range(sessions)]
+        legacy = [
+            MongoDBChatMessageHistory(None, session_id, database_name=DB_NAME, collection_name=COLLECTION_NAME, client=client)
+            for session_id in session_ids
+        ]
+        legacy_writes = write_latencies(legacy, turns, first=0)
+        report("Before: one document per message, SessionId index, no expiry", store,
+               read_latencies(legacy, repeat=5), legacy_writes)
+
+        store.ensure_indexes()
+        store.migrate()
+        indexed = [store.session(session_id) for session_id in session_ids]
+        indexed_writes = write_latencies(indexed, 5, first=turns)
+        report("After: SessionId + CreatedAt index, TTL expiry, compaction", store,
+               read_latencies(indexed, repeat=5), indexed_writes)
+        print(f"   archive documents: {store.archive_collection.count_documents({})}")
+
+        session_store.ensure_indexes()
+        session_store.migrate(store)
+        documents = [session_store.session(session_id) for session_id in session_ids]
+        session_writes = write_latencies(documents, 5, first=turns + 5)
+        report("Session documents: one $push per turn, $slice tail reads", session_store,
+               read_latencies(documents, repeat=5), session_writes)
+    finally:
+        database.drop_collection(COLLECTION_NAME)
+        database.drop_collection(ARCHIVE_COLLECTION_NAME)
+        database.drop_collection(SESSION_COLLECTION_NAME)
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    messages_per_session = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    main(sessions, messages_per_session)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for search/library response serialization.
+
+Compares FastAPI's default path (Pydantic models through jsonable_encoder and
+json.dumps) with the orjson path used by http_responses, and reports the
+compressed sizes for gzip and zstd, for 100- and 10,000-paper payloads.
+
+Usage: python bench_serialization.py
+"""
+
+import json
+import random
+import string
+import time
+from typing import List, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from http_responses import compress
+
+class Paper(BaseModel):
+    id: str
+    title: str
+    authors: List[str]
+    abstract: str
+    subjects: List[str]
+    date: str
+    arxiv_id: Optional[str] = None
+
+class SearchResponse(BaseModel):
+    papers: List[Paper]
+    total: int
+
+def random_words(count: int) -> str:
+    return " ".join("".join(random.choices(string.ascii_lowercase, k=random.randint(3, 10))) for _ in range(count))
+
+def make_papers(count: int) -> List[dict]:
+    random.seed(count)
+    return [
+        {
+            "id": f"{2300 + i // 100000}.{i % 100000:05d}",
+            "title": random_words(10).title(),
+            "authors": [random_words(2).title() for _ in range(4)],
+            "abstract": random_words(180),
+            "subjects": ["cs.LG", "cs.CL"],
+            "date": "2024-01-01",
+            "arxiv_id": f"{2300 + i // 100000}.{i % 100000:05d}",
+        }
+        for i in range(count)
+    ]
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def bench(count: int, repeat: int) -> None:
+    papers = make_papers(count)
+    model = SearchResponse(papers=[Paper(**paper) for paper in papers], total=count)
+    payload = {"papers": papers, "total": count}
+
+    default_path = timed(lambda: json.dumps(jsonable_encoder(model)).encode(), repeat)
+    pydantic_path = timed(lambda: model.model_dump_json().encode(), repeat)
+    orjson_path = timed(lambda: orjson.dumps(payload), repeat)
+
+    body = orjson.dumps(payload)
+    gzip_time = timed(lambda: compress(body, "gzip"), repeat)
+    zstd_time = timed(lambda: compress(body, "zstd"), repeat)
+
+    print(f"📦 {count} papers ({len(body) / 1024:.1f} KiB raw JSON, best of {repeat})")
+    print(f"   jsonable_encoder + json.dumps: {default_path * 1000:9.2f} ms")
+    print(f"   model_dump_json:               {pydantic_path * 1000:9.2f} ms")
+    print(f"   orjson.dumps on dicts:         {orjson_path * 1000:9.2f} ms  ({default_path / orjson_path:.1f}x faster than default)")
+    print(f"   gzip: {len(compress(body, 'gzip')) / 1024:8.1f} KiB in {gzip_time * 1000:7.2f} ms")
+    print(f"   zstd: {len(compress(body, 'zstd')) / 1024:8.1f} KiB in {zstd_time * 1000:7.2f} ms")
+
+if __name__ == "__main__":
+    bench(100, repeat=50)
+    bench(10_000, repeat=5)
@@ -0,0 +1,118 @@
+"""
+End-to-end deadlines and cancellation for agent runs.
+
+Each /api/chat request gets a time budget. The AgentExecutor's iteration and
+execution-time limits are derived from it, the run is cancelled when the budget
+runs out or the HTTP client disconnects, and whatever the tools produced so far
+is turned into a fallback answer.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from outbound import DeadlineExceeded, request_cancelled, request_deadline
+from tool_compaction import readable_output
+
+CHAT_DEADLINE_SECONDS = float(os.environ.get("CHAT_DEADLINE_SECONDS", "45"))
+
+# Rough cost of one agent step (LLM call plus tool call), used to size max_iterations
+SECONDS_PER_ITERATION = 5.0
+MAX_ITERATIONS = 15
+# Time kept back from the executor so the fallback answer can still be sent
+RESPONSE_RESERVE_SECONDS = 2.0
+
+DISCONNECT_POLL_SECONDS = 0.25
+FALLBACK_OUTPUT_CHARS = 2000
+AGENT_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before the agent finished"""
+
+
+class RequestBudget:
+    """Deadline of one request, installed in the context for the outbound layer"""
+
+    def __init__(self, seconds: float = CHAT_DEADLINE_SECONDS):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+        self.cancelled = threading.Event()
+
+    def install(self) -> None:
+        request_deadline.set(self.deadline)
+        request_cancelled.set(self.cancelled)
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def executor_limits(self) -> Dict[str, Any]:
+        """AgentExecutor keyword arguments that keep the run inside the budget"""
+        usable = max(0.0, self.remaining() - RESPONSE_RESERVE_SECONDS)
+        return {
+            "max_iterations": max(1, min(MAX_ITERATIONS, int(usable // SECONDS_PER_ITERATION))),
+            "max_execution_time": usable,
+            "early_stopping_method": "force",
+        }
+
+
+class PartialResultCollector(BaseCallbackHandler):
+    """Keeps the tool outputs of a run so a partial answer can be built if it is cut short"""
+
+    def __init__(self):
+        self.tool_names: Dict[UUID, str] = {}
+        self.outputs: List[tuple] = []
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self.tool_names[run_id] = (serialized or {}).get("name", "tool")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        content = getattr(output, "content", output)
+        self.outputs.append((self.tool_names.get(run_id, "tool"), str(content)))
+
+    def fallback_answer(self) -> str:
+        if not self.outputs:
+            return "Sorry, this request took too long to complete. Please try again or ask a narrower question."
+        tool_name, output = self.outputs[-1]
+        # Tool outputs are compacted for the LLM; show people the labelled records instead
+        output = readable_output(output)
+        if len(output) > FALLBACK_OUTPUT_CHARS:
+            output = output[:FALLBACK_OUTPUT_CHARS] + "..."
+        return f"I ran out of time before finishing, but here is what I found so far ({tool_name}):\n\n{output.strip()}"
+
+
+async def run_with_deadline(
+    run: Awaitable,
+    budget: RequestBudget,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> Any:
+    """
+    Await `run` until it finishes, the budget runs out or the client disconnects.
+    In the latter two cases the run is cancelled, which aborts in-flight async LLM
+    calls, and the budget's cancellation event stops tool threads from making
+    further outbound calls.
+    """
+    task = asyncio.ensure_future(run)
+    try:
+        while True:
+            remaining = budget.remaining()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Request exceeded its {budget.seconds:.0f}s budget")
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_SECONDS, remaining))
+            if done:
+                return task.result()
+            if is_disconnected is not None and await is_disconnected():
+                raise ClientDisconnected("Client disconnected")
+    finally:
+        if not task.done():
+            budget.cancelled.set()
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
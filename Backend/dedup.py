@@ -0,0 +1,251 @@
+"""
+Near-duplicate detection for the knowledge index.
+
+The same paper can appear several times: as `v1`/`v2` versions, under an ID
+that lost its leading or trailing zeros when the dataset was stored as floats,
+or as a cross-listed copy with a near-identical abstract. Duplicates are found
+in three passes, cheapest first:
+
+1. canonical arXiv IDs,
+2. MinHash signatures over abstract shingles, bucketed with LSH,
+3. cosine similarity of the stored embeddings.
+
+`deduplicate_records` is run at ingestion; `diversify` removes the copies that
+still reach a result list at query time.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple
+
+import mmh3
+import numpy as np
+
+from vector_index import LocalVectorIndex
+
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+LSH_BANDS = 16  # 16 bands of 8 rows: pairs above ~0.7 Jaccard collide in some band
+JACCARD_THRESHOLD = 0.8
+COSINE_THRESHOLD = 0.97
+EMBEDDING_BATCH_SIZE = 1024
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(1)
+# a < 2^29 keeps a * hash + b below 2^64, so the permutations never overflow
+_PERM_A = _rng.randint(1, 1 << 29, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+
+def canonical_arxiv_id(arxiv_id) -> str:
+    """
+    Canonical form of an arXiv ID: no prefix, URL or version, and the zeros
+    that a float round-trip drops restored, e.g. "704.001v2" -> "0704.0010".
+    """
+    value = str(arxiv_id).strip()
+    value = re.sub(r"^(https?://arxiv\.org/(abs|pdf)/|arxiv:)", "", value, flags=re.IGNORECASE)
+    value = re.sub(r"(\.pdf)?(v\d+)?$", "", value)
+    match = re.fullmatch(r"(\d{1,4})\.(\d{1,5})", value)
+    if not match:
+        return value.lower()
+    yymm, number = match.groups()
+    yymm = yymm.zfill(4)
+    # IDs from 2015 on have five-digit sequence numbers, earlier ones four
+    number = number.ljust(5 if int(yymm) >= 1501 else 4, "0")
+    return f"{yymm}.{number}"
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(shingle_set: Iterable[str]) -> np.ndarray:
+    """MinHash signature with NUM_PERM universal hash permutations of 32-bit murmur hashes"""
+    hashes = np.array([mmh3.hash(shingle, signed=False) for shingle in shingle_set], dtype=np.uint64)
+    if hashes.size == 0:
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, item: int) -> int:
+        self.parent.setdefault(item, item)
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> bool:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        self.parent[max(root_a, root_b)] = min(root_a, root_b)
+        return True
+
+
+@dataclass
+class DedupReport:
+    input_records: int = 0
+    kept_records: int = 0
+    removed_by: Dict[str, int] = field(default_factory=lambda: {"id": 0, "minhash": 0, "cosine": 0})
+
+    @property
+    def shrinkage(self) -> float:
+        return 1 - self.kept_records / self.input_records if self.input_records else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "input_records": self.input_records,
+            "kept_records": self.kept_records,
+            "removed_by": dict(self.removed_by),
+            "shrinkage": round(self.shrinkage, 4),
+        }
+
+
+def newest_first(record: dict) -> tuple:
+    """Sort key preferring the most recently updated record, then the highest version"""
+    version = re.search(r"v(\d+)$", str(record.get("id", "")))
+    return (str(record.get("update_date") or ""), int(version.group(1)) if version else 0)
+
+
+def deduplicate_records(
+    records: Sequence[dict],
+    text_key: str = "abstract",
+    embedding_key: str = "embedding",
+    jaccard_threshold: float = JACCARD_THRESHOLD,
+    cosine_threshold: float = COSINE_THRESHOLD,
+) -> Tuple[List[dict], DedupReport]:
+    """
+    Cluster duplicate records and keep the newest record of every cluster.
+    Each merge is attributed to the first pass that found it.
+    """
+    report = DedupReport(input_records=len(records))
+    clusters = UnionFind()
+
+    # 1. Versions and mangled IDs of the same paper
+    by_id: Dict[str, int] = {}
+    for i, record in enumerate(records):
+        first = by_id.setdefault(canonical_arxiv_id(record.get("id", "")), i)
+        if first != i and clusters.union(first, i):
+            report.removed_by["id"] += 1
+
+    # 2. Near-identical abstracts: LSH buckets, then the signature estimate
+    rows = NUM_PERM // LSH_BANDS
+    signatures = [minhash(shingles(record.get(text_key, ""))) for record in records]
+    buckets: Dict[Tuple[int, bytes], List[int]] = {}
+    for i, signature in enumerate(signatures):
+        for band in range(LSH_BANDS):
+            buckets.setdefault((band, signature[band * rows:(band + 1) * rows].tobytes()), []).append(i)
+    for members in buckets.values():
+        for other in members[1:]:
+            first = members[0]
+            if clusters.find(first) != clusters.find(other) and \
+                    estimated_jaccard(signatures[first], signatures[other]) >= jaccard_threshold:
+                clusters.union(first, other)
+                report.removed_by["minhash"] += 1
+
+    # 3. Same content worded differently: nearest stored embedding above the threshold
+    with_embeddings = [i for i, record in enumerate(records) if record.get(embedding_key) is not None]
+    if with_embeddings:
+        index = LocalVectorIndex(dimensions=len(records[with_embeddings[0]][embedding_key]))
+        for i in with_embeddings:
+            index.add(str(i), records[i][embedding_key])
+        for start in range(0, len(with_embeddings), EMBEDDING_BATCH_SIZE):
+            batch = with_embeddings[start:start + EMBEDDING_BATCH_SIZE]
+            hits = index.search_many([index.get_vector(str(i)) for i in batch], k=2)
+            for i, neighbours in zip(batch, hits):
+                for neighbour_id, score, _ in neighbours:
+                    j = int(neighbour_id)
+                    if j != i and score >= cosine_threshold and clusters.union(i, j):
+                        report.removed_by["cosine"] += 1
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(records)):
+        groups.setdefault(clusters.find(i), []).append(i)
+    kept = [max((records[i] for i in members), key=newest_first) for _, members in sorted(groups.items())]
+    report.kept_records = len(kept)
+    return kept, report
+
+
+class DiversityMetrics:
+    """Query-time duplicate removal counters"""
+
+    def __init__(self):
+        self.queries = 0
+        self.results_in = 0
+        self.results_out = 0
+        self._lock = threading.Lock()
+
+    def observe(self, results_in: int, results_out: int) -> None:
+        with self._lock:
+            self.queries += 1
+            self.results_in += results_in
+            self.results_out += results_out
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "duplicates_removed": self.results_in - self.results_out,
+                "distinct_ratio": round(self.results_out / self.results_in, 4) if self.results_in else 1.0,
+            }
+
+
+diversity_metrics = DiversityMetrics()
+
+
+def diversify(
+    items: Sequence,
+    k: int,
+    get_id: Callable = lambda item: item.get("id"),
+    get_text: Callable = lambda item: item.get("abstract", ""),
+    get_embedding: Callable = lambda item: None,
+    jaccard_threshold: float = JACCARD_THRESHOLD,
+    cosine_threshold: float = COSINE_THRESHOLD,
+) -> List:
+    """
+    Walk ranked results and skip any that duplicate a higher-ranked one, until
+    `k` are kept. Pass over-fetched results so removed copies can be replaced.
+    """
+    kept, kept_ids, kept_shingles, kept_vectors = [], set(), [], []
+    examined = 0
+    for item in items:
+        if len(kept) == k:
+            break
+        examined += 1
+        canonical = canonical_arxiv_id(get_id(item) or "")
+        if canonical and canonical in kept_ids:
+            continue
+        item_shingles = shingles(get_text(item))
+        if any(jaccard(item_shingles, other) >= jaccard_threshold for other in kept_shingles):
+            continue
+        vector = get_embedding(item)
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+            if any(float(vector @ other) >= cosine_threshold for other in kept_vectors):
+                continue
+            kept_vectors.append(vector)
+        kept.append(item)
+        kept_ids.add(canonical)
+        kept_shingles.append(item_shingles)
+    diversity_metrics.observe(examined, len(kept))
+    return kept
@@ -0,0 +1,243 @@
+"""
+Chat history store with indexed reads, idle expiry and a per-session cap.
+
+Messages are kept one document per message in the `history` collection, as
+`MongoDBChatMessageHistory` writes them, but every document also carries a
+`CreatedAt` timestamp covered by a `SessionId` + `CreatedAt` index and an
+`ExpiresAt` date that a TTL index uses to drop idle sessions. Once a session
+grows past `HISTORY_MAX_MESSAGES`, its oldest turns are merged into a single
+archive document in `history_archive` so per-turn reads stay bounded.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import List, Sequence
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_mongodb.chat_message_histories import MongoDBChatMessageHistory
+from pymongo import ASCENDING, DESCENDING
+
+HISTORY_COLLECTION_NAME = "history"
+HISTORY_ARCHIVE_COLLECTION_NAME = "history_archive"
+HISTORY_TTL_SECONDS = int(os.environ.get("HISTORY_TTL_SECONDS", str(30 * 24 * 3600)))
+HISTORY_MAX_MESSAGES = int(os.environ.get("HISTORY_MAX_MESSAGES", "40"))
+# Compaction trims a session down to this many live messages, so it does not run on every turn
+HISTORY_KEEP_MESSAGES = int(os.environ.get("HISTORY_KEEP_MESSAGES", "20"))
+# Messages kept in a session's archive document, oldest dropped first, well below the 16 MB document limit
+HISTORY_ARCHIVE_MAX_MESSAGES = int(os.environ.get("HISTORY_ARCHIVE_MAX_MESSAGES", "1000"))
+# Give pre-existing history documents an expiry at startup so the TTL index covers them
+HISTORY_MIGRATE_ON_STARTUP = os.environ.get("HISTORY_MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+SESSION_KEY = "SessionId"
+HISTORY_KEY = "History"
+LATENCY_SAMPLES = 512
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class IndexedChatMessageHistory(MongoDBChatMessageHistory):
+    """MongoDBChatMessageHistory that writes timestamps, refreshes expiry and compacts"""
+
+    def __init__(self, store: "HistoryStore", session_id: str):
+        super().__init__(
+            None,
+            session_id,
+            database_name=store.collection.database.name,
+            collection_name=store.collection.name,
+            client=store.client,
+            create_index=False,
+        )
+        self.store = store
+
+    @property
+    def messages(self) -> List[BaseMessage]:  # type: ignore
+        """Live messages of the session in insertion order, read through the SessionId + CreatedAt index"""
+        started = time.perf_counter()
+        cursor = self.collection.find(
+            {SESSION_KEY: self.session_id},
+            {HISTORY_KEY: 1, "_id": 0},
+        ).sort([("CreatedAt", ASCENDING), ("_id", ASCENDING)])
+        items = [json.loads(document[HISTORY_KEY]) for document in cursor]
+        self.store.record_read(time.perf_counter() - started)
+        return messages_from_dict(items)
+
+    def archived_messages(self) -> List[BaseMessage]:
+        """Messages that compaction moved out of the live history"""
+        archive = self.store.archive_collection.find_one({"_id": self.session_id})
+        return messages_from_dict(archive["Messages"]) if archive else []
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """Append messages in one write and push the session's expiry forward"""
+        if not messages:
+            return
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.store.ttl_seconds)
+        self.collection.insert_many([
+            {
+                SESSION_KEY: self.session_id,
+                HISTORY_KEY: json.dumps(message_to_dict(message)),
+                # Microsecond offsets keep messages of one batch in order
+                "CreatedAt": now + timedelta(microseconds=i),
+                "ExpiresAt": expires_at,
+            }
+            for i, message in enumerate(messages)
+        ])
+        self.collection.update_many(
+            {SESSION_KEY: self.session_id, "ExpiresAt": {"$lt": expires_at}},
+            {"$set": {"ExpiresAt": expires_at}},
+        )
+        self.store.compact(self.session_id)
+
+    def clear(self) -> None:
+        self.collection.delete_many({SESSION_KEY: self.session_id})
+        self.store.archive_collection.delete_one({"_id": self.session_id})
+
+
+class HistoryStore:
+    """Creates session histories over a shared client and owns indexes, compaction and stats"""
+
+    def __init__(
+        self,
+        client,
+        database_name: str,
+        collection_name: str = HISTORY_COLLECTION_NAME,
+        archive_collection_name: str = HISTORY_ARCHIVE_COLLECTION_NAME,
+        ttl_seconds: int = HISTORY_TTL_SECONDS,
+        max_messages: int = HISTORY_MAX_MESSAGES,
+        keep_messages: int = HISTORY_KEEP_MESSAGES,
+        archive_max_messages: int = HISTORY_ARCHIVE_MAX_MESSAGES,
+    ):
+        self.client = client
+        database = client.get_database(database_name)
+        self.collection = database.get_collection(collection_name)
+        self.archive_collection = database.get_collection(archive_collection_name)
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.keep_messages = min(keep_messages, max_messages)
+        self.archive_max_messages = archive_max_messages
+        self._read_latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+        self.compactions = 0
+        self.archived = 0
+
+    def session(self, session_id: str) -> IndexedChatMessageHistory:
+        return IndexedChatMessageHistory(self, session_id)
+
+    def ensure_indexes(self) -> None:
+        """Create the read and TTL indexes, replacing the single-field SessionId index"""
+        self.collection.create_index([(SESSION_KEY, ASCENDING), ("CreatedAt", ASCENDING)])
+        self.collection.create_index("ExpiresAt", expireAfterSeconds=0)
+        self.archive_collection.create_index("ExpiresAt", expireAfterSeconds=0)
+        if f"{SESSION_KEY}_1" in self.collection.index_information():
+            # The compound index serves every SessionId query the old index did
+            self.collection.drop_index(f"{SESSION_KEY}_1")
+
+    def compact(self, session_id: str) -> int:
+        """Merge the oldest turns of an oversized session into its archive document"""
+        live = self.collection.count_documents({SESSION_KEY: session_id})
+        if live <= self.max_messages:
+            return 0
+
+        oldest = list(self.collection.find(
+            {SESSION_KEY: session_id},
+            {HISTORY_KEY: 1, "CreatedAt": 1, "ExpiresAt": 1},
+        ).sort([("CreatedAt", ASCENDING), ("_id", ASCENDING)]).limit(live - self.keep_messages))
+        if not oldest:
+            return 0
+
+        expires_at = max(
+            (document.get("ExpiresAt") for document in oldest if document.get("ExpiresAt")),
+            default=datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds),
+        )
+        self.archive_collection.update_one(
+            {"_id": session_id},
+            {
+                "$push": {"Messages": {
+                    "$each": [json.loads(document[HISTORY_KEY]) for document in oldest],
+                    "$slice": -self.archive_max_messages,
+                }},
+                "$setOnInsert": {"CreatedAt": oldest[0].get("CreatedAt")},
+                "$set": {"ExpiresAt": expires_at},
+            },
+            upsert=True,
+        )
+        self.collection.delete_many({"_id": {"$in": [document["_id"] for document in oldest]}})
+        with self._lock:
+            self.compactions += 1
+            self.archived += len(oldest)
+        print(f"🗜️ Compacted {len(oldest)} messages of session {session_id} into its archive")
+        return len(oldest)
+
+    def migrate(self) -> dict:
+        """
+        Bring documents written by the plain MongoDBChatMessageHistory up to date:
+        backfill CreatedAt from the ObjectId, give documents without an expiry one
+        from their session's last message and compact sessions that are over the
+        cap. Only sessions with documents missing an expiry are visited, so it is
+        cheap to run again; api.py runs it at startup.
+        """
+        started = time.perf_counter()
+        backfilled = self.collection.update_many(
+            {"CreatedAt": {"$exists": False}},
+            [{"$set": {"CreatedAt": {"$toDate": "$_id"}}}],
+        ).modified_count
+
+        sessions = compacted = 0
+        for session_id in self.collection.distinct(SESSION_KEY, {"ExpiresAt": {"$exists": False}}):
+            sessions += 1
+            latest = self.collection.find_one({SESSION_KEY: session_id}, {"CreatedAt": 1}, sort=[("CreatedAt", DESCENDING)])
+            last = latest["CreatedAt"]
+            if last.tzinfo is None:
+                last = last.replace(tzinfo=timezone.utc)
+            self.collection.update_many(
+                {SESSION_KEY: session_id, "ExpiresAt": {"$exists": False}},
+                {"$set": {"ExpiresAt": last + timedelta(seconds=self.ttl_seconds)}},
+            )
+            compacted += self.compact(session_id)
+
+        seconds = time.perf_counter() - started
+        print(f"🧹 Migrated chat history: {backfilled} timestamps backfilled, {sessions} sessions, "
+              f"{compacted} messages archived in {seconds:.1f}s")
+        return {"backfilled": backfilled, "sessions": sessions, "archived": compacted, "seconds": round(seconds, 2)}
+
+    def record_read(self, seconds: float) -> None:
+        with self._lock:
+            self._read_latencies.append(seconds)
+
+    def collection_size(self) -> dict:
+        stats = self.collection.database.command("collStats", self.collection.name)
+        return {
+            "documents": stats.get("count", 0),
+            "size_bytes": stats.get("size", 0),
+            "storage_bytes": stats.get("storageSize", 0),
+            "index_bytes": stats.get("totalIndexSize", 0),
+        }
+
+    def stats(self, include_size: bool = False) -> dict:
+        with self._lock:
+            samples = list(self._read_latencies)
+            stats = {
+                "reads": len(samples),
+                "read_p50_ms": round(percentile(samples, 0.5) * 1000, 2),
+                "read_p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+                "compactions": self.compactions,
+                "archived_messages": self.archived,
+            }
+        if include_size:
+            try:
+                stats["collection"] = self.collection_size()
+            except Exception as e:
+                stats["collection"] = {"error": str(e)}
+        return stats
@@ -0,0 +1,110 @@
+"""
+Fast JSON responses with compression and conditional requests.
+
+Payloads are serialized with orjson, compressed with zstd or gzip when the
+client accepts it and the body is large enough, and tagged with a strong ETag
+so unchanged responses can be answered with 304 Not Modified.
+"""
+
+import gzip
+import hashlib
+from typing import Optional
+
+import orjson
+import zstandard
+from fastapi import Request
+from fastapi.responses import Response
+
+# Bodies smaller than this are sent uncompressed; the framing costs more than it saves
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+# Preferred encodings, best first
+SUPPORTED_ENCODINGS = ["zstd", "gzip"]
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+
+
+def strong_etag(*parts) -> str:
+    """Build a strong ETag from version identifiers or content"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported content coding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in SUPPORTED_ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return _zstd_compressor.compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compare an If-None-Match header with an ETag, ignoring the encoding suffix"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            continue
+        candidate = candidate.strip('"')
+        if candidate == base or candidate.split("-", 1)[0] == base:
+            return True
+    return False
+
+
+def json_response(
+    request: Request,
+    payload,
+    etag: Optional[str] = None,
+    cache_control: str = "no-cache",
+    status_code: int = 200,
+) -> Response:
+    """
+    Serialize `payload` with orjson and send it compressed when worthwhile.
+    When `etag` is given and matches the request's If-None-Match, an empty 304
+    is returned instead. The ETag of a compressed body gets the coding as a
+    suffix, since a strong ETag must identify one exact representation.
+    """
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": cache_control}
+    if etag is not None:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+    body = orjson.dumps(payload)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+        if etag is not None:
+            base = etag.strip('"')
+            headers["ETag"] = f'"{base}-{encoding}"'
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,216 @@
+"""
+Background job queue for slow operations.
+
+Live arXiv searches, rate-limited paper fetches and full-text ingestion run on
+a pool of worker threads instead of inside the request. Jobs are persisted in
+SQLite so they survive restarts, identical jobs are deduplicated, and lower
+priority numbers run first. Clients poll a job or follow its progress events.
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import orjson
+
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", "jobs.db")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# A finished job is reused for identical submissions within this window
+JOB_RESULT_TTL_SECONDS = int(os.environ.get("JOB_RESULT_TTL_SECONDS", "3600"))
+DEFAULT_PRIORITY = 5
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority, created_at);
+"""
+
+# Handlers receive the job parameters and a report(progress, message) callback
+JobHandler = Callable[[dict, Callable[[float, str], None]], Any]
+
+
+def dedup_key(kind: str, params: dict) -> str:
+    return hashlib.sha256(orjson.dumps([kind, params], option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class UnknownJobKind(ValueError):
+    pass
+
+
+class JobQueue:
+    """Priority job queue on worker threads with SQLite-persisted job records"""
+
+    def __init__(self, db_path: str = JOBS_DB_PATH, workers: int = JOB_WORKERS):
+        self.db_path = db_path
+        self.workers = workers
+        self.handlers: Dict[str, JobHandler] = {}
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._heap: list = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._versions: Dict[str, int] = {}
+        self._threads: list = []
+        self._stopping = False
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self.handlers[kind] = handler
+
+    def _execute(self, sql: str, args: tuple = ()) -> list:
+        with self._db_lock:
+            rows = self._db.execute(sql, args).fetchall()
+            self._db.commit()
+            return rows
+
+    def _row_to_job(self, row) -> dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job.pop("dedup_key")
+        return job
+
+    def _push(self, job_id: str, priority: int) -> None:
+        with self._condition:
+            heapq.heappush(self._heap, (priority, next(self._sequence), job_id))
+            self._condition.notify()
+
+    def _touch(self, job_id: str) -> None:
+        self._versions[job_id] = self._versions.get(job_id, 0) + 1
+
+    def version(self, job_id: str) -> int:
+        """Changes whenever the job's record does; used to push progress events"""
+        return self._versions.get(job_id, 0)
+
+    def submit(self, kind: str, params: dict, priority: int = DEFAULT_PRIORITY) -> Tuple[dict, bool]:
+        """
+        Enqueue a job and return (job, created). An identical job that is
+        queued, running or finished successfully within the result TTL is
+        returned instead of creating a new one.
+        """
+        if kind not in self.handlers:
+            raise UnknownJobKind(f"Unknown job kind: {kind}")
+
+        key = dedup_key(kind, params)
+        now = time.time()
+        with self._db_lock:
+            existing = self._db.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND (status IN (?, ?) OR (status = ? AND finished_at > ?)) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (key, QUEUED, RUNNING, SUCCEEDED, now - JOB_RESULT_TTL_SECONDS),
+            ).fetchone()
+            if existing is not None:
+                return self._row_to_job(existing), False
+
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, params, dedup_key, priority, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), key, priority, QUEUED, now),
+            )
+            self._db.commit()
+
+        self._touch(job_id)
+        self._push(job_id, priority)
+        print(f"📋 Queued {kind} job {job_id} (priority {priority})")
+        return self.get(job_id), True
+
+    def get(self, job_id: str) -> Optional[dict]:
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._row_to_job(rows[0]) if rows else None
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        self._touch(job_id)
+
+    def _run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+        self._update(job_id, status=RUNNING, started_at=time.time(), progress=0.0)
+
+        def report(progress: float, message: str = "") -> None:
+            self._update(job_id, progress=max(0.0, min(1.0, progress)), message=message)
+
+        try:
+            result = self.handlers[job["kind"]](job["params"], report)
+            self._update(job_id, status=SUCCEEDED, progress=1.0, result=orjson.dumps(result).decode(),
+                         finished_at=time.time())
+            print(f"✅ Job {job_id} ({job['kind']}) finished")
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+            print(f"❌ Job {job_id} ({job['kind']}) failed: {str(e)}")
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                while not self._heap and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                _, _, job_id = heapq.heappop(self._heap)
+            self._run(job_id)
+
+    def start(self) -> None:
+        """Requeue jobs interrupted by a restart and start the workers"""
+        interrupted = self._execute("SELECT id FROM jobs WHERE status = ?", (RUNNING,))
+        if interrupted:
+            self._execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING))
+        for row in self._execute("SELECT id, priority FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)):
+            self._push(row["id"], row["priority"])
+
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"🧵 Started {self.workers} job workers ({len(self._heap)} queued)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def close(self) -> None:
+        self.stop()
+        with self._db_lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        counts = {row["status"]: row["count"] for row in self._execute(
+            "SELECT status, COUNT(*) AS count FROM jobs GROUP BY status")}
+        with self._condition:
+            queued = len(self._heap)
+        return {"workers": self.workers, "queue_depth": queued, "jobs": counts}
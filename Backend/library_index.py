@@ -0,0 +1,140 @@
+"""
+Semantic search over the papers saved in the library.
+
+Saved papers are kept in an in-process vector index that is updated on every
+save and delete. A paper that exists in the knowledge base reuses its stored
+embedding, so only papers saved from live arXiv results need an embedding
+request. Tag and note keyword filters are answered from inverted indexes and
+restrict the vector search, so no query walks the whole library.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from vector_index import LocalVectorIndex
+
+QUERY_CACHE_SIZE = 256
+
+
+def keywords(text: str) -> Set[str]:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class LibraryIndex:
+    """Vector and keyword index over one library's saved papers"""
+
+    def __init__(
+        self,
+        embed_text: Callable[[str], Sequence[float]],
+        lookup_embedding: Callable[[str], Optional[Sequence[float]]] = lambda arxiv_id: None,
+        dimensions: int = 256,
+    ):
+        self.embed_text = embed_text
+        self.lookup_embedding = lookup_embedding
+        self.vectors = LocalVectorIndex(dimensions=dimensions)
+        self._tags: Dict[str, Set[str]] = {}
+        self._note_words: Dict[str, Set[str]] = {}
+        self._papers: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        self._query_vectors: "OrderedDict[str, Sequence[float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.reused_embeddings = 0
+        self.computed_embeddings = 0
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def _unlink(self, arxiv_id: str) -> None:
+        tags, words = self._papers.pop(arxiv_id, (set(), set()))
+        for tag in tags:
+            self._tags.get(tag, set()).discard(arxiv_id)
+        for word in words:
+            self._note_words.get(word, set()).discard(arxiv_id)
+
+    def add(self, arxiv_id: str, paper: dict) -> str:
+        """Index a saved paper; returns "stored" or "computed" for the embedding used"""
+        existing = self.vectors.get_vector(arxiv_id)
+        vector = existing if existing is not None else self.lookup_embedding(arxiv_id)
+        source = "stored"
+        if vector is None:
+            vector = self.embed_text(f"{paper.get('title', '')}\n{paper.get('abstract', '')}")
+            source = "computed"
+
+        tags = {tag.strip().lower() for tag in paper.get("tags", []) if tag.strip()}
+        words = keywords(paper.get("notes", ""))
+        with self._lock:
+            self._unlink(arxiv_id)
+            self.vectors.add(arxiv_id, vector)
+            self._papers[arxiv_id] = (tags, words)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(arxiv_id)
+            for word in words:
+                self._note_words.setdefault(word, set()).add(arxiv_id)
+            if existing is None:
+                if source == "stored":
+                    self.reused_embeddings += 1
+                else:
+                    self.computed_embeddings += 1
+        return source
+
+    def remove(self, arxiv_id: str) -> bool:
+        with self._lock:
+            self._unlink(arxiv_id)
+            return self.vectors.remove(arxiv_id)
+
+    def _filter(self, tags: Sequence[str], notes: str) -> Optional[Set[str]]:
+        """
+        IDs carrying any of the tags (as the Library page filters) and every
+        note keyword, or None when unfiltered
+        """
+        sets = [self._note_words.get(word, set()) for word in keywords(notes)]
+        tags = [tag.strip().lower() for tag in tags if tag.strip()]
+        if tags:
+            sets.append(set().union(*(self._tags.get(tag, set()) for tag in tags)))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        allowed = set(sets[0])
+        for other in sets[1:]:
+            allowed &= other
+        return allowed
+
+    def _query_vector(self, query: str) -> Sequence[float]:
+        key = " ".join(query.lower().split())
+        with self._lock:
+            vector = self._query_vectors.get(key)
+            if vector is not None:
+                self._query_vectors.move_to_end(key)
+                return vector
+        vector = self.embed_text(query)
+        with self._lock:
+            self._query_vectors[key] = vector
+            while len(self._query_vectors) > QUERY_CACHE_SIZE:
+                self._query_vectors.popitem(last=False)
+        return vector
+
+    def search(self, query: str = "", k: int = 20, tags: Sequence[str] = (), notes: str = "") -> List[Tuple[str, Optional[float]]]:
+        """
+        Return [(arxiv_id, score)] for the saved papers closest to `query` among
+        those matching the filters. Without a query, the matching papers are
+        returned unranked with a score of None.
+        """
+        with self._lock:
+            allowed = self._filter(tags, notes)
+            if not query.strip():
+                ids = self.vectors.ids() if allowed is None else list(allowed)
+                return [(arxiv_id, None) for arxiv_id in ids[:k]]
+        if allowed is not None and not allowed:
+            return []
+        hits = self.vectors.search(self._query_vector(query), k=k, allowed=allowed)
+        return [(arxiv_id, score) for arxiv_id, score, _ in hits]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "papers": len(self.vectors),
+                "tags": sum(1 for ids in self._tags.values() if ids),
+                "reused_embeddings": self.reused_embeddings,
+                "computed_embeddings": self.computed_embeddings,
+            }
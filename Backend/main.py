@@ -32,8 +32,29 @@ collection = client.get_database(DB_NAME).get_collection(COLLECTION_NAME)
 
 # # Data Ingestion
 # records = dataset_df.to_dict('records')
+
+# Drop versions, mangled IDs and near-duplicate copies before inserting
+# from dedup import deduplicate_records
+# records, dedup_report = deduplicate_records(records)
+# print(f"🧹 Deduplicated knowledge records: {dedup_report.as_dict()}")
 # collection.insert_many(records)
 
+# Refresh the precomputed related-papers table after ingestion
+from related import RelatedPapers, RELATED_COLLECTION_NAME
+
+related_papers = RelatedPapers(
+    collection,
+    client.get_database(DB_NAME).get_collection(RELATED_COLLECTION_NAME),
+    index_name=ATLAS_VECTOR_SEARCH_INDEX_NAME,
+)
+# related_papers.refresh()
+
+# Bump the knowledge index version so cached search results are invalidated
+from result_cache import IndexVersion, KNOWLEDGE_META_COLLECTION_NAME
+
+index_version = IndexVersion(client.get_database(DB_NAME).get_collection(KNOWLEDGE_META_COLLECTION_NAME))
+# index_version.bump()
+
 print("Data ingestion into MongoDB completed")
 
 # Create LangChain retriever with MongoDB
@@ -53,6 +74,18 @@ vector_store = MongoDBAtlasVectorSearch.from_connection_string(
 
 retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 5})
 
+# Full-text passage ingestion
+from passages import PassageIndexer, PASSAGE_COLLECTION_NAME
+
+passage_indexer = PassageIndexer(client.get_database(DB_NAME).get_collection(PASSAGE_COLLECTION_NAME), embedding_model)
+# passage_indexer.ensure_indexes()
+# papers = []
+# for arxiv_id in ["2410.14827v2"]:
+#     doc = ArxivLoader(query=arxiv_id, load_max_docs=1).load()[0]
+#     papers.append({"id": arxiv_id, "title": doc.metadata["Title"], "text": doc.page_content})
+# stats = passage_indexer.ingest_papers(papers)
+# print(stats.as_dict(), passage_indexer.index_size())
+
 # Configure LLM using Fireworks AI
 from langchain_openai import ChatOpenAI
 from langchain_fireworks import Fireworks, ChatFireworks
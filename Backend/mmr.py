@@ -0,0 +1,132 @@
+"""
+Maximal marginal relevance over an over-fetched candidate set.
+
+Plain similarity search often returns several papers on nearly the same
+subtopic. MMR picks results one at a time, trading relevance to the query
+against similarity to the results already picked:
+
+    score(d) = lambda * sim(q, d) - (1 - lambda) * max_{s in selected} sim(d, s)
+
+All pairwise similarities come from one matrix product over the candidate
+embeddings, and each greedy step updates the running maximum with one vector
+operation, so selecting k of n candidates costs O(n^2 d + k n).
+"""
+
+import os
+import threading
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from result_cache import LatencyHistogram
+from vector_index import normalize_rows
+
+# Candidates fetched per requested result
+MMR_FETCH_MULTIPLIER = int(os.environ.get("MMR_FETCH_MULTIPLIER", "4"))
+# Server-wide trade-off for requests that do not set one; 1 is plain relevance order.
+# Off by default, so MMR only runs when a request asks for it.
+_default_lambda = os.environ.get("MMR_LAMBDA", "off").strip().lower()
+MMR_DEFAULT_LAMBDA: Optional[float] = None if _default_lambda in ("", "off", "none") else float(_default_lambda)
+
+
+def mmr_select(query_vector: Sequence[float], candidates: np.ndarray, k: int, lambda_mult: float = 0.7) -> List[int]:
+    """Indices of `k` candidate rows in MMR order"""
+    matrix = normalize_rows(np.asarray(candidates, dtype=np.float32))
+    n = matrix.shape[0]
+    if n == 0 or k <= 0:
+        return []
+    query = np.asarray(query_vector, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+
+    relevance = matrix @ query
+    similarity = matrix @ matrix.T
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+
+    # The first pick has nothing to be redundant with, so it is the most relevant
+    for _ in range(min(k, n)):
+        penalty = np.where(np.isneginf(redundancy), 0.0, redundancy)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+
+def list_diversity(candidates: np.ndarray, indices: Sequence[int]) -> float:
+    """One minus the mean pairwise cosine similarity of the chosen rows"""
+    if len(indices) < 2:
+        return 0.0
+    matrix = normalize_rows(np.asarray(candidates, dtype=np.float32)[list(indices)])
+    similarity = matrix @ matrix.T
+    pairs = len(indices) * (len(indices) - 1)
+    return float(1 - (similarity.sum() - np.trace(similarity)) / pairs)
+
+
+class MMRMetrics:
+    """Selection overhead and diversity gained over the plain top-k"""
+
+    def __init__(self):
+        self.requests = 0
+        self.candidates = 0
+        self.diversity_before = 0.0
+        self.diversity_after = 0.0
+        self.relevance_kept = 0.0
+        self.latency = LatencyHistogram()
+        self.retrieval = {"similarity": LatencyHistogram(), "mmr": LatencyHistogram()}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, candidates: int, before: float, after: float, relevance_kept: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.candidates += candidates
+            self.diversity_before += before
+            self.diversity_after += after
+            self.relevance_kept += relevance_kept
+            self.latency.observe(seconds)
+
+    def observe_retrieval(self, mode: str, seconds: float) -> None:
+        """End-to-end retrieval time per mode, so the over-fetch cost is visible too"""
+        with self._lock:
+            self.retrieval[mode].observe(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = self.requests or 1
+            return {
+                "requests": self.requests,
+                "avg_candidates": round(self.candidates / n, 2),
+                "avg_diversity_top_k": round(self.diversity_before / n, 4),
+                "avg_diversity_mmr": round(self.diversity_after / n, 4),
+                "avg_diversity_gain": round((self.diversity_after - self.diversity_before) / n, 4),
+                "avg_relevance_kept": round(self.relevance_kept / n, 4),
+                "selection": self.latency.as_dict(),
+                "retrieval": {mode: histogram.as_dict() for mode, histogram in self.retrieval.items()},
+            }
+
+
+mmr_metrics = MMRMetrics()
+
+
+def rerank(query_vector: Sequence[float], candidates: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """
+    MMR selection that also records its cost and the diversity gained over
+    taking the `k` most relevant candidates. Candidates must be in relevance order.
+    """
+    started = time.perf_counter()
+    selected = mmr_select(query_vector, candidates, k, lambda_mult)
+    seconds = time.perf_counter() - started
+
+    top_k = list(range(len(selected)))
+    if selected:
+        query = np.asarray(query_vector, dtype=np.float32)
+        relevance = normalize_rows(np.asarray(candidates, dtype=np.float32)) @ (query / (np.linalg.norm(query) or 1.0))
+        baseline = float(relevance[top_k].sum())
+        kept = float(relevance[selected].sum()) / baseline if baseline > 0 else 1.0
+        mmr_metrics.observe(seconds, len(candidates), list_diversity(candidates, top_k),
+                            list_diversity(candidates, selected), kept)
+    return selected
@@ -0,0 +1,179 @@
+"""
+Tiered model routing for the tool-calling agent.
+
+Choosing which tool to call is a short, structured decision, while the final
+answer is a long synthesis. Planning steps (no tool results yet for the
+current input) go to a small model with a low token cap; steps that follow
+tool results, and any step where the small model's tool calls do not validate,
+go to the large model.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool
+
+from result_cache import LatencyHistogram
+
+MODEL_TIERS_ENABLED = os.environ.get("MODEL_TIERS_ENABLED", "true").lower() in ("1", "true", "yes")
+ROUTER_MODEL = os.environ.get("ROUTER_MODEL", "accounts/fireworks/models/llama-v3p1-8b-instruct")
+ROUTER_MAX_TOKENS = int(os.environ.get("ROUTER_MAX_TOKENS", "256"))
+SYNTHESIS_MODEL = os.environ.get("SYNTHESIS_MODEL", "accounts/fireworks/models/llama4-scout-instruct-basic")
+SYNTHESIS_MAX_TOKENS = int(os.environ.get("SYNTHESIS_MAX_TOKENS", "4096"))
+
+PLAN_STEP = "plan"
+SYNTHESIS_STEP = "synthesis"
+
+
+def step_kind(messages: Sequence[BaseMessage]) -> str:
+    """A step is planning until a tool result follows the latest human message"""
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            return SYNTHESIS_STEP
+        if isinstance(message, HumanMessage):
+            return PLAN_STEP
+    return PLAN_STEP
+
+
+def validate_tool_calls(message: AIMessage, tools: Dict[str, Any]) -> Optional[str]:
+    """Return why the message's tool calls are unusable, or None when they are valid"""
+    if getattr(message, "invalid_tool_calls", None):
+        return "malformed tool call"
+    for call in message.tool_calls:
+        tool = tools.get(call["name"])
+        if tool is None:
+            return f"unknown tool {call['name']}"
+        schema = getattr(tool, "args_schema", None)
+        if schema is not None and hasattr(schema, "model_validate"):
+            try:
+                schema.model_validate(call["args"])
+            except Exception:
+                return f"invalid arguments for {call['name']}"
+    return None
+
+
+class TierMetrics:
+    """Call, latency and token counters for one model tier"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latency = LatencyHistogram()
+
+    def observe(self, seconds: float, message: Optional[AIMessage]) -> None:
+        self.calls += 1
+        self.latency.observe(seconds)
+        usage = getattr(message, "usage_metadata", None) if message is not None else None
+        if usage:
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class TieredChatModel:
+    """
+    Pairs a small router model with a large synthesis model. Pass it to
+    `create_tool_calling_agent` in place of a chat model; `bind_tools` binds
+    both tiers and returns a runnable that picks one per agent step.
+    """
+
+    def __init__(self, router, synthesizer):
+        self.router = router
+        self.synthesizer = synthesizer
+        self.metrics = {"router": TierMetrics(), "synthesis": TierMetrics()}
+        self.fallbacks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs) -> RunnableLambda:
+        tool_index = {tool.name: tool for tool in tools if isinstance(tool, BaseTool)}
+        router = self.router.bind_tools(tools, **kwargs)
+        synthesizer = self.synthesizer.bind_tools(tools, **kwargs)
+
+        def route(prompt_value, config: RunnableConfig) -> AIMessage:
+            plan = self._plan_messages(prompt_value)
+            if plan is not None:
+                message, reason = self._timed("router", lambda: router.invoke(prompt_value, config))
+                accepted = self._accept(message, reason, tool_index)
+                if accepted is not None:
+                    return accepted
+            return self._timed("synthesis", lambda: synthesizer.invoke(prompt_value, config), raise_errors=True)[0]
+
+        async def aroute(prompt_value, config: RunnableConfig) -> AIMessage:
+            plan = self._plan_messages(prompt_value)
+            if plan is not None:
+                message, reason = await self._atimed("router", router.ainvoke(prompt_value, config))
+                accepted = self._accept(message, reason, tool_index)
+                if accepted is not None:
+                    return accepted
+            return (await self._atimed("synthesis", synthesizer.ainvoke(prompt_value, config), raise_errors=True))[0]
+
+        return RunnableLambda(route, afunc=aroute, name="TieredChatModel")
+
+    def _plan_messages(self, prompt_value) -> Optional[List[BaseMessage]]:
+        messages = prompt_value.to_messages() if hasattr(prompt_value, "to_messages") else list(prompt_value)
+        return messages if step_kind(messages) == PLAN_STEP else None
+
+    def _accept(self, message: Optional[AIMessage], reason: Optional[str], tool_index: Dict[str, Any]) -> Optional[AIMessage]:
+        """The router's answer if it is a valid tool call, otherwise None after recording why"""
+        if message is not None:
+            if not message.tool_calls and not getattr(message, "invalid_tool_calls", None):
+                # No tool needed: the answer itself is written by the synthesis model
+                reason = "direct answer"
+            else:
+                reason = validate_tool_calls(message, tool_index)
+                if reason is None:
+                    return message
+        with self._lock:
+            self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+        if reason != "direct answer":
+            print(f"🔀 Router output rejected ({reason}), falling back to the synthesis model")
+        return None
+
+    def _timed(self, tier: str, call, raise_errors: bool = False) -> Tuple[Optional[AIMessage], Optional[str]]:
+        started = time.perf_counter()
+        try:
+            message = call()
+        except Exception as e:
+            with self._lock:
+                self.metrics[tier].errors += 1
+            if raise_errors:
+                raise
+            return None, f"error: {type(e).__name__}"
+        with self._lock:
+            self.metrics[tier].observe(time.perf_counter() - started, message)
+        return message, None
+
+    async def _atimed(self, tier: str, call, raise_errors: bool = False) -> Tuple[Optional[AIMessage], Optional[str]]:
+        started = time.perf_counter()
+        try:
+            message = await call
+        except Exception as e:
+            with self._lock:
+                self.metrics[tier].errors += 1
+            if raise_errors:
+                raise
+            return None, f"error: {type(e).__name__}"
+        with self._lock:
+            self.metrics[tier].observe(time.perf_counter() - started, message)
+        return message, None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tiers": {tier: metrics.as_dict() for tier, metrics in self.metrics.items()},
+                "fallbacks": dict(self.fallbacks),
+            }
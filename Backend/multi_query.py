@@ -0,0 +1,83 @@
+"""
+Multi-query retrieval over the knowledge base.
+
+All queries are embedded with a single `embed_documents` call. The searches
+then run concurrently against Atlas, or as one matrix multiply when a local
+vector index is configured.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from vector_index import LocalVectorIndex
+
+MAX_SEARCH_WORKERS = 8
+# Upper bounds for one batch request: queries embedded together and results per query
+MAX_BATCH_QUERIES = 20
+MAX_BATCH_K = 50
+
+
+class MultiQuerySearcher:
+    """Answers several queries with one embedding request"""
+
+    def __init__(self, embedding_model, vector_store=None, local_index: Optional[LocalVectorIndex] = None,
+                 max_workers: int = MAX_SEARCH_WORKERS):
+        if vector_store is None and local_index is None:
+            raise ValueError("Either vector_store or local_index must be provided")
+        self.embedding_model = embedding_model
+        self.vector_store = vector_store
+        self.local_index = local_index
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="multi-query")
+        self.last_timings: dict = {}
+
+    def _atlas_search(self, vector: List[float], k: int) -> List[Tuple[dict, float]]:
+        results = []
+        for doc, score in self.vector_store._similarity_search_with_score(vector, k=k):
+            record = dict(doc.metadata)
+            record["abstract"] = doc.page_content
+            results.append((record, score))
+        return results
+
+    def search_vectors(self, vectors: List[List[float]], k: int = 5) -> List[List[Tuple[dict, float]]]:
+        """Run one search per query vector and return (record, score) lists in query order"""
+        if self.local_index is not None:
+            return [
+                [(payload, score) for _, score, payload in hits]
+                for hits in self.local_index.search_many(vectors, k)
+            ]
+        return list(self.executor.map(lambda vector: self._atlas_search(vector, k), vectors))
+
+    def search(self, queries: List[str], k: int = 5) -> List[List[Tuple[dict, float]]]:
+        """Embed all queries in one request and return per-query results"""
+        if not queries:
+            return []
+        started = time.perf_counter()
+        vectors = self.embedding_model.embed_documents(queries)
+        embedded = time.perf_counter()
+        results = self.search_vectors(vectors, k)
+        self.last_timings = {
+            "queries": len(queries),
+            "embed_seconds": round(embedded - started, 4),
+            "search_seconds": round(time.perf_counter() - embedded, 4),
+        }
+        return results
+
+
+def union_results(results: List[List[Tuple[dict, float]]], queries: List[str], key: str = "id") -> List[dict]:
+    """
+    Deduplicated union of per-query results, ordered by best score. Each entry
+    records which queries matched it.
+    """
+    merged: dict = {}
+    for query, hits in zip(queries, results):
+        for record, score in hits:
+            record_id = record.get(key)
+            entry = merged.get(record_id)
+            if entry is None:
+                merged[record_id] = {"record": record, "score": score, "queries": [query]}
+            else:
+                entry["score"] = max(entry["score"], score)
+                if query not in entry["queries"]:
+                    entry["queries"].append(query)
+    return sorted(merged.values(), key=lambda entry: entry["score"], reverse=True)
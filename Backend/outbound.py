@@ -0,0 +1,469 @@
+"""
+Shared policy layer for outbound calls to arXiv, OpenAI and Fireworks.
+
+Every upstream gets a keep-alive connection pool, a token-bucket rate limiter,
+jittered retries bounded by the remaining request budget, and a circuit breaker
+that fails fast while the upstream is unhealthy. Queueing and retry time are
+recorded per upstream so they can be exposed as metrics.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.embeddings import Embeddings
+from langchain_fireworks import ChatFireworks
+from pydantic import Field
+
+# Absolute time.monotonic() deadline of the request being served, if any.
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# Set when the request being served has been abandoned, e.g. the client disconnected.
+# An Event rather than a flag so worker threads holding a copied context see it too.
+request_cancelled: ContextVar[Optional[threading.Event]] = ContextVar("request_cancelled", default=None)
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left before the current request deadline, or None without a deadline"""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def is_cancelled() -> bool:
+    cancelled = request_cancelled.get()
+    return cancelled is not None and cancelled.is_set()
+
+
+class DeadlineExceeded(Exception):
+    """The request budget ran out before the outbound call could complete"""
+
+
+class RequestCancelled(Exception):
+    """The request was abandoned, so outbound calls made for it are pointless"""
+
+
+class CircuitOpenError(Exception):
+    """The upstream's circuit breaker is open and calls are being rejected"""
+
+
+class RetryableStatusError(Exception):
+    """An upstream answered with a status code that is worth retrying"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"Upstream returned HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Decide whether a failed call may succeed when tried again"""
+    if isinstance(error, (RetryableStatusError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    # arxiv.HTTPError exposes `status`, openai/httpx errors expose `status_code`
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES
+    name = type(error).__name__
+    return name in {
+        "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+        "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError",
+        "UnexpectedEmptyPageError",
+    }
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def _release(self) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def available(self) -> float:
+        """Tokens that could be taken right now without waiting; negative while callers queue"""
+        with self._lock:
+            return min(self.capacity, self.tokens + (time.monotonic() - self.updated) * self.rate)
+
+    def acquire(self) -> float:
+        wait = self._reserve()
+        budget = remaining_budget()
+        if budget is not None and wait > budget:
+            self._release()
+            raise DeadlineExceeded(f"Rate limit wait of {wait:.2f}s exceeds the remaining budget")
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self) -> float:
+        wait = self._reserve()
+        budget = remaining_budget()
+        if budget is not None and wait > budget:
+            self._release()
+            raise DeadlineExceeded(f"Rate limit wait of {wait:.2f}s exceeds the remaining budget")
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single probe through after a cool-down"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> Optional[str]:
+        """The state a call is let through under ("closed" or "half_open" for the probe), or None"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return state
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return state
+            return None
+
+    def release_probe(self) -> None:
+        """Give the half-open slot back when the probe ends without a result, e.g. cancelled"""
+        with self._lock:
+            self.probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class UpstreamMetrics:
+    """Counters and timings for one upstream"""
+
+    def __init__(self):
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.retry_seconds = 0.0
+        self.call_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, **increments: float) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+            if "queue_seconds" in increments:
+                self.max_queue_seconds = max(self.max_queue_seconds, increments["queue_seconds"])
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "queue_seconds": round(self.queue_seconds, 4),
+                "max_queue_seconds": round(self.max_queue_seconds, 4),
+                "retry_seconds": round(self.retry_seconds, 4),
+                "avg_call_seconds": round(self.call_seconds / self.successes, 4) if self.successes else 0.0,
+            }
+
+
+class BudgetedHTTPAdapter(HTTPAdapter):
+    """Pooled adapter that applies the upstream timeout when the caller sets none"""
+
+    def __init__(self, upstream: "Upstream", **kwargs):
+        self.upstream = upstream
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.upstream.call_timeout()
+        return super().send(request, timeout=timeout, **kwargs)
+
+
+class Upstream:
+    """Outbound policy for one external service"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int = 1,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        timeout: float = 30.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        pool_size: int = 10,
+    ):
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.metrics = UpstreamMetrics()
+
+        # Keep-alive connection pool shared by every request to this upstream
+        self.session = requests.Session()
+        adapter = BudgetedHTTPAdapter(self, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def call_timeout(self) -> float:
+        """Per-attempt timeout, shortened to the remaining request budget"""
+        budget = remaining_budget()
+        if budget is None:
+            return self.timeout
+        if budget <= 0:
+            raise DeadlineExceeded(f"No budget left to call {self.name}")
+        return min(self.timeout, budget)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when given"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        budget = remaining_budget()
+        if budget is not None and delay >= budget:
+            raise DeadlineExceeded(f"Retry backoff for {self.name} exceeds the remaining budget") from error
+        return delay
+
+    def _check_cancelled(self) -> None:
+        if is_cancelled():
+            raise RequestCancelled(f"Request was cancelled before calling {self.name}")
+
+    def _admit(self, queued: float) -> bool:
+        """
+        Pass the circuit breaker once a rate-limit token is held, so a probe is never
+        stuck waiting for a token. Returns whether this attempt is the half-open probe.
+        """
+        admitted = self.breaker.allow()
+        if admitted is None:
+            self.bucket._release()
+            self.metrics.record(rejected=1)
+            raise CircuitOpenError(f"Circuit breaker for {self.name} is open")
+        self.metrics.record(calls=1, queue_seconds=queued)
+        return admitted == "half_open"
+
+    def _record_failure(self, error: Exception, attempt: int) -> bool:
+        """Update breaker and metrics for a failed attempt and return whether to retry"""
+        self.metrics.record(failures=1)
+        if not is_retryable(error):
+            # The upstream answered; a bad request says nothing about its health
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        return attempt < self.max_retries
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking outbound call under this upstream's policy"""
+        attempt = 0
+        while True:
+            self._check_cancelled()
+            probe = self._admit(self.bucket.acquire())
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not self._record_failure(e, attempt):
+                    raise
+                delay = self._backoff(attempt, e)
+                print(f"🔁 Retrying {self.name} in {delay:.2f}s after: {str(e)}")
+                time.sleep(delay)
+                self.metrics.record(retries=1, retry_seconds=delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled mid-call: no verdict on the upstream, but the probe slot must not leak
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            self.metrics.record(successes=1, call_seconds=time.monotonic() - started)
+            return result
+
+    async def acall(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run an awaitable outbound call under this upstream's policy"""
+        attempt = 0
+        while True:
+            self._check_cancelled()
+            probe = self._admit(await self.bucket.aacquire())
+            started = time.monotonic()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if not self._record_failure(e, attempt):
+                    raise
+                delay = self._backoff(attempt, e)
+                print(f"🔁 Retrying {self.name} in {delay:.2f}s after: {str(e)}")
+                await asyncio.sleep(delay)
+                self.metrics.record(retries=1, retry_seconds=delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled mid-call: no verdict on the upstream, but the probe slot must not leak
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            self.metrics.record(successes=1, call_seconds=time.monotonic() - started)
+            return result
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send an HTTP request through the pooled session under this upstream's policy"""
+        def send():
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                raise RetryableStatusError(response.status_code, parse_retry_after(response.headers.get("Retry-After")))
+            return response
+        return self.call(send)
+
+    def stats(self) -> dict:
+        stats = self.metrics.as_dict()
+        stats["circuit"] = self.breaker.state
+        return stats
+
+
+class GuardedEmbeddings(Embeddings):
+    """Embeddings wrapper that routes every embedding request through an Upstream"""
+
+    def __init__(self, inner: Embeddings, upstream: Upstream):
+        self.inner = inner
+        self.upstream = upstream
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.upstream.call(self.inner.embed_documents, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.upstream.call(self.inner.embed_query, text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.upstream.acall(self.inner.aembed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.upstream.acall(self.inner.aembed_query, text)
+
+
+class GuardedChatFireworks(ChatFireworks):
+    """ChatFireworks whose completions go through an Upstream"""
+
+    upstream: Any = Field(default=None, exclude=True)
+
+    def _generate(self, *args, **kwargs):
+        if self.upstream is None:
+            return super()._generate(*args, **kwargs)
+        return self.upstream.call(super()._generate, *args, **kwargs)
+
+    async def _agenerate(self, *args, **kwargs):
+        if self.upstream is None:
+            return await super()._agenerate(*args, **kwargs)
+        return await self.upstream.acall(super()._agenerate, *args, **kwargs)
+
+    # Streaming calls are retried only until the first chunk arrives
+
+    def _stream(self, *args, **kwargs):
+        parent = super()._stream
+        if self.upstream is None:
+            yield from parent(*args, **kwargs)
+            return
+
+        def start():
+            chunks = parent(*args, **kwargs)
+            return next(chunks, None), chunks
+
+        first, chunks = self.upstream.call(start)
+        if first is not None:
+            yield first
+            yield from chunks
+
+    async def _astream(self, *args, **kwargs):
+        parent = super()._astream
+        if self.upstream is None:
+            async for chunk in parent(*args, **kwargs):
+                yield chunk
+            return
+
+        async def start():
+            chunks = parent(*args, **kwargs)
+            try:
+                return await chunks.__anext__(), chunks
+            except StopAsyncIteration:
+                return None, chunks
+
+        first, chunks = await self.upstream.acall(start)
+        if first is not None:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+
+
+UPSTREAMS: Dict[str, Upstream] = {}
+
+
+def register_upstream(upstream: Upstream) -> Upstream:
+    UPSTREAMS[upstream.name] = upstream
+    return upstream
+
+
+def outbound_metrics() -> dict:
+    return {name: upstream.stats() for name, upstream in UPSTREAMS.items()}
@@ -0,0 +1,199 @@
+"""
+Passage-level indexing of full paper text.
+
+The knowledge collection only embeds abstracts, so questions about the methods
+or results inside a paper cannot be answered from it. This module splits the
+extracted text of a paper into overlapping chunks, batch-embeds them and stores
+them in a separate passage collection linked to the parent paper by `paper_id`.
+"""
+
+import time
+from dataclasses import dataclass, asdict
+from typing import Iterable, List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pymongo.operations import SearchIndexModel
+
+PASSAGE_COLLECTION_NAME = "knowledge_passages"
+PASSAGE_VECTOR_INDEX_NAME = "passage_vector_index"
+
+CHUNK_SIZE = 1200
+CHUNK_OVERLAP = 200
+EMBED_BATCH_SIZE = 64
+EMBEDDING_DIMENSIONS = 256
+# Upper bounds for passage search requests
+MAX_PASSAGE_K = 100
+MAX_PASSAGE_PAPERS = 20
+
+
+@dataclass
+class IngestionStats:
+    """Throughput counters for one ingestion run"""
+    papers: int = 0
+    chunks: int = 0
+    characters: int = 0
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.total_seconds if self.total_seconds else 0.0
+
+    def as_dict(self) -> dict:
+        stats = asdict(self)
+        stats["chunks_per_second"] = round(self.chunks_per_second, 2)
+        return stats
+
+
+class PassageIndexer:
+    """Chunks, embeds and searches full paper text stored in its own collection"""
+
+    def __init__(
+        self,
+        collection,
+        embedding_model,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_overlap: int = CHUNK_OVERLAP,
+        batch_size: int = EMBED_BATCH_SIZE,
+        index_name: str = PASSAGE_VECTOR_INDEX_NAME,
+    ):
+        self.collection = collection
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.index_name = index_name
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=["\n\n", "\n", ". ", " ", ""],
+        )
+
+    def ensure_indexes(self) -> None:
+        """Create the paper_id lookup index and the Atlas vector search index"""
+        self.collection.create_index([("paper_id", 1), ("chunk_index", 1)])
+        try:
+            existing = {index["name"] for index in self.collection.list_search_indexes()}
+            if self.index_name not in existing:
+                self.collection.create_search_index(SearchIndexModel(
+                    name=self.index_name,
+                    type="vectorSearch",
+                    definition={"fields": [
+                        {"type": "vector", "path": "embedding", "numDimensions": EMBEDDING_DIMENSIONS, "similarity": "cosine"},
+                        {"type": "filter", "path": "paper_id"},
+                    ]},
+                ))
+                print(f"📐 Created vector search index '{self.index_name}'")
+        except Exception as e:
+            print(f"⚠️  Could not create vector search index '{self.index_name}': {str(e)}")
+
+    def split(self, text: str) -> List[str]:
+        """Split extracted paper text into overlapping chunks"""
+        return [chunk for chunk in self.splitter.split_text(text or "") if chunk.strip()]
+
+    def ingest_papers(self, papers: Iterable[dict]) -> IngestionStats:
+        """
+        Index the full text of several papers.
+
+        Each paper is a dict with `id`, `text` and optionally `title`. Chunks from
+        all papers are embedded together in batches of `batch_size`, so small
+        papers do not each pay for a separate embedding request. Existing
+        passages of a paper are replaced.
+        """
+        stats = IngestionStats()
+        started = time.perf_counter()
+        pending: List[dict] = []
+
+        for paper in papers:
+            chunks = self.split(paper.get("text", ""))
+            if not chunks:
+                continue
+            self.collection.delete_many({"paper_id": paper["id"]})
+            stats.papers += 1
+            for chunk_index, chunk in enumerate(chunks):
+                stats.characters += len(chunk)
+                pending.append({
+                    "paper_id": paper["id"],
+                    "title": paper.get("title", ""),
+                    "chunk_index": chunk_index,
+                    "text": chunk,
+                })
+            while len(pending) >= self.batch_size:
+                self._write_batch(pending[:self.batch_size], stats)
+                pending = pending[self.batch_size:]
+
+        if pending:
+            self._write_batch(pending, stats)
+
+        stats.total_seconds = time.perf_counter() - started
+        return stats
+
+    def _write_batch(self, batch: List[dict], stats: IngestionStats) -> None:
+        embed_started = time.perf_counter()
+        embeddings = self.embedding_model.embed_documents([passage["text"] for passage in batch])
+        stats.embed_seconds += time.perf_counter() - embed_started
+
+        for passage, embedding in zip(batch, embeddings):
+            passage["embedding"] = embedding
+
+        write_started = time.perf_counter()
+        self.collection.insert_many(batch, ordered=False)
+        stats.write_seconds += time.perf_counter() - write_started
+        stats.chunks += len(batch)
+
+    def index_size(self) -> dict:
+        """Report the storage footprint of the passage collection"""
+        stats = self.collection.database.command("collStats", self.collection.name)
+        return {
+            "passages": stats.get("count", 0),
+            "papers": len(self.collection.distinct("paper_id")),
+            "data_bytes": stats.get("size", 0),
+            "storage_bytes": stats.get("storageSize", 0),
+            "index_bytes": stats.get("totalIndexSize", 0),
+            "avg_passage_bytes": stats.get("avgObjSize", 0),
+        }
+
+    def search(self, query: str, k: int = 20, max_papers: int = 5, paper_id: Optional[str] = None) -> List[dict]:
+        """
+        Search passages and group the hits by parent paper.
+
+        Returns at most `max_papers` papers ordered by their best passage score,
+        each with the matching passages in score order.
+        """
+        query_vector = self.embedding_model.embed_query(query)
+        vector_search = {
+            "index": self.index_name,
+            "path": "embedding",
+            "queryVector": query_vector,
+            "numCandidates": k * 10,
+            "limit": k,
+        }
+        if paper_id:
+            vector_search["filter"] = {"paper_id": paper_id}
+
+        hits = self.collection.aggregate([
+            {"$vectorSearch": vector_search},
+            {"$project": {
+                "_id": 0,
+                "paper_id": 1,
+                "title": 1,
+                "chunk_index": 1,
+                "text": 1,
+                "score": {"$meta": "vectorSearchScore"},
+            }},
+        ])
+
+        grouped: dict[str, dict] = {}
+        for hit in hits:
+            paper = grouped.setdefault(hit["paper_id"], {
+                "paper_id": hit["paper_id"],
+                "title": hit.get("title", ""),
+                "score": hit["score"],
+                "passages": [],
+            })
+            paper["passages"].append({
+                "chunk_index": hit["chunk_index"],
+                "text": hit["text"],
+                "score": hit["score"],
+            })
+
+        return sorted(grouped.values(), key=lambda paper: paper["score"], reverse=True)[:max_papers]
@@ -0,0 +1,244 @@
+"""
+Speculative prefetch of paper details.
+
+After a search returns a list, the usual next step is "tell me about paper N",
+which needs an arXiv lookup limited to one request every three seconds. The
+prefetcher fetches the top results in one batched arXiv request on a
+background thread, using only rate-limit tokens that foreground calls are not
+waiting for. Each session keeps only its latest batch: a newer search bumps
+the session's generation, dropping a queued batch and cancelling one in flight.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from outbound import TokenBucket, request_cancelled
+from query_log import is_arxiv_id
+from result_cache import LatencyHistogram
+
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFETCH_TOP_N = int(os.environ.get("PREFETCH_TOP_N", "3"))
+# How long a batch waits for a spare rate-limit token before it is dropped
+PREFETCH_MAX_WAIT_SECONDS = float(os.environ.get("PREFETCH_MAX_WAIT_SECONDS", "10"))
+PREFETCH_MAX_PENDING = 64
+TRACKED_CAPACITY = 4096
+IDLE_POLL_SECONDS = 0.1
+
+
+class _Batch:
+    __slots__ = ("key", "generation", "arxiv_ids", "cancelled")
+
+    def __init__(self, key: str, generation: int, arxiv_ids: List[str]):
+        self.key = key
+        self.generation = generation
+        self.arxiv_ids = arxiv_ids
+        self.cancelled = threading.Event()
+
+
+class Prefetcher:
+    """Background detail fetches for the top results of each session's latest search"""
+
+    def __init__(
+        self,
+        fetch_many: Callable[[List[str]], Dict[str, dict]],
+        is_cached: Callable[[str], bool],
+        bucket: Optional[TokenBucket] = None,
+        top_n: int = PREFETCH_TOP_N,
+        max_wait: float = PREFETCH_MAX_WAIT_SECONDS,
+    ):
+        self.fetch_many = fetch_many
+        self.is_cached = is_cached
+        self.bucket = bucket
+        self.top_n = top_n
+        self.max_wait = max_wait
+        self._generations: Dict[str, int] = {}
+        self._pending: "OrderedDict[str, _Batch]" = OrderedDict()
+        self._in_flight: Dict[str, _Batch] = {}
+        self._scheduled: Dict[str, int] = {}
+        # arXiv ID -> seconds the background fetch took, until a follow-up uses it
+        self._prefetched: "OrderedDict[str, float]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.counts = {
+            "batches": 0, "cancelled": 0, "dropped_busy": 0, "errors": 0,
+            "prefetched": 0, "already_cached": 0, "hits": 0, "late": 0, "misses": 0,
+        }
+        self.prefetch_seconds = 0.0
+        self.cold_latency = LatencyHistogram()
+
+    def schedule(self, key: Optional[str], arxiv_ids: Sequence[str]) -> int:
+        """Replace the session's pending batch with the top results of its latest search"""
+        key = key or "anonymous"
+        # Fallback IDs such as "paper-1" would only cost a failed arXiv request
+        arxiv_ids = list(dict.fromkeys(
+            str(arxiv_id) for arxiv_id in arxiv_ids if arxiv_id and is_arxiv_id(str(arxiv_id))
+        ))[:self.top_n]
+        with self._condition:
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            self._cancel_locked(key)
+            if arxiv_ids:
+                self._pending[key] = _Batch(key, generation, arxiv_ids)
+                for arxiv_id in arxiv_ids:
+                    self._scheduled[arxiv_id] = self._scheduled.get(arxiv_id, 0) + 1
+                while len(self._pending) > PREFETCH_MAX_PENDING:
+                    _, oldest = self._pending.popitem(last=False)
+                    self._unschedule_locked(oldest)
+                    self.counts["cancelled"] += 1
+                self._condition.notify()
+            return generation
+
+    def cancel(self, key: Optional[str]) -> None:
+        with self._condition:
+            self._cancel_locked(key or "anonymous")
+
+    def _cancel_locked(self, key: str) -> None:
+        batch = self._pending.pop(key, None)
+        if batch is not None:
+            self._unschedule_locked(batch)
+            self.counts["cancelled"] += 1
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None and not in_flight.cancelled.is_set():
+            in_flight.cancelled.set()
+            self.counts["cancelled"] += 1
+
+    def _unschedule_locked(self, batch: _Batch) -> None:
+        for arxiv_id in batch.arxiv_ids:
+            remaining = self._scheduled.get(arxiv_id, 0) - 1
+            if remaining > 0:
+                self._scheduled[arxiv_id] = remaining
+            else:
+                self._scheduled.pop(arxiv_id, None)
+
+    def _current(self, batch: _Batch) -> bool:
+        return not batch.cancelled.is_set() and self._generations.get(batch.key) == batch.generation \
+            and not self._stopping
+
+    def _wait_for_spare_token(self, batch: _Batch) -> bool:
+        """Wait until a token is free, so foreground calls never queue behind a prefetch"""
+        if self.bucket is None:
+            return True
+        deadline = time.monotonic() + self.max_wait
+        while self._current(batch):
+            if self.bucket.available() >= 1:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            batch.cancelled.wait(IDLE_POLL_SECONDS)
+        return False
+
+    def _run(self, batch: _Batch) -> None:
+        missing = [arxiv_id for arxiv_id in batch.arxiv_ids if not self.is_cached(arxiv_id)]
+        with self._condition:
+            self.counts["already_cached"] += len(batch.arxiv_ids) - len(missing)
+        if not missing:
+            return
+        if not self._wait_for_spare_token(batch):
+            if not batch.cancelled.is_set():  # cancellations are counted when requested
+                with self._condition:
+                    self.counts["dropped_busy"] += 1
+            return
+
+        # Upstream calls stop at their next attempt once the batch is cancelled
+        token = request_cancelled.set(batch.cancelled)
+        started = time.perf_counter()
+        try:
+            found = self.fetch_many(missing)
+        except Exception as e:
+            if not batch.cancelled.is_set():
+                with self._condition:
+                    self.counts["errors"] += 1
+                print(f"⚠️  Prefetch of {missing} failed: {str(e)}")
+            return
+        finally:
+            request_cancelled.reset(token)
+        seconds = time.perf_counter() - started
+
+        with self._condition:
+            self.counts["batches"] += 1
+            self.counts["prefetched"] += len(found)
+            self.prefetch_seconds += seconds
+            for arxiv_id in found:
+                self._prefetched[arxiv_id] = seconds
+                self._prefetched.move_to_end(arxiv_id)
+            while len(self._prefetched) > TRACKED_CAPACITY:
+                self._prefetched.popitem(last=False)
+        print(f"📥 Prefetched {len(found)}/{len(missing)} papers for {batch.key} in {seconds:.2f}s")
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                key, batch = self._pending.popitem(last=False)
+                self._in_flight[key] = batch
+            try:
+                if self._current(batch):
+                    self._run(batch)
+            finally:
+                with self._condition:
+                    if self._in_flight.get(key) is batch:
+                        del self._in_flight[key]
+                    self._unschedule_locked(batch)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._worker, name="prefetch", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._stopping = True
+            for batch in self._in_flight.values():
+                batch.cancelled.set()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def observe(self, arxiv_id: str, cached: bool, seconds: float) -> str:
+        """
+        Record a follow-up detail lookup: a hit if a prefetch put it in the cache,
+        late if a prefetch was still pending, otherwise a miss. Returns the outcome.
+        """
+        with self._condition:
+            if cached:
+                if self._prefetched.pop(arxiv_id, None) is None:
+                    return "cached"
+                outcome = "hits"
+            else:
+                outcome = "late" if arxiv_id in self._scheduled else "misses"
+                self.cold_latency.observe(seconds)
+            self.counts[outcome] += 1
+            return outcome
+
+    def _saved_seconds(self) -> Tuple[float, str]:
+        """Follow-up latency saved: hits times the mean cold lookup, or the mean prefetch if none was seen"""
+        if self.cold_latency.total:
+            return self.counts["hits"] * self.cold_latency.sum_ms / self.cold_latency.total / 1000, "cold_lookups"
+        if self.counts["batches"]:
+            return self.counts["hits"] * self.prefetch_seconds / self.counts["batches"], "prefetch_fetches"
+        return 0.0, "none"
+
+    def stats(self) -> dict:
+        with self._condition:
+            counts = dict(self.counts)
+            follow_ups = counts["hits"] + counts["late"] + counts["misses"]
+            saved, basis = self._saved_seconds()
+            return {
+                **counts,
+                "pending": len(self._pending),
+                "hit_ratio": round(counts["hits"] / follow_ups, 4) if follow_ups else 0.0,
+                "used_ratio": round(counts["hits"] / counts["prefetched"], 4) if counts["prefetched"] else 0.0,
+                "saved_seconds": round(saved, 3),
+                "saved_seconds_basis": basis,
+                "cold_latency": self.cold_latency.as_dict(),
+            }
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Server-side query log and cache warmup.
+
+Searches from `/api/search` and the `knowledge_base` tool, and the paper IDs
+they return or that are opened, are logged to MongoDB (or only counted in
+process when no collection is given). After a deploy the most frequent
+queries and papers are replayed concurrently to warm the result cache,
+embeddings and arXiv cache before readiness reports healthy.
+
+Run as a script to warm an already running server over HTTP:
+
+    python query_log.py --base-url http://localhost:8000 --top 50
+"""
+
+import argparse
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+from result_cache import normalize_query
+
+QUERY_LOG_COLLECTION_NAME = "query_log"
+QUERY_LOG_TTL_DAYS = int(os.environ.get("QUERY_LOG_TTL_DAYS", "30"))
+QUERY_LOG_FLUSH_SECONDS = float(os.environ.get("QUERY_LOG_FLUSH_SECONDS", "5"))
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+WARMUP_TOP_QUERIES = int(os.environ.get("WARMUP_TOP_QUERIES", "50"))
+WARMUP_TOP_PAPERS = int(os.environ.get("WARMUP_TOP_PAPERS", "50"))
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", "4"))
+# Readiness is reported after this long even if the replay has not finished
+WARMUP_MAX_SECONDS = float(os.environ.get("WARMUP_MAX_SECONDS", "120"))
+# Requests carrying this header are replays and are not logged again
+WARMUP_HEADER = "X-Warmup"
+
+SEARCH = "search"
+KNOWLEDGE_BASE = "knowledge_base"
+PAPER = "paper"
+
+# New-style IDs, also with the leading zero the knowledge base drops (704.0001), and old-style IDs
+ARXIV_ID_PATTERN = re.compile(r"^(\d{3,4}\.\d{4,5}|[a-z][a-z\-]*(\.[A-Z]{2})?/\d{7})(v\d+)?$")
+
+
+def is_arxiv_id(paper_id: str) -> bool:
+    """Whether an ID can be replayed against arXiv; fallback IDs such as "paper-1" cannot"""
+    return bool(ARXIV_ID_PATTERN.match(paper_id))
+
+
+class QueryLog:
+    """Buffered query log with in-process counters and an optional MongoDB collection"""
+
+    def __init__(self, collection=None, ttl_days: int = QUERY_LOG_TTL_DAYS,
+                 flush_seconds: float = QUERY_LOG_FLUSH_SECONDS):
+        self.collection = collection
+        self.ttl_days = ttl_days
+        self.flush_seconds = flush_seconds
+        self.queries: Counter = Counter()
+        self.papers: Counter = Counter()
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.logged = 0
+        self.flushed = 0
+        self.flush_errors = 0
+
+    def ensure_indexes(self) -> None:
+        if self.collection is None:
+            return
+        self.collection.create_index("CreatedAt", expireAfterSeconds=self.ttl_days * 24 * 3600)
+
+    def record(self, source: str, query: str = "", paper_ids: Sequence[str] = ()) -> None:
+        """Log one search or paper view; cheap enough to call on the request path"""
+        query = normalize_query(query) if query else ""
+        paper_ids = [str(paper_id) for paper_id in paper_ids if paper_id and is_arxiv_id(str(paper_id))]
+        with self._lock:
+            if query:
+                self.queries[query] += 1
+            self.papers.update(paper_ids)
+            self.logged += 1
+            if self.collection is not None:
+                self._pending.append({
+                    "source": source,
+                    "query": query,
+                    "paper_ids": paper_ids,
+                    "CreatedAt": datetime.now(timezone.utc),
+                })
+
+    def flush(self) -> int:
+        """Write buffered entries to MongoDB; returns how many were written"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending or self.collection is None:
+            return 0
+        try:
+            self.collection.insert_many(pending, ordered=False)
+        except Exception as e:
+            with self._lock:
+                self.flush_errors += 1
+            print(f"⚠️  Could not write {len(pending)} query log entries: {str(e)}")
+            return 0
+        with self._lock:
+            self.flushed += len(pending)
+        return len(pending)
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def start(self) -> None:
+        if self.collection is None or self._flusher is not None:
+            return
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="query-log-flusher", daemon=True)
+        self._flusher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.flush_seconds + 1)
+            self._flusher = None
+        self.flush()
+
+    def _since(self, days: Optional[int]) -> dict:
+        days = self.ttl_days if days is None else days
+        return {"CreatedAt": {"$gte": datetime.now(timezone.utc) - timedelta(days=days)}}
+
+    def top_queries(self, n: int = WARMUP_TOP_QUERIES, days: Optional[int] = None) -> List[str]:
+        """Most frequent normalized queries, from MongoDB when available"""
+        if self.collection is None:
+            with self._lock:
+                return [query for query, _ in self.queries.most_common(n)]
+        pipeline = [
+            {"$match": {**self._since(days), "source": {"$in": [SEARCH, KNOWLEDGE_BASE]}, "query": {"$ne": ""}}},
+            {"$group": {"_id": "$query", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": n},
+        ]
+        return [row["_id"] for row in self.collection.aggregate(pipeline)]
+
+    def top_papers(self, n: int = WARMUP_TOP_PAPERS, days: Optional[int] = None) -> List[str]:
+        """Paper IDs most often returned by searches or opened"""
+        if self.collection is None:
+            with self._lock:
+                return [paper_id for paper_id, _ in self.papers.most_common(n)]
+        pipeline = [
+            {"$match": self._since(days)},
+            {"$unwind": "$paper_ids"},
+            {"$group": {"_id": "$paper_ids", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": n},
+        ]
+        return [row["_id"] for row in self.collection.aggregate(pipeline)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "logged": self.logged,
+                "flushed": self.flushed,
+                "pending": len(self._pending),
+                "flush_errors": self.flush_errors,
+                "distinct_queries": len(self.queries),
+                "distinct_papers": len(self.papers),
+            }
+
+
+def warm_caches(
+    queries: Sequence[str],
+    paper_ids: Sequence[str],
+    warm_query: Callable[[str], object],
+    warm_paper: Callable[[str], object],
+    concurrency: int = WARMUP_CONCURRENCY,
+    max_seconds: float = WARMUP_MAX_SECONDS,
+) -> dict:
+    """
+    Replay queries and paper lookups on `concurrency` threads. Rate limits are
+    left to the callables (the upstream token buckets or the CLI's own).
+    Returns after at most `max_seconds`: anything not started by then is
+    skipped, and anything still running is counted as unfinished and left to
+    complete in the background.
+    """
+    started = time.monotonic()
+    report: Dict[str, Dict[str, int]] = {
+        kind: {"total": len(items), "warmed": 0, "failed": 0, "skipped": 0}
+        for kind, items in (("queries", queries), ("papers", paper_ids))
+    }
+    lock = threading.Lock()
+
+    def run(kind: str, warm: Callable[[str], object], item: str) -> None:
+        if time.monotonic() - started > max_seconds:
+            outcome = "skipped"
+        else:
+            try:
+                warm(item)
+                outcome = "warmed"
+            except Exception as e:
+                print(f"⚠️  Warmup failed for '{item}' ({kind}): {str(e)}")
+                outcome = "failed"
+        with lock:
+            report[kind][outcome] += 1
+
+    # Queries first: they are cheap and cover the most traffic, papers may wait on arXiv
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="warmup")
+    futures = {pool.submit(run, "queries", warm_query, query): "queries" for query in queries}
+    futures.update({pool.submit(run, "papers", warm_paper, paper_id): "papers" for paper_id in paper_ids})
+    wait(futures, timeout=None if max_seconds == float("inf") else max(0.0, max_seconds - (time.monotonic() - started)))
+    # Don't join stragglers: a slow arXiv fetch must not hold back readiness
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    with lock:
+        for future, kind in futures.items():
+            if future.cancelled():
+                report[kind]["skipped"] += 1
+        result = {
+            kind: {**counts, "unfinished": counts["total"] - counts["warmed"] - counts["failed"] - counts["skipped"]}
+            for kind, counts in report.items()
+        }
+    return {**result, "seconds": round(time.monotonic() - started, 3)}
+
+
+class Readiness:
+    """Startup state reported by the readiness endpoint"""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.report: Optional[dict] = None
+        self.error: Optional[str] = None
+
+    def begin(self) -> None:
+        self.ready = False
+        self.started_at = time.time()
+
+    def finish(self, report: Optional[dict] = None, error: Optional[str] = None) -> None:
+        self.report = report
+        self.error = error
+        self.ready = True
+
+    def as_dict(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "warming",
+            "warmup": self.report,
+            "error": self.error,
+        }
+
+
+def main() -> None:
+    """Warm a running server by replaying the logged top queries and papers over HTTP"""
+    import requests
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    from outbound import TokenBucket
+
+    parser = argparse.ArgumentParser(description="Replay the most frequent logged queries against a running server")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--database", default="agent_demo")
+    parser.add_argument("--top", type=int, default=WARMUP_TOP_QUERIES, help="number of queries to replay")
+    parser.add_argument("--top-papers", type=int, default=WARMUP_TOP_PAPERS, help="number of papers to replay")
+    parser.add_argument("--days", type=int, default=QUERY_LOG_TTL_DAYS, help="log window to aggregate")
+    parser.add_argument("--concurrency", type=int, default=WARMUP_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=5.0, help="requests per second sent to the server")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = MongoClient(os.environ["MONGO_URI"])
+    query_log = QueryLog(client.get_database(args.database).get_collection(QUERY_LOG_COLLECTION_NAME))
+    queries = query_log.top_queries(args.top, days=args.days)
+    paper_ids = query_log.top_papers(args.top_papers, days=args.days)
+    print(f"🔥 Replaying {len(queries)} queries and {len(paper_ids)} papers against {args.base_url}")
+
+    bucket = TokenBucket(args.rate, burst=max(1, args.concurrency))
+    session = requests.Session()
+    headers = {WARMUP_HEADER: "1"}
+
+    def get(path: str, **params) -> None:
+        bucket.acquire()
+        response = session.get(f"{args.base_url.rstrip('/')}{path}", params=params, headers=headers, timeout=60)
+        if response.status_code >= 500:
+            response.raise_for_status()
+
+    report = warm_caches(
+        queries, paper_ids,
+        warm_query=lambda query: get("/api/search", query=query),
+        warm_paper=lambda paper_id: get(f"/api/papers/{paper_id}"),
+        concurrency=args.concurrency,
+        max_seconds=float("inf"),
+    )
+    print(f"✅ Warmup finished: {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+"More like this" lookups using the embeddings already stored in the knowledge collection.
+
+The stored vector of the source paper is fed straight into `$vectorSearch`, so
+no new embedding request is made. An optional nearest-neighbour table,
+refreshed at ingestion, serves papers in constant time with a single lookup.
+"""
+
+import re
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from pymongo import ReplaceOne
+
+from vector_index import LocalVectorIndex
+
+RELATED_COLLECTION_NAME = "related_papers"
+NEIGHBOURS_PER_PAPER = 10
+REFRESH_BATCH_SIZE = 256
+
+PAPER_FIELDS = ["id", "title", "authors", "abstract", "categories", "update_date"]
+
+
+def id_candidates(arxiv_id: str) -> List[str]:
+    """IDs a paper may be stored under; knowledge base IDs drop leading zeros, e.g. 704.0001"""
+    base_id = re.sub(r'v\d+$', '', arxiv_id.strip())
+    return list(dict.fromkeys([arxiv_id.strip(), base_id, base_id.lstrip('0')]))
+
+
+class RelatedPapers:
+    """Finds papers similar to a given one from its stored embedding"""
+
+    def __init__(self, collection, related_collection=None, index_name: str = "vector_index",
+                 embedding_key: str = "embedding"):
+        self.collection = collection
+        self.related_collection = related_collection
+        self.index_name = index_name
+        self.embedding_key = embedding_key
+        self.table_hits = 0
+        self.vector_searches = 0
+
+    def stored_paper(self, arxiv_id: str) -> Optional[dict]:
+        """The knowledge record of a paper including its embedding"""
+        projection = {field: 1 for field in PAPER_FIELDS + [self.embedding_key]}
+        projection["_id"] = 0
+        return self.collection.find_one({"id": {"$in": id_candidates(arxiv_id)}}, projection)
+
+    def search_by_vector(self, vector: List[float], k: int, exclude_id: str) -> List[Tuple[dict, float]]:
+        """Vector search with a stored embedding, leaving out the source paper"""
+        projection = {field: 1 for field in PAPER_FIELDS}
+        projection.update({"_id": 0, "score": {"$meta": "vectorSearchScore"}})
+        hits = self.collection.aggregate([
+            {"$vectorSearch": {
+                "index": self.index_name,
+                "path": self.embedding_key,
+                "queryVector": vector,
+                "numCandidates": (k + 1) * 10,
+                "limit": k + 1,
+            }},
+            {"$project": projection},
+        ])
+        results = [(hit, hit.pop("score")) for hit in hits if hit.get("id") != exclude_id]
+        return results[:k]
+
+    def related(self, arxiv_id: str, k: int = 5) -> Optional[Tuple[List[Tuple[dict, float]], str]]:
+        """
+        Return ([(record, score)], source) for the papers most similar to
+        `arxiv_id`, or None when the paper is not in the knowledge base.
+        """
+        if self.related_collection is not None:
+            entry = self.related_collection.find_one({"_id": {"$in": id_candidates(arxiv_id)}})
+            if entry and len(entry["neighbours"]) >= k:
+                self.table_hits += 1
+                return [(neighbour, neighbour.pop("score")) for neighbour in entry["neighbours"][:k]], "precomputed"
+
+        paper = self.stored_paper(arxiv_id)
+        if not paper or not paper.get(self.embedding_key):
+            return None
+        self.vector_searches += 1
+        return self.search_by_vector(paper[self.embedding_key], k, exclude_id=paper["id"]), "vector"
+
+    def refresh(self, arxiv_ids: Optional[Iterable[str]] = None, k: int = NEIGHBOURS_PER_PAPER) -> dict:
+        """
+        Recompute the nearest-neighbour table, for all papers or only `arxiv_ids`.
+        Neighbours are found with batched matrix multiplies over all stored
+        embeddings rather than one vector search per paper.
+        """
+        if self.related_collection is None:
+            raise ValueError("No related_collection configured for the neighbour table")
+
+        started = time.perf_counter()
+        projection = {field: 1 for field in PAPER_FIELDS + [self.embedding_key]}
+        projection["_id"] = 0
+        index = None
+        for record in self.collection.find({self.embedding_key: {"$exists": True}}, projection):
+            vector = record.pop(self.embedding_key)
+            if index is None:
+                index = LocalVectorIndex(dimensions=len(vector))
+            index.add(str(record["id"]), vector, record)
+        if index is None:
+            return {"papers": 0, "seconds": 0.0}
+
+        targets = [str(arxiv_id) for arxiv_id in arxiv_ids] if arxiv_ids is not None else index.ids()
+        targets = [arxiv_id for arxiv_id in targets if arxiv_id in index]
+        updated_at = datetime.now(timezone.utc)
+
+        for start in range(0, len(targets), REFRESH_BATCH_SIZE):
+            batch = targets[start:start + REFRESH_BATCH_SIZE]
+            vectors = [index.get_vector(arxiv_id) for arxiv_id in batch]
+            writes = []
+            for arxiv_id, hits in zip(batch, index.search_many(vectors, k + 1)):
+                neighbours = [
+                    {**payload, "score": score}
+                    for neighbour_id, score, payload in hits if neighbour_id != arxiv_id
+                ][:k]
+                writes.append(ReplaceOne({"_id": arxiv_id}, {"neighbours": neighbours, "updated_at": updated_at}, upsert=True))
+            self.related_collection.bulk_write(writes, ordered=False)
+
+        seconds = time.perf_counter() - started
+        print(f"🔗 Refreshed related papers for {len(targets)} papers in {seconds:.1f}s")
+        return {"papers": len(targets), "seconds": round(seconds, 2)}
+
+    def stats(self) -> dict:
+        return {"table_hits": self.table_hits, "vector_searches": self.vector_searches}
@@ -0,0 +1,283 @@
+"""
+Result cache for knowledge base searches.
+
+Entries are keyed on the normalized query, k and filters together with the
+knowledge index version. The version lives in the `knowledge_meta` collection
+and is bumped by ingestion, so a bump invalidates every cached result at once
+without scanning or deleting anything. Each worker keeps an in-process LRU in
+front of an optional shared tier (MongoDB or a local directory) so workers can
+reuse each other's results.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, Tuple
+
+import orjson
+
+KNOWLEDGE_META_COLLECTION_NAME = "knowledge_meta"
+RESULT_CACHE_COLLECTION_NAME = "result_cache"
+RESULT_CACHE_SHARED = os.environ.get("RESULT_CACHE_SHARED", "")  # "", "mongo" or "file"
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", ".result_cache")
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get("RESULT_CACHE_TTL_SECONDS", str(24 * 3600)))
+# How long a worker trusts its copy of the index version before re-reading it
+VERSION_REFRESH_SECONDS = float(os.environ.get("VERSION_REFRESH_SECONDS", "2"))
+DEFAULT_CAPACITY = 1024
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf")]
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+def cache_key(namespace: str, query: str, k: int, filters: Optional[dict], version: int) -> str:
+    raw = orjson.dumps(
+        [namespace, normalize_query(query), k, filters or {}, version],
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.sha256(raw).hexdigest()
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.total = 0
+        self.sum_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum_ms += ms
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.total:
+            return 0.0
+        threshold = fraction * self.total
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= threshold:
+                return bound
+        return LATENCY_BUCKETS_MS[-1]
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.total,
+            "mean_ms": round(self.sum_ms / self.total, 3) if self.total else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "buckets": {
+                ("inf" if bound == float("inf") else f"le_{bound}ms"): count
+                for bound, count in zip(LATENCY_BUCKETS_MS, self.counts)
+            },
+        }
+
+
+class IndexVersion:
+    """Knowledge index version stored in MongoDB and bumped at ingestion"""
+
+    DOCUMENT_ID = "knowledge_index"
+
+    def __init__(self, collection=None, refresh_seconds: float = VERSION_REFRESH_SECONDS):
+        self.collection = collection
+        self.refresh_seconds = refresh_seconds
+        self._version = 0
+        self._read_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        with self._lock:
+            if self.collection is None or time.monotonic() - self._read_at < self.refresh_seconds:
+                return self._version
+        try:
+            document = self.collection.find_one({"_id": self.DOCUMENT_ID})
+            version = document["version"] if document else 0
+        except Exception as e:
+            print(f"⚠️  Could not read knowledge index version: {str(e)}")
+            return self._version
+        with self._lock:
+            self._version = version
+            self._read_at = time.monotonic()
+        return version
+
+    def bump(self) -> int:
+        """Invalidate every cached result; call after the knowledge collection changes"""
+        with self._lock:
+            if self.collection is None:
+                self._version += 1
+                return self._version
+        document = self.collection.find_one_and_update(
+            {"_id": self.DOCUMENT_ID},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+            return_document=True,
+        )
+        with self._lock:
+            self._version = document["version"]
+            self._read_at = time.monotonic()
+        print(f"🔖 Knowledge index version bumped to {self._version}")
+        return self._version
+
+
+class MongoResultTier:
+    """Shared tier in a MongoDB collection; stale versions age out through a TTL index"""
+
+    name = "mongo"
+
+    def __init__(self, collection, ttl_seconds: int = RESULT_CACHE_TTL_SECONDS):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+    def ensure_indexes(self) -> None:
+        self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+
+    def get(self, key: str) -> Optional[Any]:
+        document = self.collection.find_one({"_id": key}, {"value": 1})
+        return orjson.loads(document["value"]) if document else None
+
+    def put(self, key: str, value: Any) -> None:
+        self.collection.replace_one(
+            {"_id": key},
+            {"value": orjson.dumps(value), "created_at": datetime.now(timezone.utc)},
+            upsert=True,
+        )
+
+
+class FileResultTier:
+    """Shared tier for workers on one host, one JSON file per entry"""
+
+    name = "file"
+
+    def __init__(self, directory: str = RESULT_CACHE_DIR, ttl_seconds: int = RESULT_CACHE_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def ensure_indexes(self) -> None:
+        self.prune()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(orjson.dumps(value))
+        os.replace(temporary, path)
+
+    def prune(self) -> int:
+        """Delete entries older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+class VersionedResultCache:
+    """In-process LRU over an optional shared tier, tagged with the knowledge index version"""
+
+    def __init__(self, version: IndexVersion, shared=None, capacity: int = DEFAULT_CAPACITY):
+        self.version = version
+        self.shared = shared
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "shared": 0}
+        self.misses = 0
+        self.latency = {"memory": LatencyHistogram(), "shared": LatencyHistogram(), "compute": LatencyHistogram()}
+
+    def _remember(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def _observe(self, tier: str, started: float) -> None:
+        with self._lock:
+            self.latency[tier].observe(time.perf_counter() - started)
+
+    def get_or_compute(
+        self,
+        namespace: str,
+        query: str,
+        k: int,
+        compute: Callable[[], Any],
+        filters: Optional[dict] = None,
+    ) -> Tuple[Any, str]:
+        """Return (value, tier) where tier is "memory", "shared" or "compute" """
+        started = time.perf_counter()
+        key = cache_key(namespace, query, k, filters, self.version.current())
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits["memory"] += 1
+                value = self._entries[key]
+                self.latency["memory"].observe(time.perf_counter() - started)
+                return value, "memory"
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                print(f"⚠️  Could not read shared result cache: {str(e)}")
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits["shared"] += 1
+                self._observe("shared", started)
+                return value, "shared"
+
+        value = compute()
+        self._remember(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.put(key, value)
+            except Exception as e:
+                print(f"⚠️  Could not write shared result cache: {str(e)}")
+        with self._lock:
+            self.misses += 1
+        self._observe("compute", started)
+        return value, "compute"
+
+    def stats(self) -> dict:
+        version = self.version.current()
+        with self._lock:
+            lookups = sum(self.hits.values()) + self.misses
+            return {
+                "version": version,
+                "entries": len(self._entries),
+                "shared_tier": self.shared.name if self.shared is not None else None,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": round(sum(self.hits.values()) / lookups, 4) if lookups else 0.0,
+                "latency": {tier: histogram.as_dict() for tier, histogram in self.latency.items()},
+            }
@@ -0,0 +1,176 @@
+"""
+Chat history stored as one document per session.
+
+`MongoDBChatMessageHistory` keeps one document per message holding a JSON
+string, so a turn costs a write per message and rebuilding `chat_history`
+scans and decodes every document of the session. Here a session is a single
+document in `session_history`: a turn is appended with one atomic `$push`
+(which also trims the stored array and pushes the expiry forward), and the
+recent tail is read with a `$slice` projection, so neither depends on how
+long the session has run. Messages are stored as BSON, not JSON strings.
+
+Selected with `HISTORY_BACKEND=session`; `migrate` copies sessions over from
+the per-message store.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import List, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from history_store import HISTORY_MAX_MESSAGES, HISTORY_TTL_SECONDS, LATENCY_SAMPLES, SESSION_KEY, percentile
+
+HISTORY_BACKEND = os.environ.get("HISTORY_BACKEND", "messages").lower()
+SESSION_HISTORY_COLLECTION_NAME = "session_history"
+# Messages returned as chat history
+SESSION_HISTORY_WINDOW = int(os.environ.get("SESSION_HISTORY_WINDOW", str(HISTORY_MAX_MESSAGES)))
+# Messages kept per session document, well below the 16 MB document limit
+SESSION_HISTORY_MAX_STORED = int(os.environ.get("SESSION_HISTORY_MAX_STORED", "1000"))
+
+MESSAGES_KEY = "Messages"
+
+
+class SessionDocumentHistory(BaseChatMessageHistory):
+    """Chat history of one session, kept in a single document"""
+
+    def __init__(self, store: "SessionHistoryStore", session_id: str):
+        self.store = store
+        self.session_id = session_id
+
+    @property
+    def messages(self) -> List[BaseMessage]:  # type: ignore
+        """The latest `window` messages, read with one `$slice` projection"""
+        started = time.perf_counter()
+        document = self.store.collection.find_one(
+            {"_id": self.session_id},
+            {MESSAGES_KEY: {"$slice": -self.store.window}, "_id": 0},
+        )
+        self.store.record_read(time.perf_counter() - started)
+        return messages_from_dict(document[MESSAGES_KEY]) if document else []
+
+    def archived_messages(self) -> List[BaseMessage]:
+        """Stored messages older than the chat history window"""
+        document = self.store.collection.find_one({"_id": self.session_id}, {MESSAGES_KEY: 1})
+        if not document:
+            return []
+        return messages_from_dict(document[MESSAGES_KEY][:-self.store.window])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """Append a turn, trim the stored array and refresh the expiry in one update"""
+        if not messages:
+            return
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        self.store.collection.update_one(
+            {"_id": self.session_id},
+            {
+                "$push": {MESSAGES_KEY: {
+                    "$each": [message_to_dict(message) for message in messages],
+                    "$slice": -self.store.max_stored,
+                }},
+                "$inc": {"Count": len(messages)},
+                "$set": {"UpdatedAt": now, "ExpiresAt": now + timedelta(seconds=self.store.ttl_seconds)},
+                "$setOnInsert": {"CreatedAt": now},
+            },
+            upsert=True,
+        )
+        self.store.record_write(time.perf_counter() - started)
+
+    def clear(self) -> None:
+        self.store.collection.delete_one({"_id": self.session_id})
+
+
+class SessionHistoryStore:
+    """Creates single-document session histories; same interface as HistoryStore"""
+
+    def __init__(
+        self,
+        client,
+        database_name: str,
+        collection_name: str = SESSION_HISTORY_COLLECTION_NAME,
+        ttl_seconds: int = HISTORY_TTL_SECONDS,
+        window: int = SESSION_HISTORY_WINDOW,
+        max_stored: int = SESSION_HISTORY_MAX_STORED,
+    ):
+        self.client = client
+        self.collection = client.get_database(database_name).get_collection(collection_name)
+        self.ttl_seconds = ttl_seconds
+        # Turns are stored as human/AI pairs, so both limits are rounded down to an
+        # even count to keep every `$slice` tail starting on a human message
+        self.window = max(window - window % 2, 2)
+        self.max_stored = max(max_stored - max_stored % 2, self.window)
+        self._read_latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self._write_latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def session(self, session_id: str) -> SessionDocumentHistory:
+        return SessionDocumentHistory(self, session_id)
+
+    def ensure_indexes(self) -> None:
+        # Sessions are looked up by _id, so expiry is the only extra index
+        self.collection.create_index("ExpiresAt", expireAfterSeconds=0)
+
+    def migrate(self, legacy) -> dict:
+        """Copy every session of a per-message HistoryStore, archive first, into one document each"""
+        started = time.perf_counter()
+        sessions = copied = 0
+        for session_id in legacy.collection.distinct(SESSION_KEY):
+            history = legacy.session(session_id)
+            messages = history.archived_messages() + history.messages
+            now = datetime.now(timezone.utc)
+            self.collection.replace_one(
+                {"_id": session_id},
+                {
+                    MESSAGES_KEY: [message_to_dict(message) for message in messages[-self.max_stored:]],
+                    "Count": len(messages),
+                    "CreatedAt": now,
+                    "UpdatedAt": now,
+                    "ExpiresAt": now + timedelta(seconds=self.ttl_seconds),
+                },
+                upsert=True,
+            )
+            sessions += 1
+            copied += len(messages)
+        seconds = time.perf_counter() - started
+        print(f"🧹 Migrated {sessions} chat sessions ({copied} messages) into {self.collection.name} in {seconds:.1f}s")
+        return {"sessions": sessions, "messages": copied, "seconds": round(seconds, 2)}
+
+    def record_read(self, seconds: float) -> None:
+        with self._lock:
+            self._read_latencies.append(seconds)
+
+    def record_write(self, seconds: float) -> None:
+        with self._lock:
+            self._write_latencies.append(seconds)
+
+    def collection_size(self) -> dict:
+        stats = self.collection.database.command("collStats", self.collection.name)
+        return {
+            "documents": stats.get("count", 0),
+            "size_bytes": stats.get("size", 0),
+            "storage_bytes": stats.get("storageSize", 0),
+            "index_bytes": stats.get("totalIndexSize", 0),
+        }
+
+    def stats(self, include_size: bool = False) -> dict:
+        with self._lock:
+            reads, writes = list(self._read_latencies), list(self._write_latencies)
+        stats = {
+            "reads": len(reads),
+            "read_p50_ms": round(percentile(reads, 0.5) * 1000, 2),
+            "read_p95_ms": round(percentile(reads, 0.95) * 1000, 2),
+            "writes": len(writes),
+            "write_p50_ms": round(percentile(writes, 0.5) * 1000, 2),
+            "write_p95_ms": round(percentile(writes, 0.95) * 1000, 2),
+        }
+        if include_size:
+            try:
+                stats["collection"] = self.collection_size()
+            except Exception as e:
+                stats["collection"] = {"error": str(e)}
+        return stats
@@ -0,0 +1,154 @@
+"""
+Per-session store of the latest structured search results.
+
+Follow-ups such as "tell me more about paper 2" used to depend on the LLM
+re-reading the whole chat history and re-extracting the arXiv ID from prose.
+Tools now record the result list of their latest search here, so ordinals and
+titles can be resolved with a dictionary lookup instead.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import List, Optional
+
+SESSION_RESULTS_COLLECTION_NAME = "session_results"
+DEFAULT_CAPACITY = 1024
+# Shorter titles ("BERT", "Attention") turn up in ordinary questions too often to match on
+MIN_TITLE_MATCH_LENGTH = 12
+
+# Session of the chat request currently being served, set by /api/chat so the
+# tools can record their results without changing their signatures.
+current_session_id: ContextVar[Optional[str]] = ContextVar("current_session_id", default=None)
+
+ORDINAL_WORDS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10,
+}
+
+ORDINAL_PATTERNS = [
+    re.compile(r'\b(?:paper|article|result|item|number|no\.?)\s*#?\s*(\d{1,2})\b', re.IGNORECASE),
+    re.compile(r'#\s*(\d{1,2})\b'),
+    re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)\s+(?:paper|article|result|one)\b', re.IGNORECASE),
+]
+
+ORDINAL_WORD_PATTERN = re.compile(
+    r'\b(' + '|'.join(list(ORDINAL_WORDS) + ["last"]) + r')\s+(?:paper|article|result|one)\b',
+    re.IGNORECASE,
+)
+
+
+def parse_ordinal(text: str) -> Optional[int]:
+    """
+    Extract a 1-based list position from a follow-up such as "paper 2",
+    "#3", "the second paper" or "the last one". Returns -1 for "last".
+    """
+    for pattern in ORDINAL_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return int(match.group(1))
+
+    match = ORDINAL_WORD_PATTERN.search(text)
+    if match:
+        word = match.group(1).lower()
+        return -1 if word == "last" else ORDINAL_WORDS[word]
+    return None
+
+
+def mentions_title(text: str, title: str) -> bool:
+    """Whether `text` quotes `title` as whole words, ignoring case and spacing"""
+    title = " ".join(title.split())
+    if len(title) < MIN_TITLE_MATCH_LENGTH:
+        return False
+    words = r'\s+'.join(re.escape(word) for word in title.split(" "))
+    return re.search(r'(?<!\w)' + words + r'(?!\w)', text, re.IGNORECASE) is not None
+
+
+def compact_result(paper: dict) -> dict:
+    """Keep only the fields needed to resolve and fetch a paper again"""
+    return {
+        "arxiv_id": paper.get("arxiv_id") or paper.get("id") or "",
+        "title": paper.get("title") or "",
+    }
+
+
+class SessionResultStore:
+    """Latest result list per session, held in an in-process LRU backed by MongoDB"""
+
+    def __init__(self, collection=None, capacity: int = DEFAULT_CAPACITY):
+        self.collection = collection
+        self.capacity = capacity
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, session_id: str, entry: dict) -> None:
+        with self._lock:
+            self._cache[session_id] = entry
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def save(self, session_id: Optional[str], source: str, query: str, papers: List[dict]) -> None:
+        """
+        Record the result list of the latest search made in a session. An empty
+        list keeps the previous one, so a failed search does not break "the second one".
+        """
+        if not session_id or not papers:
+            return
+        entry = {
+            "source": source,
+            "query": query,
+            "results": [compact_result(paper) for paper in papers],
+            "updated_at": datetime.now(timezone.utc),
+        }
+        self._remember(session_id, entry)
+
+        if self.collection is not None:
+            try:
+                self.collection.replace_one({"_id": session_id}, entry, upsert=True)
+            except Exception as e:
+                print(f"⚠️  Could not persist results for session {session_id}: {str(e)}")
+
+    def get(self, session_id: Optional[str]) -> Optional[dict]:
+        """Return the latest result list of a session, or None"""
+        if not session_id:
+            return None
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None:
+                self._cache.move_to_end(session_id)
+                return entry
+
+        if self.collection is None:
+            return None
+        try:
+            entry = self.collection.find_one({"_id": session_id}, {"_id": 0})
+        except Exception as e:
+            print(f"⚠️  Could not load results for session {session_id}: {str(e)}")
+            return None
+        if entry:
+            self._remember(session_id, entry)
+        return entry
+
+    def resolve(self, session_id: Optional[str], reference: str) -> Optional[dict]:
+        """
+        Resolve a reference like "paper 2", "the last one" or a paper title
+        against the latest result list of the session.
+        """
+        entry = self.get(session_id)
+        if not entry or not entry["results"]:
+            return None
+        results = entry["results"]
+
+        for paper in results:
+            if mentions_title(reference, paper["title"]):
+                return paper
+
+        position = parse_ordinal(reference)
+        if position == -1:
+            return results[-1]
+        if position and 1 <= position <= len(results):
+            return results[position - 1]
+        return None
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script to verify admission control and priority queueing
+"""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from admission import AdmissionController, AdmissionMiddleware, RouteClass
+
+def route_classes(chat_limit=1, chat_queue=4, max_wait=1.0):
+    return [
+        RouteClass("library", ("/api/library",), 0, 2, 4, max_wait),
+        RouteClass("search", ("/api/search", "/api/papers"), 1, 2, 4, max_wait),
+        RouteClass("chat", ("/api/chat",), 2, chat_limit, chat_queue, max_wait),
+    ]
+
+def test_classification():
+    print("🧪 Testing route classification...")
+    controller = AdmissionController(route_classes())
+    names = [getattr(controller.classify(path), "name", None)
+             for path in ["/api/library", "/api/library/search", "/api/papers/1706.03762", "/api/chat", "/api/jobs", "/api/libraryx"]]
+    ok = names == ["library", "library", "search", "chat", None, None]
+    print(f"{'✅' if ok else '❌'} classes {names}")
+    return ok
+
+def test_priority_order():
+    print("🧪 Testing that library and search are admitted ahead of chat...")
+
+    async def scenario():
+        controller = AdmissionController(route_classes(chat_limit=4), max_concurrent=1)
+        chat, library, search = (controller.classify(path) for path in ["/api/chat", "/api/library", "/api/search"])
+        order = []
+
+        async def request(route, name):
+            await controller.acquire(route)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            controller.release(route, 0.01)
+
+        await controller.acquire(chat)  # occupies the only slot
+        tasks = [asyncio.create_task(request(chat, "chat")), asyncio.create_task(request(search, "search")),
+                 asyncio.create_task(request(library, "library"))]
+        await asyncio.sleep(0.01)
+        depth = controller.stats()["queue_depth"]
+        controller.release(chat)
+        await asyncio.gather(*tasks)
+        return order, depth
+
+    order, depth = asyncio.run(scenario())
+    ok = order == ["library", "search", "chat"] and depth == 3
+    print(f"{'✅' if ok else '❌'} admitted in order {order} from a queue of {depth}")
+    return ok
+
+def test_rejections():
+    print("🧪 Testing 429 for a full class queue and 503 after waiting too long...")
+
+    async def scenario():
+        controller = AdmissionController(route_classes(chat_limit=1, chat_queue=1, max_wait=0.05))
+        chat = controller.classify("/api/chat")
+        await controller.acquire(chat)
+        waiting = asyncio.create_task(controller.acquire(chat))
+        await asyncio.sleep(0)
+        statuses = []
+        try:
+            await controller.acquire(chat)
+        except Exception as e:
+            statuses.append((e.status_code, e.retry_after))
+        try:
+            await waiting
+        except Exception as e:
+            statuses.append((e.status_code, e.retry_after))
+        return statuses, controller.stats()["routes"]["chat"]
+
+    statuses, stats = asyncio.run(scenario())
+    ok = [status for status, _ in statuses] == [429, 503] and all(retry >= 1 for _, retry in statuses) \
+        and stats["rejected_429"] == 1 and stats["timeouts"] == 1 and stats["waiting"] == 0
+    print(f"{'✅' if ok else '❌'} statuses {statuses}, {stats['timeouts']} timeout")
+    return ok
+
+def test_shedding_lower_priority():
+    print("🧪 Testing that a full queue sheds chat for library traffic...")
+
+    async def scenario():
+        controller = AdmissionController(route_classes(chat_limit=4), max_concurrent=1, max_queue=1)
+        chat, library = controller.classify("/api/chat"), controller.classify("/api/library")
+        await controller.acquire(chat)
+        queued_chat = asyncio.create_task(controller.acquire(chat))
+        await asyncio.sleep(0)
+        queued_library = asyncio.create_task(controller.acquire(library))
+        await asyncio.sleep(0)
+        controller.release(chat)
+        await queued_library
+        try:
+            await queued_chat
+            return None, controller.stats()
+        except Exception as e:
+            return e.status_code, controller.stats()
+
+    status, stats = asyncio.run(scenario())
+    ok = status == 503 and stats["routes"]["chat"]["shed"] == 1 and stats["routes"]["library"]["active"] == 1
+    print(f"{'✅' if ok else '❌'} queued chat request answered {status}")
+    return ok
+
+def test_middleware_response():
+    print("🧪 Testing middleware rejection response...")
+    app = FastAPI()
+    controller = AdmissionController([RouteClass("chat", ("/api/chat",), 2, 0, 0, 1.0)])
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.post("/api/chat")
+    def chat():
+        return {"response": "hi"}
+
+    @app.get("/api/jobs")
+    def jobs():
+        return {"jobs": []}
+
+    client = TestClient(app)
+    rejected = client.post("/api/chat")
+    passed = client.get("/api/jobs")
+    ok = rejected.status_code == 429 and rejected.headers.get("retry-after") == "1" \
+        and "detail" in rejected.json() and passed.status_code == 200
+    print(f"{'✅' if ok else '❌'} chat {rejected.status_code} (Retry-After {rejected.headers.get('retry-after')}), "
+          f"unclassified route {passed.status_code}")
+    return ok
+
+def main():
+    print("🚀 Testing admission control...")
+    print("=" * 50)
+
+    tests = [test_classification, test_priority_order, test_rejections, test_shedding_lower_priority, test_middleware_response]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Admission Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the arXiv paper cache and the paper detail lookup order
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from arxiv_cache import ArxivPaperCache, resolve_paper
+
+def detail(arxiv_id):
+    return {"arxiv_id": arxiv_id, "title": f"Paper {arxiv_id}"}
+
+class CacheCollection:
+    """Just enough of a pymongo collection for the arXiv cache"""
+
+    def __init__(self):
+        self.documents = {}
+        self.indexes = {}
+
+    def find_one(self, query):
+        return self.documents.get(query["_id"])
+
+    def replace_one(self, query, document, upsert=False):
+        self.documents[query["_id"]] = {"_id": query["_id"], **document}
+
+    def create_index(self, key, **kwargs):
+        self.indexes[key] = kwargs
+
+def test_lru_eviction():
+    print("🧪 Testing the in-process LRU evicts the least recently used paper...")
+    cache = ArxivPaperCache(capacity=2)
+    cache.put("2101.00001", detail("2101.00001"))
+    cache.put("2101.00002", detail("2101.00002"))
+    cache.get("2101.00001")
+    cache.put("2101.00003", detail("2101.00003"))
+    kept = [arxiv_id for arxiv_id in ("2101.00001", "2101.00002", "2101.00003") if cache.get(arxiv_id) is not None]
+    stats = cache.stats()
+    ok = kept == ["2101.00001", "2101.00003"] and stats["entries"] == 2 and stats["misses"] == 1 and stats["hits"] == 3
+    print(f"{'✅' if ok else '❌'} kept {kept}, {stats}")
+    return ok
+
+def test_mongo_tier_fills_lru():
+    print("🧪 Testing the MongoDB tier serves papers the LRU has lost...")
+    collection = CacheCollection()
+    ArxivPaperCache(collection).put("2101.00001", detail("2101.00001"))
+    cache = ArxivPaperCache(collection)  # e.g. after a restart
+    first = cache.get("2101.00001")
+    collection.documents.clear()
+    second = cache.get("2101.00001")
+    quiet = cache.get("2101.00002", record=False)
+    ok = first == second == detail("2101.00001") and quiet is None and cache.stats()["misses"] == 0
+    print(f"{'✅' if ok else '❌'} read through once, then served from memory")
+    return ok
+
+def test_ttl_expiry():
+    print("🧪 Testing entries expire from both tiers...")
+    collection = CacheCollection()
+    cache = ArxivPaperCache(collection, ttl_seconds=0.05)
+    cache.ensure_indexes()
+    cache.put("2101.00001", detail("2101.00001"))
+    fresh = cache.get("2101.00001") is not None
+    time.sleep(0.06)
+    expired_in_memory = cache.get("2101.00001") is None
+
+    # A stale document MongoDB's TTL monitor has not removed yet
+    collection.replace_one({"_id": "2101.00002"}, {
+        "detail": detail("2101.00002"),
+        "fetched_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+    })
+    stale = cache.get("2101.00002")
+    ok = fresh and expired_in_memory and stale is None and cache.stats()["entries"] == 0 \
+        and collection.indexes["fetched_at"] == {"expireAfterSeconds": 0}
+    print(f"{'✅' if ok else '❌'} fresh hit, then misses once the TTL has passed")
+    return ok
+
+def test_lookup_order():
+    print("🧪 Testing paper details come from the knowledge base, then the cache, then arXiv...")
+    knowledge = {"704.0001": detail("704.0001")}
+    cache = ArxivPaperCache()
+    cache.put("2101.00001", detail("2101.00001"))
+    fetched = []
+
+    def fetch(arxiv_id):
+        fetched.append(arxiv_id)
+        return detail(arxiv_id) if arxiv_id.startswith("2101") else None
+
+    sources = [resolve_paper(arxiv_id, knowledge.get, cache, fetch)[1]
+               for arxiv_id in ("704.0001", "2101.00001", "2101.00002", "9999.99999")]
+    ok = sources == ["knowledge", "cache", "arxiv", None] and fetched == ["2101.00002", "9999.99999"]
+    print(f"{'✅' if ok else '❌'} sources {sources}, arXiv asked for {fetched}")
+    return ok
+
+def main():
+    print("🚀 Testing arXiv paper cache...")
+    print("=" * 50)
+
+    tests = [test_lru_eviction, test_mongo_tier_fills_lru, test_ttl_expiry, test_lookup_order]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 arXiv Cache Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
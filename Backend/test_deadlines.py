@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script to verify request deadlines and cancellation of agent runs
+"""
+
+import asyncio
+import time
+from uuid import uuid4
+
+from deadlines import ClientDisconnected, PartialResultCollector, RequestBudget, run_with_deadline
+from outbound import DeadlineExceeded, remaining_budget
+from tool_compaction import ToolOutputCompactor
+
+async def slow_run(cancelled: list):
+    try:
+        await asyncio.sleep(5)
+        return {"output": "done"}
+    except asyncio.CancelledError:
+        cancelled.append(True)
+        raise
+
+def test_executor_limits():
+    print("🧪 Testing executor limits derived from the budget...")
+    limits = RequestBudget(seconds=23).executor_limits()
+    ok = limits["max_iterations"] == 4 and 20 < limits["max_execution_time"] <= 21
+    tiny = RequestBudget(seconds=1).executor_limits()
+    ok = ok and tiny["max_iterations"] == 1
+    print(f"{'✅' if ok else '❌'} 23s budget → {limits}, 1s budget → {tiny['max_iterations']} iteration")
+    return ok
+
+def test_deadline_cancels_run():
+    print("🧪 Testing that the deadline cancels a slow run...")
+
+    async def scenario():
+        budget = RequestBudget(seconds=0.3)
+        budget.install()
+        cancelled = []
+        started = time.monotonic()
+        try:
+            await run_with_deadline(slow_run(cancelled), budget)
+            return False
+        except DeadlineExceeded:
+            elapsed = time.monotonic() - started
+            return elapsed < 1 and cancelled == [True] and budget.cancelled.is_set() and remaining_budget() <= 0
+
+    ok = asyncio.run(scenario())
+    print(f"{'✅' if ok else '❌'} slow run cancelled at the deadline")
+    return ok
+
+def test_disconnect_cancels_run():
+    print("🧪 Testing that a client disconnect cancels the run...")
+
+    async def scenario():
+        budget = RequestBudget(seconds=10)
+        disconnect_at = time.monotonic() + 0.3
+        cancelled = []
+
+        async def is_disconnected():
+            return time.monotonic() >= disconnect_at
+
+        try:
+            await run_with_deadline(slow_run(cancelled), budget, is_disconnected)
+            return False
+        except ClientDisconnected:
+            return cancelled == [True] and budget.remaining() > 8
+
+    ok = asyncio.run(scenario())
+    print(f"{'✅' if ok else '❌'} run cancelled after disconnect")
+    return ok
+
+def test_fallback_answer():
+    print("🧪 Testing partial answer from collected tool output...")
+    collector = PartialResultCollector()
+    empty = "took too long" in collector.fallback_answer()
+    run_id = uuid4()
+    collector.on_tool_start({"name": "knowledge_base"}, "transformers", run_id=run_id)
+    collector.on_tool_end("1. Title: Attention Is All You Need", run_id=run_id)
+    answer = collector.fallback_answer()
+    ok = empty and "knowledge_base" in answer and "Attention Is All You Need" in answer
+    print(f"{'✅' if ok else '❌'} fallback: {answer[:80]}...")
+    return ok
+
+def test_fallback_answer_from_compacted_output():
+    print("🧪 Testing partial answers hide the compact tool encoding...")
+    compactor = ToolOutputCompactor()
+    compacted = compactor.compact_records(
+        "knowledge_base", "2 papers for 'transformers'", ["arxiv_id", "title"],
+        [{"arxiv_id": "1706.03762", "title": "Attention Is All You Need", "summary": "The Transformer " * 400},
+         {"arxiv_id": "1810.04805", "title": "BERT", "summary": "Bidirectional encoders"}],
+        "summary", raw_text="",
+    )
+    truncated = compactor.compact_text("get_information_from_arxiv", "Abstract: " + "attention " * 2000)
+    collector = PartialResultCollector()
+    for name, output in [("get_information_from_arxiv", truncated), ("knowledge_base", compacted)]:
+        run_id = uuid4()
+        collector.on_tool_start({"name": name}, "transformers", run_id=run_id)
+        collector.on_tool_end(output, run_id=run_id)
+    answer = collector.fallback_answer()
+    collector.outputs.pop()
+    text_answer = collector.fallback_answer()
+    ok = "1. arxiv_id: 1706.03762\n   title: Attention Is All You Need" in answer and "2. arxiv_id: 1810.04805" in answer \
+        and "summary: Bidirectional encoders" in answer \
+        and not any(marker in answer + text_answer for marker in ("R1.", "R2.", "[fields:", "expand_tool_result", "|"))
+    print(f"{'✅' if ok else '❌'} fallback: {answer[:120]!r}...")
+    return ok
+
+def main():
+    print("🚀 Testing request deadlines...")
+    print("=" * 50)
+
+    tests = [test_executor_limits, test_deadline_cancels_run, test_disconnect_cancels_run, test_fallback_answer,
+             test_fallback_answer_from_compacted_output]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Deadline Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
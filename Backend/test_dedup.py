@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script to verify near-duplicate detection at ingestion and query time
+"""
+
+import numpy as np
+
+from dedup import canonical_arxiv_id, deduplicate_records, diversify
+
+ABSTRACT = ("We propose a transformer architecture based solely on attention mechanisms, "
+            "dispensing with recurrence and convolutions entirely. Experiments on two machine "
+            "translation tasks show these models to be superior in quality while being more parallelizable.")
+OTHER = ("We study protein structure prediction with deep residual networks trained on "
+         "multiple sequence alignments and report improved contact accuracy on benchmark targets.")
+THIRD = ("Regional climate models are downscaled with generative networks to estimate "
+         "precipitation extremes under several emission scenarios.")
+
+def unit(seed: int) -> list:
+    vector = np.random.RandomState(seed).randn(16)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+def test_canonical_ids():
+    print("🧪 Testing arXiv ID canonicalization...")
+    cases = [
+        ("704.0001", "0704.0001"),
+        ("0704.0001v2", "0704.0001"),
+        ("arXiv:1706.03762v5", "1706.03762"),
+        ("1001.1", "1001.1000"),
+        ("https://arxiv.org/abs/2307.0345", "2307.03450"),
+        ("hep-th/9901001v1", "hep-th/9901001"),
+    ]
+    passed = 0
+    for raw, expected in cases:
+        result = canonical_arxiv_id(raw)
+        if result == expected:
+            passed += 1
+        else:
+            print(f"❌ {raw} → {result} (expected {expected})")
+    print(f"{'✅' if passed == len(cases) else '❌'} {passed}/{len(cases)} IDs canonicalized")
+    return passed == len(cases)
+
+def test_ingestion_dedup():
+    print("🧪 Testing ingestion dedup passes...")
+    base = unit(1)
+    records = [
+        {"id": "1706.03762v1", "abstract": ABSTRACT, "update_date": "2017-06-12", "embedding": base},
+        {"id": "1706.03762v5", "abstract": ABSTRACT + " Revised.", "update_date": "2023-08-02", "embedding": base},
+        {"id": "1807.00001", "abstract": ABSTRACT.replace("entirely", "completely"), "update_date": "2018-07-01", "embedding": unit(3)},
+        {"id": "1901.00002", "abstract": OTHER, "update_date": "2019-01-01", "embedding": unit(4)},
+        {"id": "1902.00003", "abstract": "A reworded protein folding abstract with few shared phrases.", "update_date": "2019-02-01",
+         "embedding": (np.array(unit(4)) + 0.01 * np.array(unit(5))).tolist()},
+        {"id": "2001.00004", "abstract": THIRD, "update_date": "2020-01-01", "embedding": unit(6)},
+    ]
+    kept, report = deduplicate_records(records)
+    kept_ids = sorted(record["id"] for record in kept)
+    # The newest record of each cluster is kept
+    ok = kept_ids == ["1706.03762v5", "1902.00003", "2001.00004"]
+    ok = ok and report.removed_by == {"id": 1, "minhash": 1, "cosine": 1} and round(report.shrinkage, 2) == 0.5
+    print(f"{'✅' if ok else '❌'} kept {kept_ids}, report {report.as_dict()}")
+    return ok
+
+def test_query_time_diversify():
+    print("🧪 Testing query-time diversification...")
+    results = [
+        {"id": "704.0001", "abstract": ABSTRACT},
+        {"id": "0704.0001v2", "abstract": "Different text"},
+        {"id": "1807.00001", "abstract": ABSTRACT.replace("entirely", "completely")},
+        {"id": "1901.00002", "abstract": OTHER},
+        {"id": "2001.00004", "abstract": THIRD},
+    ]
+    kept = diversify(results, k=3)
+    ids = [result["id"] for result in kept]
+    ok = ids == ["704.0001", "1901.00002", "2001.00004"]
+    print(f"{'✅' if ok else '❌'} kept {ids}")
+    return ok
+
+def main():
+    print("🚀 Testing near-duplicate detection...")
+    print("=" * 50)
+
+    tests = [test_canonical_ids, test_ingestion_dedup, test_query_time_diversify]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Dedup Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
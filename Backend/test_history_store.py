@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the indexed, TTL-managed chat history store
+"""
+
+import copy
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from bson import ObjectId
+from langchain_core.messages import AIMessage, HumanMessage
+
+from history_store import HistoryStore, HISTORY_KEY, SESSION_KEY
+
+def matches(document, query):
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict):
+            if "$exists" in condition and (field in document) != condition["$exists"]:
+                return False
+            if "$lt" in condition and not (value is not None and value < condition["$lt"]):
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+class Cursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.documents.sort(key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the history store"""
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.documents = []
+        self.indexes = {"_id_": {}, f"{SESSION_KEY}_1": {}}
+
+    def insert_many(self, documents):
+        for document in documents:
+            self.documents.append({"_id": ObjectId(), **document})
+
+    def find(self, query, projection=None):
+        return Cursor([copy.deepcopy(document) for document in self.documents if matches(document, query)])
+
+    def find_one(self, query, projection=None, sort=None):
+        cursor = self.find(query)
+        if sort:
+            cursor.sort(sort)
+        return next(iter(cursor), None)
+
+    def count_documents(self, query):
+        return len([document for document in self.documents if matches(document, query)])
+
+    def distinct(self, field, query=None):
+        return list(dict.fromkeys(document[field] for document in self.documents if matches(document, query or {})))
+
+    def update_many(self, query, update):
+        modified = 0
+        for document in self.documents:
+            if matches(document, query):
+                if isinstance(update, list):  # the CreatedAt backfill pipeline
+                    document["CreatedAt"] = document["_id"].generation_time
+                else:
+                    document.update(update["$set"])
+                modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+    def update_one(self, query, update, upsert=False):
+        document = self.find_one(query)
+        if document is None:
+            document = {**query, **update.get("$setOnInsert", {})}
+        else:
+            self.documents.remove(next(d for d in self.documents if d["_id"] == document["_id"]))
+        for field, push in update.get("$push", {}).items():
+            document[field] = (document.get(field, []) + list(push["$each"]))[push.get("$slice", 0):]
+        document.update(update.get("$set", {}))
+        self.documents.append(document)
+
+    def delete_many(self, query):
+        self.documents = [document for document in self.documents if not matches(document, query)]
+
+    def delete_one(self, query):
+        document = self.find_one(query)
+        if document is not None:
+            self.delete_many({"_id": document["_id"]})
+
+    def create_index(self, keys, **kwargs):
+        name = f"{keys}_1" if isinstance(keys, str) else "_".join(f"{field}_{direction}" for field, direction in keys)
+        self.indexes[name] = kwargs
+
+    def index_information(self):
+        return dict(self.indexes)
+
+    def drop_index(self, name):
+        del self.indexes[name]
+
+class FakeDatabase:
+    name = "agent_demo"
+
+    def __init__(self):
+        self.collections = {}
+
+    def get_collection(self, name):
+        return self.collections.setdefault(name, FakeCollection(self, name))
+
+    __getitem__ = get_collection
+
+class FakeClient:
+    def __init__(self):
+        self.database = FakeDatabase()
+
+    def get_database(self, name):
+        return self.database
+
+    __getitem__ = get_database
+
+def store(**kwargs):
+    history_store = HistoryStore(FakeClient(), "agent_demo", **kwargs)
+    return history_store, history_store.collection, history_store.archive_collection
+
+def add_turns(history, turns, first=0):
+    for number in range(first, first + turns):
+        history.add_messages([HumanMessage(content=f"q{number}"), AIMessage(content=f"a{number}")])
+
+def test_append_sets_expiry():
+    print("🧪 Testing appends carry CreatedAt and a refreshed ExpiresAt...")
+    history_store, collection, _ = store(ttl_seconds=3600)
+    history = history_store.session("s1")
+    add_turns(history, 1)
+    first_expiry = collection.documents[0]["ExpiresAt"]
+    add_turns(history, 1, first=1)
+    expiries = {document["ExpiresAt"] for document in collection.documents}
+    in_an_hour = datetime.now(timezone.utc) + timedelta(seconds=3600)
+    ok = len(collection.documents) == 4 and len(expiries) == 1 and max(expiries) >= first_expiry \
+        and abs((max(expiries) - in_an_hour).total_seconds()) < 5 \
+        and all("CreatedAt" in document for document in collection.documents) \
+        and [message.content for message in history.messages] == ["q0", "a0", "q1", "a1"]
+    print(f"{'✅' if ok else '❌'} {len(collection.documents)} messages sharing one expiry, read back in order")
+    return ok
+
+def test_compaction_past_threshold():
+    print("🧪 Testing oversized sessions are compacted into the archive...")
+    history_store, collection, archive = store(max_messages=6, keep_messages=4)
+    history = history_store.session("s1")
+    add_turns(history, 3)
+    before = history_store.compactions
+    add_turns(history, 1, first=3)
+    live = [message.content for message in history.messages]
+    archived = [message.content for message in history.archived_messages()]
+    document = archive.find_one({"_id": "s1"})
+    ok = before == 0 and history_store.compactions == 1 and live == ["q2", "a2", "q3", "a3"] \
+        and archived == ["q0", "a0", "q1", "a1"] and "ExpiresAt" in document and "CreatedAt" in document \
+        and history_store.stats()["archived_messages"] == 4
+    print(f"{'✅' if ok else '❌'} live {live}, archived {archived}")
+    return ok
+
+def test_archive_accumulates_and_clear():
+    print("🧪 Testing later compactions append to the archive and clear removes both...")
+    history_store, collection, archive = store(max_messages=4, keep_messages=2)
+    history = history_store.session("s1")
+    add_turns(history, 5)
+    archived = [message.content for message in history.archived_messages()]
+    documents = len(archive.documents)
+    history.clear()
+    ok = archived == ["q0", "a0", "q1", "a1", "q2", "a2", "q3", "a3"] and documents == 1 \
+        and history.messages == [] and archive.documents == []
+    print(f"{'✅' if ok else '❌'} one archive document holding {archived}")
+    return ok
+
+def test_archive_is_capped():
+    print("🧪 Testing the archive keeps only its newest messages...")
+    history_store, collection, archive = store(max_messages=4, keep_messages=2, archive_max_messages=6)
+    history = history_store.session("s1")
+    add_turns(history, 9)
+    archived = [message.content for message in history.archived_messages()]
+    ok = archived == ["q5", "a5", "q6", "a6", "q7", "a7"] and history_store.stats()["archived_messages"] == 16
+    print(f"{'✅' if ok else '❌'} archive holds {archived}")
+    return ok
+
+def test_ensure_indexes():
+    print("🧪 Testing indexes replace the single-field SessionId index...")
+    history_store, collection, archive = store()
+    history_store.ensure_indexes()
+    indexes = collection.index_information()
+    ok = f"{SESSION_KEY}_1_CreatedAt_1" in indexes and f"{SESSION_KEY}_1" not in indexes \
+        and indexes["ExpiresAt_1"] == {"expireAfterSeconds": 0} \
+        and archive.index_information()["ExpiresAt_1"] == {"expireAfterSeconds": 0}
+    print(f"{'✅' if ok else '❌'} indexes {sorted(indexes)}")
+    return ok
+
+def test_migrate_legacy_documents():
+    print("🧪 Testing migration gives legacy documents an expiry and is safe to rerun...")
+    history_store, collection, archive = store(max_messages=4, keep_messages=2)
+    collection.insert_many([
+        {SESSION_KEY: "legacy", HISTORY_KEY: json.dumps({"type": "human", "data": {"content": f"m{i}"}})}
+        for i in range(6)
+    ])
+    report = history_store.migrate()
+    expired = all("ExpiresAt" in document and "CreatedAt" in document for document in collection.documents)
+    again = history_store.migrate()
+    ok = report["backfilled"] == 6 and report["sessions"] == 1 and report["archived"] == 4 and expired \
+        and len(collection.documents) == 2 and again["sessions"] == 0 and again["backfilled"] == 0
+    print(f"{'✅' if ok else '❌'} first run {report}, rerun visited {again['sessions']} sessions")
+    return ok
+
+def main():
+    print("🚀 Testing chat history store...")
+    print("=" * 50)
+
+    tests = [test_append_sets_expiry, test_compaction_past_threshold, test_archive_accumulates_and_clear,
+             test_archive_is_capped, test_ensure_indexes, test_migrate_legacy_documents]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 History Store Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
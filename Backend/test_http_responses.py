@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script to verify compressed orjson responses and ETag/304 handling
+"""
+
+import gzip
+
+import orjson
+import zstandard
+from starlette.requests import Request
+
+from http_responses import etag_matches, json_response, negotiate_encoding, strong_etag
+
+def make_request(headers: dict) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/library",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    return Request(scope)
+
+PAYLOAD = {"papers": [{"id": f"2401.{i:05d}", "title": "Attention " * 20} for i in range(50)], "total": 50}
+
+def test_negotiate_encoding():
+    print("🧪 Testing Accept-Encoding negotiation...")
+    test_cases = [
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip", "gzip"),
+        ("zstd;q=0, gzip;q=0.5", "gzip"),
+        ("identity", None),
+        (None, None),
+    ]
+    passed = 0
+    for header, expected in test_cases:
+        result = negotiate_encoding(header)
+        if result == expected:
+            print(f"✅ '{header}' → {result}")
+            passed += 1
+        else:
+            print(f"❌ '{header}' → {result} (expected {expected})")
+    return passed == len(test_cases)
+
+def test_compressed_bodies():
+    print("🧪 Testing compressed response bodies...")
+    etag = strong_etag("library", 3)
+    gzipped = json_response(make_request({"Accept-Encoding": "gzip"}), PAYLOAD, etag=etag)
+    zstded = json_response(make_request({"Accept-Encoding": "zstd"}), PAYLOAD, etag=etag)
+    plain = json_response(make_request({}), PAYLOAD, etag=etag)
+
+    ok = (
+        orjson.loads(gzip.decompress(gzipped.body)) == PAYLOAD
+        and orjson.loads(zstandard.ZstdDecompressor().decompress(zstded.body)) == PAYLOAD
+        and orjson.loads(plain.body) == PAYLOAD
+        and gzipped.headers["content-encoding"] == "gzip"
+        and "content-encoding" not in plain.headers
+        and len({gzipped.headers["etag"], zstded.headers["etag"], plain.headers["etag"]}) == 3
+    )
+    print(f"{'✅' if ok else '❌'} gzip {len(gzipped.body)}B, zstd {len(zstded.body)}B, plain {len(plain.body)}B")
+    return ok
+
+def test_not_modified():
+    print("🧪 Testing 304 on matching If-None-Match...")
+    etag = strong_etag("library", 3)
+    first = json_response(make_request({"Accept-Encoding": "gzip"}), PAYLOAD, etag=etag)
+    revalidated = json_response(make_request({"If-None-Match": first.headers["etag"]}), PAYLOAD, etag=etag)
+    changed = json_response(make_request({"If-None-Match": first.headers["etag"]}), PAYLOAD, etag=strong_etag("library", 4))
+    ok = (
+        revalidated.status_code == 304 and not revalidated.body
+        and changed.status_code == 200
+        and not etag_matches('W/' + etag, etag)
+    )
+    print(f"{'✅' if ok else '❌'} unchanged → {revalidated.status_code}, changed version → {changed.status_code}")
+    return ok
+
+def main():
+    print("🚀 Testing HTTP responses...")
+    print("=" * 50)
+
+    tests = [test_negotiate_encoding, test_compressed_bodies, test_not_modified]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 HTTP Response Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
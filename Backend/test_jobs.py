@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the background job queue: execution, dedup, priorities and recovery
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from jobs import JobQueue, UnknownJobKind, SUCCEEDED, FAILED
+
+def wait_for(queue: JobQueue, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in (SUCCEEDED, FAILED):
+            return job
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+def echo(params, report):
+    report(0.5, "halfway")
+    return {"echo": params["value"]}
+
+def test_job_runs_and_reports():
+    print("🧪 Testing job execution and progress...")
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, "jobs.db"), workers=2)
+        queue.register("echo", echo)
+        queue.register("fail", lambda params, report: 1 / 0)
+        queue.start()
+        try:
+            job, created = queue.submit("echo", {"value": 42})
+            done = wait_for(queue, job["id"])
+            failed = wait_for(queue, queue.submit("fail", {})[0]["id"])
+            ok = created and done["status"] == SUCCEEDED and done["result"] == {"echo": 42} and done["progress"] == 1.0
+            ok = ok and failed["status"] == FAILED and "division" in failed["error"]
+            try:
+                queue.submit("missing", {})
+                ok = False
+            except UnknownJobKind:
+                pass
+            print(f"{'✅' if ok else '❌'} echo {done['status']}, fail {failed['status']}")
+            return ok
+        finally:
+            queue.close()
+
+def test_dedup_and_priority():
+    print("🧪 Testing deduplication and priority order...")
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, "jobs.db"), workers=1)
+        gate = threading.Event()
+        order = []
+        queue.register("block", lambda params, report: gate.wait(5))
+        queue.register("record", lambda params, report: order.append(params["name"]))
+        queue.start()
+        try:
+            queue.submit("block", {})
+            time.sleep(0.1)
+            low, _ = queue.submit("record", {"name": "low"}, priority=9)
+            high, _ = queue.submit("record", {"name": "high"}, priority=1)
+            duplicate, created = queue.submit("record", {"name": "low"}, priority=9)
+            gate.set()
+            wait_for(queue, low["id"])
+            wait_for(queue, high["id"])
+            ok = order == ["high", "low"] and duplicate["id"] == low["id"] and not created
+            print(f"{'✅' if ok else '❌'} ran {order}, duplicate reused: {duplicate['id'] == low['id']}")
+            return ok
+        finally:
+            queue.close()
+
+def test_recovers_queued_jobs():
+    print("🧪 Testing recovery of persisted jobs after a restart...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "jobs.db")
+        first = JobQueue(path, workers=1)
+        first.register("echo", echo)
+        job, _ = first.submit("echo", {"value": "persisted"})
+        first.close()
+
+        second = JobQueue(path, workers=1)
+        second.register("echo", echo)
+        second.start()
+        try:
+            done = wait_for(second, job["id"])
+            ok = done["status"] == SUCCEEDED and done["result"] == {"echo": "persisted"}
+            print(f"{'✅' if ok else '❌'} job queued before restart {done['status']}")
+            return ok
+        finally:
+            second.close()
+
+def main():
+    print("🚀 Testing background job queue...")
+    print("=" * 50)
+
+    tests = [test_job_runs_and_reports, test_dedup_and_priority, test_recovers_queued_jobs]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Job Queue Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
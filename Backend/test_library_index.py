@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script to verify semantic library search with tag and note filters
+"""
+
+import numpy as np
+
+from library_index import LibraryIndex
+
+TOPICS = ["transformers attention", "protein folding", "climate models", "reinforcement learning"]
+
+def topic_vector(text: str) -> list:
+    """Deterministic embedding: one axis per known topic word"""
+    vector = np.zeros(8)
+    for i, topic in enumerate(TOPICS):
+        if any(word in text.lower() for word in topic.split()):
+            vector[i] = 1.0
+    vector[7] = 0.01
+    return vector.tolist()
+
+def build_index():
+    embedded = []
+    stored = {"1706.03762": topic_vector("transformers attention")}
+
+    def embed_text(text):
+        embedded.append(text)
+        return topic_vector(text)
+
+    index = LibraryIndex(embed_text, lookup_embedding=stored.get, dimensions=8)
+    index.add("1706.03762", {"title": "Attention Is All You Need", "abstract": "", "tags": ["NLP", "Transformers"], "notes": "read for the reading group"})
+    index.add("2001.00001", {"title": "Protein folding with deep nets", "abstract": "", "tags": ["Biology"], "notes": ""})
+    index.add("2002.00002", {"title": "Regional climate models", "abstract": "", "tags": ["Climate Change", "To Read"], "notes": "reading group next week"})
+    return index, embedded
+
+def test_reuses_stored_embeddings():
+    print("🧪 Testing stored embedding reuse...")
+    index, embedded = build_index()
+    stats = index.stats()
+    ok = stats["reused_embeddings"] == 1 and stats["computed_embeddings"] == 2 and len(embedded) == 2
+    print(f"{'✅' if ok else '❌'} {stats['reused_embeddings']} reused, {stats['computed_embeddings']} computed")
+    return ok
+
+def test_semantic_search_with_filters():
+    print("🧪 Testing semantic search with tag and note filters...")
+    index, _ = build_index()
+    top = index.search("attention models", k=1)[0][0]
+    tagged = [arxiv_id for arxiv_id, _ in index.search("protein", tags=["to read", "Biology"])]
+    noted = [arxiv_id for arxiv_id, _ in index.search("climate", notes="Reading group")]
+    none = index.search("climate", tags=["Biology"], notes="group")
+    ok = top == "1706.03762" and tagged[0] == "2001.00001" and set(tagged) == {"2001.00001", "2002.00002"}
+    ok = ok and noted[0] == "2002.00002" and set(noted) == {"1706.03762", "2002.00002"} and none == []
+    print(f"{'✅' if ok else '❌'} top {top}, tagged {tagged}, noted {noted}")
+    return ok
+
+def test_incremental_updates():
+    print("🧪 Testing incremental save and delete...")
+    index, _ = build_index()
+    index.remove("2002.00002")
+    index.add("1706.03762", {"title": "Attention Is All You Need", "abstract": "", "tags": ["Favourites"], "notes": ""})
+    removed = all(arxiv_id != "2002.00002" for arxiv_id, _ in index.search("climate"))
+    retagged = index.search("", tags=["NLP"]) == [] and index.search("", tags=["favourites"]) == [("1706.03762", None)]
+    ok = removed and retagged and len(index) == 2
+    print(f"{'✅' if ok else '❌'} deleted paper gone, tags replaced on re-save")
+    return ok
+
+def main():
+    print("🚀 Testing library search index...")
+    print("=" * 50)
+
+    tests = [test_reuses_stored_embeddings, test_semantic_search_with_filters, test_incremental_updates]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Library Index Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
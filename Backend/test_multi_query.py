@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script to verify batched embedding and multi-query search on the local backend
+"""
+
+import numpy as np
+
+from multi_query import MultiQuerySearcher, union_results
+from vector_index import LocalVectorIndex
+
+class CountingEmbedding:
+    """Maps each query to a fixed axis so results are predictable"""
+    AXES = {"transformers": 0, "graphs": 1, "attention on graphs": 2}
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        vectors = []
+        for text in texts:
+            vector = np.zeros(4)
+            vector[self.AXES[text]] = 1.0
+            if text == "attention on graphs":
+                vector[:2] = 0.9
+            vectors.append(vector.tolist())
+        return vectors
+
+def build_index():
+    index = LocalVectorIndex(dimensions=4, capacity=2)
+    papers = {
+        "1706.03762": [1.0, 0.1, 0.0, 0.0],
+        "1810.04805": [0.9, 0.0, 0.1, 0.0],
+        "1609.02907": [0.0, 1.0, 0.0, 0.1],
+        "1710.10903": [0.5, 0.6, 0.8, 0.0],
+    }
+    for paper_id, vector in papers.items():
+        index.add(paper_id, vector, {"id": paper_id, "title": f"Paper {paper_id}"})
+    return index
+
+def test_local_index_add_remove():
+    print("🧪 Testing incremental add and remove...")
+    index = build_index()
+    ok = len(index) == 4
+    index.remove("1810.04805")
+    hits = index.search([1.0, 0.0, 0.0, 0.0], k=4)
+    ok = ok and len(index) == 3 and "1810.04805" not in [hit[0] for hit in hits] and hits[0][0] == "1706.03762"
+    excluded = index.search([1.0, 0.0, 0.0, 0.0], k=1, exclude={"1706.03762"})
+    ok = ok and excluded[0][0] != "1706.03762"
+    print(f"{'✅' if ok else '❌'} index grew past its initial capacity and removal kept ids consistent")
+    return ok
+
+def test_batch_search_single_embedding_call():
+    print("🧪 Testing batch search with one embedding request...")
+    embedding = CountingEmbedding()
+    searcher = MultiQuerySearcher(embedding, local_index=build_index())
+    queries = ["transformers", "graphs", "attention on graphs"]
+    results = searcher.search(queries, k=2)
+
+    ok = (
+        embedding.calls == 1
+        and len(results) == 3
+        and results[0][0][0]["id"] == "1706.03762"
+        and results[1][0][0]["id"] == "1609.02907"
+        and results[2][0][0]["id"] == "1710.10903"
+    )
+    print(f"{'✅' if ok else '❌'} {embedding.calls} embedding call for {len(queries)} queries, timings {searcher.last_timings}")
+
+    union = union_results(results, queries)
+    ids = [entry["record"]["id"] for entry in union]
+    ok = ok and len(ids) == len(set(ids)) and all(entry["queries"] for entry in union)
+    print(f"{'✅' if ok else '❌'} union view holds {len(ids)} unique papers")
+    return ok
+
+def main():
+    print("🚀 Testing multi-query search...")
+    print("=" * 50)
+
+    tests = [test_local_index_add_remove, test_batch_search_single_embedding_call]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Multi-Query Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
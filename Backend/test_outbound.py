@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the outbound policy layer against a local mock server
+"""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from outbound import (
+    CircuitOpenError, DeadlineExceeded, RetryableStatusError, TokenBucket, Upstream, request_deadline,
+)
+
+class MockUpstreamHandler(BaseHTTPRequestHandler):
+    """Answers /flaky with 429 twice before succeeding, /down always with 503"""
+    flaky_calls = 0
+
+    def do_GET(self):
+        if self.path == "/flaky":
+            MockUpstreamHandler.flaky_calls += 1
+            if MockUpstreamHandler.flaky_calls <= 2:
+                self.send_response(429)
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return
+        if self.path == "/down":
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path == "/slow":
+            time.sleep(1)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_mock_server = None
+
+def mock_server_url():
+    """Start the mock upstream once and return its base URL"""
+    global _mock_server
+    if _mock_server is None:
+        _mock_server = ThreadingHTTPServer(("127.0.0.1", 0), MockUpstreamHandler)
+        threading.Thread(target=_mock_server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{_mock_server.server_address[1]}"
+
+def test_retries_on_429():
+    print("🧪 Testing jittered retries on 429...")
+    base_url = mock_server_url()
+    upstream = Upstream("mock-retry", rate=100, burst=10, max_retries=3, base_delay=0.01, max_delay=0.05)
+    response = upstream.request("GET", f"{base_url}/flaky")
+    stats = upstream.stats()
+    ok = response.status_code == 200 and stats["retries"] == 2 and stats["successes"] == 1
+    print(f"{'✅' if ok else '❌'} status {response.status_code}, {stats}")
+    return ok
+
+def test_circuit_breaker():
+    print("🧪 Testing circuit breaker...")
+    base_url = mock_server_url()
+    upstream = Upstream("mock-down", rate=100, burst=10, max_retries=0, failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        try:
+            upstream.request("GET", f"{base_url}/down")
+        except RetryableStatusError:
+            pass
+    try:
+        upstream.request("GET", f"{base_url}/down")
+        ok = False
+    except CircuitOpenError:
+        ok = upstream.stats()["rejected"] == 1 and upstream.stats()["circuit"] == "open"
+    print(f"{'✅' if ok else '❌'} breaker opened after repeated 503s: {upstream.stats()}")
+    return ok
+
+def test_deadline_bounds_timeout():
+    print("🧪 Testing that the request budget bounds the call timeout...")
+    base_url = mock_server_url()
+    upstream = Upstream("mock-slow", rate=100, burst=10, max_retries=0, timeout=30)
+    token = request_deadline.set(time.monotonic() + 0.2)
+    started = time.monotonic()
+    try:
+        upstream.request("GET", f"{base_url}/slow")
+        ok = False
+    except Exception as e:
+        elapsed = time.monotonic() - started
+        ok = elapsed < 0.9
+        print(f"   raised {type(e).__name__} after {elapsed:.2f}s")
+    finally:
+        request_deadline.reset(token)
+    print(f"{'✅' if ok else '❌'} slow call cut short by the deadline")
+    return ok
+
+def test_token_bucket():
+    print("🧪 Testing token bucket rate limiting...")
+    bucket = TokenBucket(rate=20, burst=1)
+    started = time.monotonic()
+    waits = [bucket.acquire() for _ in range(5)]
+    elapsed = time.monotonic() - started
+    ok = 0.15 <= elapsed < 0.5 and waits[0] == 0
+
+    token = request_deadline.set(time.monotonic() + 0.01)
+    try:
+        slow_bucket = TokenBucket(rate=0.1, burst=1)
+        slow_bucket.acquire()
+        slow_bucket.acquire()
+        ok = False
+    except DeadlineExceeded:
+        pass
+    finally:
+        request_deadline.reset(token)
+    print(f"{'✅' if ok else '❌'} 5 tokens at 20/s took {elapsed:.2f}s; over-budget wait rejected")
+    return ok
+
+def half_open_upstream(name, **kwargs):
+    """An upstream whose breaker has tripped and just reached its half-open probe"""
+    upstream = Upstream(name, max_retries=0, failure_threshold=1, reset_timeout=0.05, **kwargs)
+    upstream.breaker.record_failure()
+    time.sleep(0.06)
+    return upstream
+
+def test_cancelled_probe_frees_slot():
+    print("🧪 Testing a cancelled half-open probe gives its slot back...")
+    upstream = half_open_upstream("mock-cancelled-probe", rate=100, burst=10)
+
+    async def probe_then_cancel():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(10)
+        task = asyncio.create_task(upstream.acall(hang))
+        await started.wait()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(probe_then_cancel())
+    state = upstream.stats()["circuit"]
+    ok = state == "half_open" and upstream.call(lambda: "ok") == "ok" and upstream.stats()["circuit"] == "closed"
+    print(f"{'✅' if ok else '❌'} breaker {state} after the cancelled probe, next call closed it")
+    return ok
+
+def test_probe_past_deadline_frees_slot():
+    print("🧪 Testing a probe that cannot get a token in time leaves the breaker untouched...")
+    upstream = half_open_upstream("mock-deadline-probe", rate=0.1, burst=1)
+    upstream.bucket.acquire()  # the only token is taken, the next one is 10s away
+    token = request_deadline.set(time.monotonic() + 0.05)
+    try:
+        upstream.call(lambda: "ok")
+        raised = None
+    except Exception as e:
+        raised = type(e).__name__
+    finally:
+        request_deadline.reset(token)
+    probing = upstream.breaker.probing
+    ok = raised == "DeadlineExceeded" and not probing and upstream.stats()["circuit"] == "half_open"
+    print(f"{'✅' if ok else '❌'} raised {raised}, probe slot held: {probing}")
+    return ok
+
+def main():
+    print("🚀 Testing outbound policy layer...")
+    print("=" * 50)
+
+    tests = [test_retries_on_429, test_circuit_breaker, test_deadline_bounds_timeout, test_token_bucket,
+             test_cancelled_probe_frees_slot, test_probe_past_deadline_frees_slot]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Outbound Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
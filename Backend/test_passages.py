@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script to verify full-text chunking and passage ingestion
+"""
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from passages import PassageIndexer
+
+class InMemoryCollection:
+    """Just enough of a pymongo collection for ingestion"""
+    def __init__(self):
+        self.documents = []
+        self.insert_calls = 0
+
+    def delete_many(self, query):
+        self.documents = [doc for doc in self.documents if doc["paper_id"] != query["paper_id"]]
+
+    def insert_many(self, documents, ordered=True):
+        self.insert_calls += 1
+        self.documents.extend(dict(doc) for doc in documents)
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return super().embed_documents(texts)
+
+PAPER_TEXT = "\n\n".join(
+    f"Section {i}. " + " ".join(f"sentence {i}-{j} about transformer attention." for j in range(30))
+    for i in range(6)
+)
+
+def test_split_overlap():
+    print("🧪 Testing chunk splitting...")
+    indexer = PassageIndexer(InMemoryCollection(), CountingEmbedding(size=8), chunk_size=500, chunk_overlap=100)
+    chunks = indexer.split(PAPER_TEXT)
+    ok = len(chunks) > 1 and all(len(chunk) <= 500 for chunk in chunks)
+    overlapping = any(chunks[i][-40:] in chunks[i + 1] for i in range(len(chunks) - 1))
+    print(f"{'✅' if ok and overlapping else '❌'} {len(chunks)} chunks, overlap found: {overlapping}")
+    return ok and overlapping
+
+def test_batched_ingestion():
+    print("🧪 Testing batched passage ingestion...")
+    collection = InMemoryCollection()
+    embedding = CountingEmbedding(size=8)
+    indexer = PassageIndexer(collection, embedding, chunk_size=500, chunk_overlap=100, batch_size=16)
+    papers = [{"id": f"2401.0000{i}", "title": f"Paper {i}", "text": PAPER_TEXT} for i in range(3)]
+
+    stats = indexer.ingest_papers(papers)
+    expected_batches = -(-stats.chunks // 16)
+    ok = (
+        stats.papers == 3
+        and len(collection.documents) == stats.chunks
+        and embedding.calls == expected_batches
+        and all(len(doc["embedding"]) == 8 for doc in collection.documents)
+    )
+    print(f"{'✅' if ok else '❌'} {stats.as_dict()} in {embedding.calls} embedding calls")
+
+    # Re-ingesting a paper replaces its passages instead of duplicating them
+    indexer.ingest_papers(papers[:1])
+    ok = ok and len(collection.documents) == stats.chunks
+    print(f"{'✅' if ok else '❌'} re-ingestion keeps {len(collection.documents)} passages")
+    return ok
+
+def main():
+    print("🚀 Testing passage indexing...")
+    print("=" * 50)
+
+    tests = [test_split_overlap, test_batched_ingestion]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Passage Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
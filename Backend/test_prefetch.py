@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script to verify speculative prefetch of paper details
+"""
+
+import threading
+import time
+
+from outbound import TokenBucket, Upstream, RequestCancelled
+from prefetch import Prefetcher
+
+class FakeArxiv:
+    """Batched detail fetches into a dict cache, optionally held until released"""
+
+    def __init__(self, hold=False):
+        self.cache = {}
+        self.batches = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.cancelled = []
+        if not hold:
+            self.release.set()
+        self.upstream = Upstream("fake-arxiv", rate=1000, burst=10)
+
+    def fetch_many(self, arxiv_ids):
+        self.batches.append(list(arxiv_ids))
+        self.started.set()
+        self.release.wait(2)
+
+        def fetch():
+            time.sleep(0.02)
+            return {arxiv_id: {"arxiv_id": arxiv_id} for arxiv_id in arxiv_ids}
+        try:
+            found = self.upstream.call(fetch)
+        except RequestCancelled:
+            self.cancelled.append(list(arxiv_ids))
+            raise
+        self.cache.update(found)
+        return found
+
+    def is_cached(self, arxiv_id):
+        return arxiv_id in self.cache
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_prefetch_then_hit():
+    print("🧪 Testing top results are prefetched and follow-ups hit...")
+    arxiv = FakeArxiv()
+    prefetcher = Prefetcher(arxiv.fetch_many, arxiv.is_cached, top_n=2)
+    prefetcher.start()
+    prefetcher.schedule("session-1", ["paper-1", "2101.00001", "2101.00002", "2101.00003"])
+    fetched = wait_until(lambda: prefetcher.stats()["prefetched"] == 2)
+    outcomes = [prefetcher.observe("2101.00001", arxiv.is_cached("2101.00001"), 0.001),
+                prefetcher.observe("2101.00001", True, 0.001),
+                prefetcher.observe("2101.00003", arxiv.is_cached("2101.00003"), 1.5)]
+    prefetcher.stop()
+    stats = prefetcher.stats()
+    ok = fetched and arxiv.batches == [["2101.00001", "2101.00002"]] and outcomes == ["hits", "cached", "misses"] \
+        and stats["hit_ratio"] == 0.5 and stats["saved_seconds"] == 1.5
+    print(f"{'✅' if ok else '❌'} one batch {arxiv.batches}, outcomes {outcomes}, "
+          f"hit ratio {stats['hit_ratio']}, saved {stats['saved_seconds']}s")
+    return ok
+
+def test_newer_search_supersedes_pending():
+    print("🧪 Testing a newer search replaces the session's pending batch...")
+    arxiv = FakeArxiv(hold=True)
+    prefetcher = Prefetcher(arxiv.fetch_many, arxiv.is_cached, top_n=1)
+    prefetcher.start()
+    prefetcher.schedule("busy", ["1111.0001"])
+    arxiv.started.wait(1)
+    prefetcher.schedule("session-1", ["2222.0001"])
+    prefetcher.schedule("session-1", ["3333.0001"])
+    late = prefetcher.observe("3333.0001", False, 0.5)
+    arxiv.release.set()
+    wait_until(lambda: "3333.0001" in arxiv.cache)
+    prefetcher.stop()
+    ok = arxiv.batches == [["1111.0001"], ["3333.0001"]] and late == "late" and prefetcher.stats()["cancelled"] == 1
+    print(f"{'✅' if ok else '❌'} batches {arxiv.batches}, pending follow-up counted {late}")
+    return ok
+
+def test_in_flight_cancellation():
+    print("🧪 Testing an in-flight batch is cancelled when the session moves on...")
+    arxiv = FakeArxiv(hold=True)
+    prefetcher = Prefetcher(arxiv.fetch_many, arxiv.is_cached, top_n=1)
+    prefetcher.start()
+    prefetcher.schedule("session-1", ["2101.00001"])
+    arxiv.started.wait(1)
+    prefetcher.schedule("session-1", [])
+    arxiv.release.set()
+    wait_until(lambda: prefetcher.stats()["cancelled"] == 1 and not prefetcher._in_flight)
+    prefetcher.stop()
+    stats = prefetcher.stats()
+    ok = arxiv.cancelled == [["2101.00001"]] and "2101.00001" not in arxiv.cache \
+        and stats["cancelled"] == 1 and stats["errors"] == 0
+    print(f"{'✅' if ok else '❌'} upstream call raised RequestCancelled, {stats['prefetched']} prefetched")
+    return ok
+
+def test_yields_to_foreground_rate_limit():
+    print("🧪 Testing prefetch only uses spare rate-limit tokens...")
+    arxiv = FakeArxiv()
+    bucket = TokenBucket(rate=0.5, burst=1)
+    bucket.acquire()  # a foreground call just took the only token
+    prefetcher = Prefetcher(arxiv.fetch_many, arxiv.is_cached, bucket=bucket, max_wait=0.2)
+    prefetcher.start()
+    prefetcher.schedule("session-1", ["2101.00001"])
+    dropped = wait_until(lambda: prefetcher.stats()["dropped_busy"] == 1)
+    prefetcher.stop()
+    ok = dropped and arxiv.batches == [] and bucket.available() < 1
+    print(f"{'✅' if ok else '❌'} batch dropped without taking a token")
+    return ok
+
+def main():
+    print("🚀 Testing speculative prefetch...")
+    print("=" * 50)
+
+    tests = [test_prefetch_then_hit, test_newer_search_supersedes_pending, test_in_flight_cancellation,
+             test_yields_to_foreground_rate_limit]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Prefetch Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the query log and the cache warmup replay
+"""
+
+import threading
+import time
+
+from query_log import QueryLog, Readiness, warm_caches, SEARCH, KNOWLEDGE_BASE, PAPER
+
+class RecordingCollection:
+    def __init__(self, fail=False):
+        self.documents = []
+        self.fail = fail
+
+    def insert_many(self, documents, ordered=True):
+        if self.fail:
+            raise ConnectionError("no primary")
+        self.documents.extend(documents)
+
+def test_top_queries_and_papers():
+    print("🧪 Testing in-process aggregation...")
+    log = QueryLog()
+    for _ in range(3):
+        log.record(SEARCH, "  Graph Neural Networks ", ["2101.00001", "2101.00002"])
+    log.record(KNOWLEDGE_BASE, "graph neural networks", ["2101.00002"])
+    log.record(SEARCH, "diffusion models", ["2202.00003"])
+    log.record(PAPER, paper_ids=["2202.00003"])
+
+    queries = log.top_queries(2)
+    papers = log.top_papers(2)
+    ok = queries == ["graph neural networks", "diffusion models"] and papers == ["2101.00002", "2101.00001"]
+    print(f"{'✅' if ok else '❌'} top queries {queries}, top papers {papers}")
+    return ok
+
+def test_fallback_ids_not_logged():
+    print("🧪 Testing fallback paper IDs are not logged for replay...")
+    log = QueryLog()
+    log.record(KNOWLEDGE_BASE, "diffusion models", ["paper-1", "paper-2", "704.0001", "hep-th/9901001v2", "2101.00001v3"])
+    papers = sorted(log.top_papers(10))
+    ok = papers == ["2101.00001v3", "704.0001", "hep-th/9901001v2"]
+    print(f"{'✅' if ok else '❌'} logged {papers}")
+    return ok
+
+def test_buffered_flush():
+    print("🧪 Testing buffered writes to the collection...")
+    collection = RecordingCollection()
+    log = QueryLog(collection)
+    log.record(SEARCH, "transformers", ["1706.03762"])
+    log.record(PAPER, paper_ids=["1706.03762"])
+    buffered = len(collection.documents) == 0 and log.stats()["pending"] == 2
+    written = log.flush()
+    ok = buffered and written == 2 and collection.documents[0]["query"] == "transformers" \
+        and collection.documents[1]["source"] == PAPER and log.stats()["pending"] == 0
+    print(f"{'✅' if ok else '❌'} {written} entries written on flush, none on the request path")
+
+    failing = QueryLog(RecordingCollection(fail=True))
+    failing.record(SEARCH, "transformers")
+    failed_ok = failing.flush() == 0 and failing.stats()["flush_errors"] == 1
+    print(f"{'✅' if failed_ok else '❌'} write failures are counted, not raised")
+    return ok and failed_ok
+
+def test_concurrent_replay():
+    print("🧪 Testing concurrent warmup replay...")
+    active, peak, lock = [0], [0], threading.Lock()
+    warmed = []
+
+    def warm(item):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+            warmed.append(item)
+        if item == "broken":
+            raise RuntimeError("upstream unavailable")
+
+    report = warm_caches(["a", "b", "c", "broken"], ["p1", "p2"], warm, warm, concurrency=3)
+    ok = peak[0] == 3 and len(warmed) == 6 and report["queries"]["warmed"] == 3 \
+        and report["queries"]["failed"] == 1 and report["papers"]["warmed"] == 2
+    print(f"{'✅' if ok else '❌'} {len(warmed)} items on up to {peak[0]} threads in {report['seconds']}s")
+    return ok
+
+def test_warmup_time_limit():
+    print("🧪 Testing warmup time limit...")
+    report = warm_caches(["a", "b", "c", "d"], [], lambda item: time.sleep(0.1), lambda item: None,
+                         concurrency=1, max_seconds=0.15)
+    queries = report["queries"]
+    ok = queries["warmed"] == 1 and queries["skipped"] == 2 and queries["unfinished"] == 1
+    print(f"{'✅' if ok else '❌'} {queries['warmed']} warmed, {queries['skipped']} skipped, {queries['unfinished']} unfinished")
+
+    started = time.monotonic()
+    report = warm_caches(["slow"], ["slow"], lambda item: time.sleep(1), lambda item: time.sleep(1),
+                         concurrency=2, max_seconds=0.1)
+    returned = time.monotonic() - started
+    bounded = returned < 0.5 and report["queries"]["unfinished"] == 1 and report["papers"]["unfinished"] == 1
+    print(f"{'✅' if bounded else '❌'} returned after {returned:.2f}s without waiting for slow items")
+    return ok and bounded
+
+def test_readiness():
+    print("🧪 Testing readiness state...")
+    readiness = Readiness()
+    readiness.begin()
+    warming = readiness.as_dict()["status"] == "warming"
+    readiness.finish({"seconds": 1.0})
+    ok = warming and readiness.ready and readiness.as_dict()["warmup"] == {"seconds": 1.0}
+    print(f"{'✅' if ok else '❌'} warming until the replay finishes, then ready")
+    return ok
+
+def main():
+    print("🚀 Testing query log and cache warmup...")
+    print("=" * 50)
+
+    tests = [test_top_queries_and_papers, test_fallback_ids_not_logged, test_buffered_flush, test_concurrent_replay,
+             test_warmup_time_limit, test_readiness]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Query Log Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
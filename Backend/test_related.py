@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script to verify related-paper lookups from stored embeddings
+"""
+
+import copy
+
+import numpy as np
+
+from related import RelatedPapers
+
+def fake_records():
+    """Three tight topics of three papers each; IDs stored the way the knowledge base stores them"""
+    rng = np.random.RandomState(3)
+    centers = rng.normal(size=(3, 16))
+    records = []
+    for topic, center in enumerate(centers):
+        for i in range(3):
+            records.append({
+                "id": f"{704 + topic}.000{i + 1}",
+                "title": f"Topic {topic} paper {i}",
+                "authors": "A. Author",
+                "abstract": f"Abstract {topic}.{i}",
+                "categories": "cs.LG",
+                "update_date": "2024-01-01",
+                "embedding": (center + 0.05 * rng.normal(size=16)).tolist(),
+            })
+    records.append({"id": "9999.0001", "title": "No embedding yet", "abstract": "", "categories": "cs.CL"})
+    return records
+
+def project(document, projection):
+    keep = [field for field, include in projection.items() if include == 1]
+    return {field: copy.deepcopy(document[field]) for field in keep if field in document}
+
+class KnowledgeCollection:
+    """Just enough of the knowledge collection: id lookups, find and a cosine $vectorSearch"""
+
+    def __init__(self, records):
+        self.records = records
+        self.aggregations = 0
+
+    def find_one(self, query, projection):
+        ids = query["id"]["$in"]
+        return next((project(record, projection) for record in self.records if record["id"] in ids), None)
+
+    def find(self, query, projection):
+        return [project(record, projection) for record in self.records if "embedding" in record]
+
+    def aggregate(self, pipeline):
+        self.aggregations += 1
+        search, projection = pipeline[0]["$vectorSearch"], pipeline[1]["$project"]
+        query = np.asarray(search["queryVector"])
+        scored = []
+        for record in self.records:
+            if "embedding" not in record:
+                continue
+            vector = np.asarray(record["embedding"])
+            score = float(vector @ query / (np.linalg.norm(vector) * np.linalg.norm(query)))
+            scored.append({**project(record, projection), "score": score})
+        scored.sort(key=lambda hit: -hit["score"])
+        return scored[:search["limit"]]
+
+class RelatedCollection:
+    """Neighbour table keyed by paper ID, written with bulk ReplaceOne"""
+
+    def __init__(self):
+        self.documents = {}
+
+    def find_one(self, query):
+        return next((copy.deepcopy(self.documents[i]) for i in query["_id"]["$in"] if i in self.documents), None)
+
+    def bulk_write(self, writes, ordered=True):
+        for write in writes:
+            self.documents[write._filter["_id"]] = {"_id": write._filter["_id"], **write._doc}
+
+def test_excludes_source_paper():
+    print("🧪 Testing vector search leaves out the source paper...")
+    collection = KnowledgeCollection(fake_records())
+    related = RelatedPapers(collection)
+    results, source = related.related("0704.0001v2", k=2)
+    ids = [record["id"] for record, _ in results]
+    ok = source == "vector" and ids and "704.0001" not in ids and set(ids) == {"704.0002", "704.0003"} \
+        and all("embedding" not in record for record, _ in results) and related.stats()["vector_searches"] == 1
+    print(f"{'✅' if ok else '❌'} related to 0704.0001v2: {ids}")
+    return ok
+
+def test_unknown_or_missing_embedding():
+    print("🧪 Testing unknown papers and papers without an embedding...")
+    collection = KnowledgeCollection(fake_records())
+    related = RelatedPapers(collection, RelatedCollection())
+    unknown, no_embedding = related.related("1234.5678"), related.related("9999.0001")
+    ok = unknown is None and no_embedding is None and collection.aggregations == 0
+    print(f"{'✅' if ok else '❌'} both answered None without a vector search")
+    return ok
+
+def test_refresh_builds_table():
+    print("🧪 Testing refresh builds the neighbour table...")
+    collection = KnowledgeCollection(fake_records())
+    table = RelatedCollection()
+    related = RelatedPapers(collection, table)
+    report = related.refresh(k=2)
+    entry = table.documents["705.0002"]
+    neighbour_ids = [neighbour["id"] for neighbour in entry["neighbours"]]
+    results, source = related.related("0705.0002", k=2)
+    ok = report["papers"] == 9 and len(table.documents) == 9 and "9999.0001" not in table.documents \
+        and set(neighbour_ids) == {"705.0001", "705.0003"} and "updated_at" in entry \
+        and all("embedding" not in neighbour for neighbour in entry["neighbours"]) \
+        and source == "precomputed" and [record["id"] for record, _ in results] == neighbour_ids \
+        and collection.aggregations == 0
+    print(f"{'✅' if ok else '❌'} {report['papers']} papers refreshed, 705.0002 -> {neighbour_ids} via {source}")
+    return ok
+
+def test_partial_refresh_and_short_table():
+    print("🧪 Testing a partial refresh and falling back when the table is too short...")
+    collection = KnowledgeCollection(fake_records())
+    table = RelatedCollection()
+    related = RelatedPapers(collection, table)
+    report = related.refresh(["704.0001", "1234.5678"], k=2)
+    _, source = related.related("704.0001", k=5)
+    ok = report["papers"] == 1 and list(table.documents) == ["704.0001"] and source == "vector"
+    print(f"{'✅' if ok else '❌'} refreshed {list(table.documents)}, k=5 served by {source}")
+    return ok
+
+def main():
+    print("🚀 Testing related papers...")
+    print("=" * 50)
+
+    tests = [test_excludes_source_paper, test_unknown_or_missing_embedding, test_refresh_builds_table,
+             test_partial_refresh_and_short_table]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Related Papers Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the versioned search result cache
+"""
+
+import tempfile
+
+from result_cache import VersionedResultCache, IndexVersion, FileResultTier, LatencyHistogram, cache_key
+
+PAPERS = [{"id": "1707.04849", "title": "Minimax Rates for Adaptive Estimation"}]
+
+def counting_search():
+    calls = []
+    def search():
+        calls.append(1)
+        return list(PAPERS)
+    return search, calls
+
+def test_normalized_keys():
+    print("🧪 Testing cache key normalization...")
+    same = cache_key("search", "  Neural   Networks ", 5, None, 1) == cache_key("search", "neural networks", 5, {}, 1)
+    different_k = cache_key("search", "neural networks", 5, None, 1) != cache_key("search", "neural networks", 10, None, 1)
+    different_version = cache_key("search", "neural networks", 5, None, 1) != cache_key("search", "neural networks", 5, None, 2)
+    different_filters = cache_key("search", "q", 5, {"year": 2024}, 1) != cache_key("search", "q", 5, None, 1)
+    ok = same and different_k and different_version and different_filters
+    print(f"{'✅' if ok else '❌'} whitespace/case normalized, k, filters and version distinguish keys")
+    return ok
+
+def test_memory_tier_and_version_bump():
+    print("🧪 Testing in-process tier and version invalidation...")
+    version = IndexVersion()
+    cache = VersionedResultCache(version)
+    search, calls = counting_search()
+
+    _, first = cache.get_or_compute("search", "Neural networks", 5, search)
+    _, second = cache.get_or_compute("search", "neural  networks", 5, search)
+    version.bump()
+    _, third = cache.get_or_compute("search", "neural networks", 5, search)
+
+    ok = (first, second, third) == ("compute", "memory", "compute") and len(calls) == 2
+    print(f"{'✅' if ok else '❌'} tiers {first}, {second}, {third} with {len(calls)} searches")
+    stats = cache.stats()
+    rate_ok = stats["hit_rate"] == round(1 / 3, 4) and stats["latency"]["compute"]["count"] == 2
+    print(f"{'✅' if rate_ok else '❌'} hit rate {stats['hit_rate']}")
+    return ok and rate_ok
+
+def test_shared_file_tier():
+    print("🧪 Testing shared file tier across workers...")
+    with tempfile.TemporaryDirectory() as directory:
+        version = IndexVersion()
+        worker_a = VersionedResultCache(version, shared=FileResultTier(directory))
+        worker_b = VersionedResultCache(version, shared=FileResultTier(directory))
+        search, calls = counting_search()
+
+        worker_a.get_or_compute("search", "transformers", 5, search)
+        value, tier = worker_b.get_or_compute("search", "transformers", 5, search)
+        ok = tier == "shared" and value == PAPERS and len(calls) == 1
+        print(f"{'✅' if ok else '❌'} second worker served from {tier}")
+        return ok
+
+def test_latency_histogram():
+    print("🧪 Testing latency histogram...")
+    histogram = LatencyHistogram()
+    for seconds in [0.0003, 0.0004, 0.004, 0.2]:
+        histogram.observe(seconds)
+    ok = histogram.percentile(0.5) == 0.5 and histogram.percentile(0.95) == 250
+    print(f"{'✅' if ok else '❌'} p50 {histogram.percentile(0.5)}ms, p95 {histogram.percentile(0.95)}ms")
+    return ok
+
+def main():
+    print("🚀 Testing versioned result cache...")
+    print("=" * 50)
+
+    tests = [test_normalized_keys, test_memory_tier_and_version_bump, test_shared_file_tier, test_latency_histogram]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Result Cache Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the single-document session history backend
+"""
+
+import copy
+
+from langchain.memory import ConversationBufferMemory
+from langchain_core.messages import AIMessage, HumanMessage
+
+from session_history import SessionHistoryStore
+
+class SessionCollection:
+    """Just enough of a pymongo collection for single-document histories, counting round-trips"""
+    name = "session_history"
+
+    def __init__(self):
+        self.documents = {}
+        self.calls = {"find_one": 0, "update_one": 0}
+
+    def find_one(self, query, projection=None):
+        self.calls["find_one"] += 1
+        document = self.documents.get(query["_id"])
+        if document is None:
+            return None
+        document = copy.deepcopy(document)
+        window = (projection or {}).get("Messages")
+        if isinstance(window, dict):
+            document["Messages"] = document["Messages"][window["$slice"]:]
+        return document
+
+    def update_one(self, query, update, upsert=False):
+        self.calls["update_one"] += 1
+        document = self.documents.get(query["_id"])
+        if document is None:
+            document = {"_id": query["_id"], **update.get("$setOnInsert", {})}
+            self.documents[query["_id"]] = document
+        for field, push in update.get("$push", {}).items():
+            values = document.get(field, []) + list(push["$each"])
+            document[field] = values[push["$slice"]:]
+        for field, amount in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + amount
+        document.update(update.get("$set", {}))
+
+    def delete_one(self, query):
+        self.documents.pop(query["_id"], None)
+
+class FakeClient:
+    def __init__(self):
+        self.collection = SessionCollection()
+
+    def get_database(self, name):
+        return self
+
+    def get_collection(self, name):
+        return self.collection
+
+def store(**kwargs):
+    client = FakeClient()
+    return SessionHistoryStore(client, "agent_demo", **kwargs), client.collection
+
+def test_one_update_per_turn():
+    print("🧪 Testing a turn is appended with one update...")
+    history_store, collection = store()
+    memory = ConversationBufferMemory(memory_key="chat_history", chat_memory=history_store.session("s1"), return_messages=True)
+    memory.save_context({"input": "Find papers on transformers"}, {"output": "Here are 5 papers"})
+    memory.save_context({"input": "Tell me about paper 2"}, {"output": "Paper 2 is about attention"})
+    document = collection.documents["s1"]
+    ok = collection.calls["update_one"] == 2 and document["Count"] == 4 and "ExpiresAt" in document \
+        and document["Messages"][2]["data"]["content"] == "Tell me about paper 2"
+    print(f"{'✅' if ok else '❌'} {collection.calls['update_one']} updates for 2 turns, {document['Count']} messages")
+    return ok
+
+def test_tail_read_and_cap():
+    print("🧪 Testing tail reads and the stored cap...")
+    history_store, collection = store(window=4, max_stored=6)
+    history = history_store.session("s1")
+    for turn in range(5):
+        history.add_messages([HumanMessage(content=f"q{turn}"), AIMessage(content=f"a{turn}")])
+    reads_before = collection.calls["find_one"]
+    messages = history.messages
+    reads = collection.calls["find_one"] - reads_before
+    contents = [message.content for message in messages]
+    archived = [message.content for message in history.archived_messages()]
+    ok = contents == ["q3", "a3", "q4", "a4"] and reads == 1 \
+        and isinstance(messages[0], HumanMessage) and archived == ["q2", "a2"] \
+        and collection.documents["s1"]["Count"] == 10
+    print(f"{'✅' if ok else '❌'} tail {contents}, older stored {archived}, oldest trimmed")
+    return ok
+
+def test_odd_limits_keep_turns_whole():
+    print("🧪 Testing odd window and cap settings still keep whole turns...")
+    history_store, collection = store(window=3, max_stored=5)
+    history = history_store.session("s1")
+    for turn in range(4):
+        history.add_messages([HumanMessage(content=f"q{turn}"), AIMessage(content=f"a{turn}")])
+    contents = [message.content for message in history.messages]
+    stored = [message["data"]["content"] for message in collection.documents["s1"]["Messages"]]
+    ok = contents == ["q3", "a3"] and stored == ["q2", "a2", "q3", "a3"] \
+        and isinstance(history.messages[0], HumanMessage)
+    print(f"{'✅' if ok else '❌'} tail {contents}, stored {stored}")
+    return ok
+
+def test_missing_session_and_clear():
+    print("🧪 Testing empty and cleared sessions...")
+    history_store, collection = store()
+    history = history_store.session("s1")
+    empty = history.messages == [] and history.archived_messages() == []
+    history.add_messages([HumanMessage(content="hello")])
+    history.clear()
+    ok = empty and history.messages == [] and "s1" not in collection.documents
+    print(f"{'✅' if ok else '❌'} missing and cleared sessions read as empty")
+    return ok
+
+def test_stats():
+    print("🧪 Testing latency stats...")
+    history_store, _ = store()
+    history = history_store.session("s1")
+    history.add_messages([HumanMessage(content="hello"), AIMessage(content="hi")])
+    history.messages
+    stats = history_store.stats()
+    ok = stats["reads"] == 1 and stats["writes"] == 1 and "write_p95_ms" in stats
+    print(f"{'✅' if ok else '❌'} {stats['reads']} read, {stats['writes']} write recorded")
+    return ok
+
+def main():
+    print("🚀 Testing session document history...")
+    print("=" * 50)
+
+    tests = [test_one_update_per_turn, test_tail_read_and_cap, test_odd_limits_keep_turns_whole,
+             test_missing_session_and_clear, test_stats]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Session History Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
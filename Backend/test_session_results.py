@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script to verify follow-up references resolve against the session result store
+"""
+
+from session_results import SessionResultStore, parse_ordinal
+
+PAPERS = [
+    {"arxiv_id": "1707.04849v1", "title": "Minimax Rates for Adaptive Estimation"},
+    {"arxiv_id": "1909.03550v1", "title": "Adaptive thresholds for neural networks with synaptic noise"},
+    {"arxiv_id": "2307.03456", "title": "Prompt Injection Attacks on Language Models"},
+]
+
+SHORT_TITLES = [
+    {"arxiv_id": "1810.04805", "title": "BERT"},
+    {"arxiv_id": "2101.00001", "title": "Graph Neural Network"},
+]
+
+def test_parse_ordinal():
+    print("🧪 Testing ordinal parsing...")
+    test_cases = [
+        ("Get details about paper 1", 1),
+        ("Summarize paper 2", 2),
+        ("Tell me more about the third paper", 3),
+        ("What is the 2nd result about", 2),
+        ("and #3?", 3),
+        ("the last one please", -1),
+        ("Find papers on second-order optimization", None),
+    ]
+
+    passed = 0
+    for text, expected in test_cases:
+        result = parse_ordinal(text)
+        if result == expected:
+            print(f"✅ '{text}' → {result}")
+            passed += 1
+        else:
+            print(f"❌ '{text}' → {result} (expected {expected})")
+    return passed == len(test_cases)
+
+def test_resolve_references():
+    print("🧪 Testing reference resolution...")
+    store = SessionResultStore()
+    store.save("session-a", "knowledge_base", "neural networks", PAPERS)
+
+    test_cases = [
+        ("Summarize paper 2", "1909.03550v1"),
+        ("Tell me more about the last paper", "2307.03456"),
+        ("I'd like a summary of the paper: Adaptive thresholds for neural networks with synaptic noise", "1909.03550v1"),
+        ("Summarize paper 9", None),
+    ]
+
+    passed = 0
+    for text, expected in test_cases:
+        paper = store.resolve("session-a", text)
+        result = paper["arxiv_id"] if paper else None
+        if result == expected:
+            print(f"✅ '{text}' → {result}")
+            passed += 1
+        else:
+            print(f"❌ '{text}' → {result} (expected {expected})")
+
+    unknown = store.resolve("session-b", "Summarize paper 2") is None
+    print(f"{'✅' if unknown else '❌'} unknown session resolves to nothing")
+    return passed == len(test_cases) and unknown
+
+def test_title_matches_whole_words():
+    print("🧪 Testing titles only match as whole words and when long enough...")
+    store = SessionResultStore()
+    store.save("s1", "knowledge_base", "graph neural networks", SHORT_TITLES)
+
+    test_cases = [
+        ("How does BERT compare to GPT for classification?", None),
+        ("Find graph neural networks for molecules", None),
+        ("Summarize the paper Graph   Neural Network", "2101.00001"),
+        ("Explain the 2nd result", "2101.00001"),
+    ]
+
+    passed = 0
+    for text, expected in test_cases:
+        paper = store.resolve("s1", text)
+        result = paper["arxiv_id"] if paper else None
+        if result == expected:
+            print(f"✅ '{text}' → {result}")
+            passed += 1
+        else:
+            print(f"❌ '{text}' → {result} (expected {expected})")
+    return passed == len(test_cases)
+
+def test_lru_eviction():
+    print("🧪 Testing LRU eviction...")
+    store = SessionResultStore(capacity=2)
+    for session_id in ["s1", "s2", "s3"]:
+        store.save(session_id, "knowledge_base", "query", PAPERS)
+    ok = store.get("s1") is None and store.get("s3") is not None
+    print(f"{'✅' if ok else '❌'} oldest session evicted without a backing collection")
+    return ok
+
+def test_empty_results_keep_previous():
+    print("🧪 Testing an empty search keeps the previous result list...")
+    store = SessionResultStore()
+    store.save("s1", "knowledge_base", "neural networks", PAPERS)
+    store.save("s1", "get_metadata_information_from_arxiv", "no such topic", [])
+    reference = store.resolve("s1", "Summarize the second one")
+    ok = store.get("s1")["query"] == "neural networks" and reference is not None \
+        and reference["arxiv_id"] == "1909.03550v1"
+    print(f"{'✅' if ok else '❌'} 'the second one' still resolves after a failed search")
+    return ok
+
+def main():
+    print("🚀 Testing session result store...")
+    print("=" * 50)
+
+    tests = [test_parse_ordinal, test_resolve_references, test_title_matches_whole_words, test_lru_eviction, test_empty_results_keep_previous]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Session Result Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script to verify tool outputs are compacted within their token budgets
+"""
+
+from tool_compaction import ToolOutputCompactor, count_tokens, start_request
+
+ABSTRACT = ("We study adaptive estimation of a regression function under minimax risk "
+            "and show that the proposed procedure attains optimal rates. ") * 12
+
+PAPERS = [
+    {"arxiv_id": f"2301.0{i:04d}", "title": f"Paper number {i} on adaptive estimation",
+     "authors": "A. Author et al.", "published": "2023-01-01", "categories": ["math.ST", "stat.ML"],
+     "summary": ABSTRACT}
+    for i in range(10)
+]
+
+def verbose_rendering() -> str:
+    return str([{**paper, "pdf_url": f"http://arxiv.org/pdf/{paper['arxiv_id']}"} for paper in PAPERS])
+
+def test_records_fit_budget():
+    print("🧪 Testing record compaction against the tool budget...")
+    compactor = ToolOutputCompactor(budgets={"search": 400})
+    output = compactor.compact_records(
+        "search", "10 papers", ["arxiv_id", "title", "authors"], PAPERS, "summary",
+        raw_text=verbose_rendering(), session_id="s1",
+    )
+    tokens = count_tokens(output)
+    lines = output.splitlines()
+    ok = tokens <= 400 and len(lines) == 11 and all(line.startswith(f"R1.{i}|") for i, line in enumerate(lines[1:], 1))
+    print(f"{'✅' if ok else '❌'} {tokens} tokens, {len(lines) - 1} records with handles")
+    return ok
+
+def test_handles_expand_per_session():
+    print("🧪 Testing handle expansion...")
+    compactor = ToolOutputCompactor(budgets={"search": 300})
+    compactor.compact_records("search", "papers", ["arxiv_id"], PAPERS[:2], "summary", raw_text="", session_id="s1")
+    full = compactor.expand("s1", "r1.2")
+    ok = full is not None and ABSTRACT.strip() in full and PAPERS[1]["arxiv_id"] in full
+    isolated = compactor.expand("s2", "R1.2") is None
+    print(f"{'✅' if ok else '❌'} handle returns the full record")
+    print(f"{'✅' if isolated else '❌'} handles are scoped to their session")
+    return ok and isolated
+
+def test_text_truncation_and_usage():
+    print("🧪 Testing free text compaction and token accounting...")
+    compactor = ToolOutputCompactor(budgets={"detail": 50})
+    usage = start_request()
+    short = compactor.compact_text("detail", "Title: A short record", session_id="s1")
+    long = compactor.compact_text("detail", ABSTRACT, raw_text="**Padded:** " + ABSTRACT, session_id="s1")
+    ok = short == "Title: A short record" and "expand_tool_result" in long and count_tokens(long) < 80
+    saved = usage["raw_tokens"] - usage["compact_tokens"]
+    accounted = usage["calls"] == 2 and saved > 0 and compactor.stats()["tools"]["detail"]["saved_tokens"] == saved
+    print(f"{'✅' if ok else '❌'} short text kept, long text cut with a handle")
+    print(f"{'✅' if accounted else '❌'} {saved} tokens saved over {usage['calls']} calls")
+    return ok and accounted
+
+def main():
+    print("🚀 Testing tool output compaction...")
+    print("=" * 50)
+
+    tests = [test_records_fit_budget, test_handles_expand_per_session, test_text_truncation_and_usage]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Tool Compaction Test Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -48,9 +48,10 @@ def test_get_metadata_from_arxiv():
     print("🧪 Testing get_metadata_information_from_arxiv tool...")
     try:
         result = get_metadata_information_from_arxiv("machine learning")
-        print(f"✅ get_metadata_information_from_arxiv result: {len(result)} papers found")
-        if result:
-            print(f"   First paper: {result[0]['title'][:50]}...")
+        lines = result.splitlines()
+        print(f"✅ get_metadata_information_from_arxiv result: {len(lines) - 1} papers found")
+        if len(lines) > 1:
+            print(f"   First paper: {lines[1][:80]}...")
         return True
     except Exception as e:
         print(f"❌ get_metadata_information_from_arxiv failed: {e}")
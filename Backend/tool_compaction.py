@@ -0,0 +1,212 @@
+"""
+Token-budgeted compaction of tool outputs before they reach the LLM.
+
+Tool results are appended to the agent scratchpad and re-sent on every
+following agent step, so each tool gets a token budget. Records are encoded
+as one pipe-separated line each, with long text fields trimmed to share what
+is left of the budget. Every record gets a short handle (e.g. `R12.3`) whose
+full text the agent can fetch on demand, instead of always carrying it.
+"""
+
+import itertools
+import math
+import re
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import tiktoken
+
+# The Fireworks model has its own tokenizer; cl100k is close enough for budgeting
+ENCODING_NAME = "cl100k_base"
+DEFAULT_TOKEN_BUDGET = 500
+TOOL_TOKEN_BUDGETS = {
+    "knowledge_base": 400,
+    "get_metadata_information_from_arxiv": 700,
+    "get_information_from_arxiv": 650,
+    "knowledge_base_passages": 700,
+}
+EXPAND_TOKEN_BUDGET = 1500
+# Used when the tiktoken vocabulary cannot be loaded, e.g. on hosts without outbound access
+CHARS_PER_TOKEN = 4
+HANDLE_CAPACITY = 4096
+
+# Per-request token accounting, installed by the chat endpoint
+tool_token_usage: ContextVar[Optional[dict]] = ContextVar("tool_token_usage", default=None)
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """The tiktoken encoding, or None when its vocabulary cannot be downloaded"""
+    try:
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        print(f"⚠️  Could not load tiktoken encoding {ENCODING_NAME}, estimating tokens from length: {str(e)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """Cut `text` to at most `max_tokens` tokens; returns (text, truncated)"""
+    encoding = get_encoding()
+    if encoding is None:
+        if len(text) <= max_tokens * CHARS_PER_TOKEN:
+            return text, False
+        cut = text[:max(0, max_tokens - 1) * CHARS_PER_TOKEN]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text, False
+        cut = encoding.decode(tokens[:max(0, max_tokens - 1)])
+    if max_tokens <= 0:
+        return "", True
+    return cut.rstrip() + "…", True
+
+
+def start_request() -> dict:
+    """Install a fresh token counter for the current request and return it"""
+    usage = {"raw_tokens": 0, "compact_tokens": 0, "calls": 0}
+    tool_token_usage.set(usage)
+    return usage
+
+
+def short_authors(authors) -> str:
+    if isinstance(authors, str):
+        authors = [author.strip() for author in authors.split(",") if author.strip()]
+    if not authors:
+        return ""
+    return authors[0] if len(authors) == 1 else f"{authors[0]} et al."
+
+
+def clean_field(value) -> str:
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(item) for item in value)
+    return " ".join(str(value or "").split()).replace("|", "/")
+
+
+RECORDS_HEADER = re.compile(r"^(?P<title>.*?) \[fields: handle\|(?P<fields>[^;\]]+);[^\]]*\]$")
+TRUNCATION_NOTE = re.compile(r"\s*\[truncated; call expand_tool_result\([^)]*\) for the full text\]$")
+
+
+def readable_output(output: str) -> str:
+    """
+    Turn compacted tool output back into text for people: records become
+    numbered lines of labelled fields, and handles and expand hints are dropped.
+    """
+    output = TRUNCATION_NOTE.sub("", output.strip())
+    lines = output.split("\n")
+    header = RECORDS_HEADER.match(lines[0])
+    if not header:
+        return output
+    fields = header.group("fields").split("|")
+    rendered = [header.group("title")]
+    for number, line in enumerate(lines[1:], 1):
+        values = line.split("|", len(fields))[1:]
+        labelled = [f"{field}: {value}" for field, value in zip(fields, values) if value]
+        rendered.append(f"{number}. " + "\n   ".join(labelled))
+    return "\n".join(rendered)
+
+
+class ToolOutputCompactor:
+    """Encodes tool results within per-tool budgets and keeps full texts behind handles"""
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, default_budget: int = DEFAULT_TOKEN_BUDGET,
+                 capacity: int = HANDLE_CAPACITY):
+        self.budgets = dict(TOOL_TOKEN_BUDGETS if budgets is None else budgets)
+        self.default_budget = default_budget
+        self.capacity = capacity
+        self._handles: "OrderedDict[Tuple[Optional[str], str], str]" = OrderedDict()
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.totals: Dict[str, Dict[str, int]] = {}
+
+    def budget(self, tool_name: str) -> int:
+        return self.budgets.get(tool_name, self.default_budget)
+
+    def _store(self, session_id: Optional[str], handle: str, text: str) -> None:
+        with self._lock:
+            self._handles[(session_id, handle)] = text
+            self._handles.move_to_end((session_id, handle))
+            while len(self._handles) > self.capacity:
+                self._handles.popitem(last=False)
+
+    def expand(self, session_id: Optional[str], handle: str, max_tokens: int = EXPAND_TOKEN_BUDGET) -> Optional[str]:
+        """Full text behind a handle, or None when it is unknown or evicted"""
+        with self._lock:
+            text = self._handles.get((session_id, handle.strip().upper()))
+        return None if text is None else truncate_to_tokens(text, max_tokens)[0]
+
+    def record(self, tool_name: str, raw_tokens: int, compact_tokens: int) -> None:
+        with self._lock:
+            totals = self.totals.setdefault(tool_name, {"calls": 0, "raw_tokens": 0, "compact_tokens": 0})
+            totals["calls"] += 1
+            totals["raw_tokens"] += raw_tokens
+            totals["compact_tokens"] += compact_tokens
+        usage = tool_token_usage.get()
+        if usage is not None:
+            usage["calls"] += 1
+            usage["raw_tokens"] += raw_tokens
+            usage["compact_tokens"] += compact_tokens
+
+    def compact_records(
+        self,
+        tool_name: str,
+        header: str,
+        fields: List[str],
+        records: List[dict],
+        text_field: str,
+        raw_text: str,
+        session_id: Optional[str] = None,
+    ) -> str:
+        """
+        Encode `records` as one line each: a handle, the short `fields` and the
+        long `text_field` trimmed so the whole output fits the tool's budget.
+        `raw_text` is the verbose rendering the tool used to return, counted
+        for the savings report.
+        """
+        call = next(self._counter)
+        lines = [f"{header} [fields: handle|{'|'.join(fields)}|{text_field}; "
+                 f"call expand_tool_result(handle) for the full text]"]
+        prefixes = []
+        for i, record in enumerate(records, 1):
+            handle = f"R{call}.{i}"
+            full = "\n".join(f"{field}: {clean_field(record.get(field))}" for field in fields + [text_field])
+            self._store(session_id, handle, full)
+            prefixes.append("|".join([handle] + [clean_field(record.get(field)) for field in fields]))
+
+        fixed = count_tokens("\n".join(lines + prefixes)) + 2 * len(records)
+        share = (self.budget(tool_name) - fixed) // max(1, len(records))
+        for prefix, record in zip(prefixes, records):
+            text, _ = truncate_to_tokens(clean_field(record.get(text_field)), share)
+            lines.append(f"{prefix}|{text}")
+
+        output = "\n".join(lines)
+        self.record(tool_name, count_tokens(raw_text), count_tokens(output))
+        return output
+
+    def compact_text(self, tool_name: str, text: str, raw_text: Optional[str] = None,
+                     session_id: Optional[str] = None) -> str:
+        """Trim free text to the tool's budget, keeping the full text behind a handle"""
+        raw_text = text if raw_text is None else raw_text
+        compact, truncated = truncate_to_tokens(text, self.budget(tool_name))
+        if truncated:
+            handle = f"R{next(self._counter)}.1"
+            self._store(session_id, handle, text)
+            compact += f"\n[truncated; call expand_tool_result(\"{handle}\") for the full text]"
+        self.record(tool_name, count_tokens(raw_text), count_tokens(compact))
+        return compact
+
+    def stats(self) -> dict:
+        with self._lock:
+            tools = {name: dict(totals) for name, totals in self.totals.items()}
+        for totals in tools.values():
+            totals["saved_tokens"] = totals["raw_tokens"] - totals["compact_tokens"]
+        return {"handles": len(self._handles), "tools": tools}
@@ -0,0 +1,131 @@
+"""
+In-process cosine similarity index over a dense NumPy matrix.
+
+Used as the local search backend: a batch of queries is answered with a single
+matrix multiply instead of one vector search round-trip per query.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorIndex:
+    """Cosine index supporting incremental add/remove and batched top-k search"""
+
+    def __init__(self, dimensions: int, capacity: int = INITIAL_CAPACITY):
+        self.dimensions = dimensions
+        self._matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._payloads: Dict[str, dict] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._positions
+
+    def add(self, item_id: str, vector: Sequence[float], payload: Optional[dict] = None) -> None:
+        """Insert or replace one vector"""
+        row = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(row)
+        if norm:
+            row = row / norm
+        with self._lock:
+            position = self._positions.get(item_id)
+            if position is None:
+                position = len(self._ids)
+                if position == self._matrix.shape[0]:
+                    grown = np.zeros((max(1, position) * 2, self.dimensions), dtype=np.float32)
+                    grown[:position] = self._matrix[:position]
+                    self._matrix = grown
+                self._ids.append(item_id)
+                self._positions[item_id] = position
+            self._matrix[position] = row
+            self._payloads[item_id] = payload or {}
+
+    def add_many(self, items: Iterable[Tuple[str, Sequence[float], Optional[dict]]]) -> None:
+        for item_id, vector, payload in items:
+            self.add(item_id, vector, payload)
+
+    def remove(self, item_id: str) -> bool:
+        """Delete one vector by moving the last row into its slot"""
+        with self._lock:
+            position = self._positions.pop(item_id, None)
+            if position is None:
+                return False
+            last = len(self._ids) - 1
+            if position != last:
+                moved_id = self._ids[last]
+                self._matrix[position] = self._matrix[last]
+                self._ids[position] = moved_id
+                self._positions[moved_id] = position
+            self._ids.pop()
+            self._payloads.pop(item_id, None)
+            return True
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._ids)
+
+    def get_vector(self, item_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            position = self._positions.get(item_id)
+            return None if position is None else self._matrix[position].copy()
+
+    def get_payload(self, item_id: str) -> Optional[dict]:
+        return self._payloads.get(item_id)
+
+    def search_many(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int = 5,
+        allowed: Optional[set] = None,
+        exclude: Optional[set] = None,
+    ) -> List[List[Tuple[str, float, dict]]]:
+        """
+        Return the top-k (id, score, payload) for every query with one matrix
+        multiply. `allowed` restricts and `exclude` removes candidate ids.
+        """
+        queries = normalize_rows(np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimensions))
+        with self._lock:
+            if allowed is not None:
+                # Score only the allowed rows instead of masking the whole matrix
+                ids = [item_id for item_id in allowed if item_id in self._positions]
+                rows = self._matrix[[self._positions[item_id] for item_id in ids]]
+            else:
+                ids = list(self._ids)
+                rows = self._matrix[:len(ids)]
+            count = len(ids)
+            if count == 0:
+                return [[] for _ in range(len(queries))]
+            scores = queries @ rows.T
+
+        if exclude:
+            mask = np.array([item_id not in exclude for item_id in ids])
+            scores[:, ~mask] = -np.inf
+
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([
+                (ids[i], float(scores[row, i]), self._payloads.get(ids[i], {}))
+                for i in ordered if np.isfinite(scores[row, i])
+            ])
+        return results
+
+    def search(self, query_vector: Sequence[float], k: int = 5, **kwargs) -> List[Tuple[str, float, dict]]:
+        return self.search_many([query_vector], k, **kwargs)[0]
@@ -38,14 +38,19 @@ export default function PaperDetail() {
   const fetchPaperDetails = async (arxivId: string) => {
     setIsLoading(true);
     try {
-      // Use the chat API to get paper details
-      const response = await apiService.chat({
-        message: `Use the get_information_from_arxiv tool to get detailed information about the paper with arXiv ID ${arxivId}. Please provide the full paper details including title, authors, abstract, and all available metadata.`,
-        session_id: `paper-detail-${arxivId}`
-      });
-      
-      // Parse the response to extract paper details
-      const paperData = parsePaperResponse(response.response, arxivId);
+      const response = await apiService.getPaper(arxivId);
+      const paperData: PaperDetail = {
+        title: response.title,
+        authors: response.authors,
+        abstract: response.abstract,
+        arxiv_id: response.arxiv_id,
+        published_date: response.published_date ?? undefined,
+        categories: response.categories,
+        pdf_url: response.pdf_url ?? undefined,
+        entry_url: response.entry_url ?? undefined,
+        journal_ref: response.journal_ref ?? undefined,
+        doi: response.doi ?? undefined,
+      };
       setPaper(paperData);
     } catch (error) {
       console.error("Failed to fetch paper details:", error);
@@ -87,141 +92,6 @@ export default function PaperDetail() {
     }
   };
 
-  const parsePaperResponse = (response: string, arxivId: string): PaperDetail => {
-    // Default paper data
-    const defaultPaper: PaperDetail = {
-      title: `Paper ${arxivId}`,
-      authors: [],
-      abstract: "Abstract not available",
-      arxiv_id: arxivId,
-    };
-
-    try {
-      console.log("Parsing response:", response);
-      
-      // Try structured format first (with **Title:**, **Authors:**, etc.)
-      const titleMatch = response.match(/\*\*Title:\*\* (.+?)(?:\n|$)/);
-      if (titleMatch) {
-        defaultPaper.title = titleMatch[1].trim();
-      } else {
-        // Fallback to natural language format
-        const titleMatch2 = response.match(/titled "([^"]+)"/);
-        if (titleMatch2) {
-          defaultPaper.title = titleMatch2[1].trim();
-        }
-      }
-
-      // Extract authors - try structured format first
-      const authorsMatch = response.match(/\*\*Authors:\*\* (.+?)(?:\n|$)/);
-      if (authorsMatch) {
-        defaultPaper.authors = authorsMatch[1].split(',').map(author => author.trim());
-      } else {
-        // Fallback to natural language format
-        const authorsMatch2 = response.match(/authored by ([^.]+)/);
-        if (authorsMatch2) {
-          defaultPaper.authors = authorsMatch2[1].split(',').map(author => author.trim());
-        }
-      }
-
-      // Extract abstract - try structured format first
-      const abstractMatch = response.match(/\*\*Abstract:\*\*\s*\n([\s\S]*?)(?:\*\*Additional Information:\*\*|\*\*Summary:\*\*|$)/);
-      if (abstractMatch) {
-        defaultPaper.abstract = abstractMatch[1].trim();
-      } else {
-        // Fallback to natural language format
-        const abstractMatch2 = response.match(/abstract of the paper discusses ([^.]+\.)/);
-        if (abstractMatch2) {
-          defaultPaper.abstract = abstractMatch2[1].trim();
-        } else {
-          // Try alternative pattern for abstract
-          const altAbstractMatch = response.match(/The abstract of the paper discusses ([^.]+\.)/);
-          if (altAbstractMatch) {
-            defaultPaper.abstract = altAbstractMatch[1].trim();
-          }
-        }
-      }
-
-      // Extract published date - try structured format first
-      const dateMatch = response.match(/\*\*Published:\*\* (.+?)(?:\n|$)/);
-      if (dateMatch) {
-        defaultPaper.published_date = dateMatch[1].trim();
-      } else {
-        // Fallback to natural language format
-        const dateMatch2 = response.match(/published on ([^.]+)/);
-        if (dateMatch2) {
-          defaultPaper.published_date = dateMatch2[1].trim();
-        }
-      }
-
-      // Extract categories - try structured format first
-      const categoriesMatch = response.match(/\*\*Categories:\*\* (.+?)(?:\n|$)/);
-      if (categoriesMatch) {
-        defaultPaper.categories = categoriesMatch[1].split(',').map(cat => cat.trim());
-      } else {
-        // Fallback to natural language format
-        const categoriesMatch2 = response.match(/categorized under ([^.]+)/);
-        if (categoriesMatch2) {
-          defaultPaper.categories = categoriesMatch2[1].split(',').map(cat => cat.trim());
-        }
-      }
-
-      // Extract PDF URL - try structured format first
-      const pdfMatch = response.match(/\*\*PDF URL:\*\* (.+?)(?:\n|$)/);
-      if (pdfMatch) {
-        defaultPaper.pdf_url = pdfMatch[1].trim();
-      } else {
-        // Fallback to natural language format
-        const pdfMatch2 = response.match(/PDF URL: ([^\n]+)/);
-        if (pdfMatch2) {
-          defaultPaper.pdf_url = pdfMatch2[1].trim();
-        }
-      }
-
-      // Extract entry URL - try structured format first
-      const entryMatch = response.match(/\*\*Entry URL:\*\* (.+?)(?:\n|$)/);
-      if (entryMatch) {
-        defaultPaper.entry_url = entryMatch[1].trim();
-      } else {
-        // Fallback to natural language format
-        const entryMatch2 = response.match(/Entry URL: ([^\n]+)/);
-        if (entryMatch2) {
-          defaultPaper.entry_url = entryMatch2[1].trim();
-        }
-      }
-
-      // Extract journal reference - try structured format first
-      const journalMatch = response.match(/\*\*Journal Reference:\*\* (.+?)(?:\n|$)/);
-      if (journalMatch) {
-        defaultPaper.journal_ref = journalMatch[1].trim();
-      } else {
-        // Fallback to natural language format
-        const journalMatch2 = response.match(/Journal Reference: ([^\n]+)/);
-        if (journalMatch2) {
-          defaultPaper.journal_ref = journalMatch2[1].trim();
-        }
-      }
-
-      // Extract DOI - try structured format first
-      const doiMatch = response.match(/\*\*DOI:\*\* (.+?)(?:\n|$)/);
-      if (doiMatch) {
-        defaultPaper.doi = doiMatch[1].trim();
-      } else {
-        // Fallback to natural language format
-        const doiMatch2 = response.match(/DOI: ([^\n]+)/);
-        if (doiMatch2) {
-          defaultPaper.doi = doiMatch2[1].trim();
-        }
-      }
-
-      console.log("Parsed paper data:", defaultPaper);
-
-    } catch (error) {
-      console.error("Error parsing paper response:", error);
-    }
-
-    return defaultPaper;
-  };
-
   const truncatedAbstract = paper?.abstract ? 
     (paper.abstract.length > 200 ? paper.abstract.slice(0, 200) + "..." : paper.abstract) : 
     "";
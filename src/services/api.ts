@@ -6,10 +6,13 @@ export interface ChatRequest {
 export interface ChatResponse {
   response: string;
   session_id: string;
+  partial?: boolean;
 }
 
 export interface SearchRequest {
   query: string;
+  // Relevance (1) vs. diversity (0) trade-off; omitted uses the server default
+  mmr_lambda?: number;
 }
 
 export interface SearchResponse {
@@ -17,6 +20,28 @@ export interface SearchResponse {
   total: number;
 }
 
+export interface BatchSearchRequest {
+  queries: string[];
+  k?: number;
+  union?: boolean;
+}
+
+export interface BatchSearchResult {
+  query: string;
+  papers: Paper[];
+  total: number;
+}
+
+export interface UnionPaper extends Paper {
+  score: number;
+  queries: string[];
+}
+
+export interface BatchSearchResponse {
+  results: BatchSearchResult[];
+  union?: UnionPaper[] | null;
+}
+
 export interface Paper {
   id: string;
   title: string;
@@ -27,6 +52,20 @@ export interface Paper {
   arxiv_id?: string;
 }
 
+export interface PaperDetailResponse {
+  arxiv_id: string;
+  title: string;
+  authors: string[];
+  abstract: string;
+  published_date?: string | null;
+  categories: string[];
+  pdf_url?: string | null;
+  entry_url?: string | null;
+  journal_ref?: string | null;
+  doi?: string | null;
+  source: 'knowledge' | 'cache' | 'arxiv';
+}
+
 export interface LibraryPaper {
   id: string;
   title: string;
@@ -52,6 +91,46 @@ export interface LibraryResponse {
   total: number;
 }
 
+export interface LibrarySearchRequest {
+  query?: string;
+  k?: number;
+  tags?: string[];
+  notes?: string;
+}
+
+export interface LibrarySearchPaper extends LibraryPaper {
+  score?: number | null;
+}
+
+export interface LibrarySearchResponse {
+  papers: LibrarySearchPaper[];
+  total: number;
+}
+
+export type JobKind = 'arxiv_search' | 'arxiv_paper' | 'ingest_passages';
+
+export interface JobRequest {
+  kind: JobKind;
+  params: Record<string, unknown>;
+  priority?: number;
+}
+
+export interface Job {
+  id: string;
+  kind: JobKind;
+  params: Record<string, unknown>;
+  priority: number;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress: number;
+  message?: string | null;
+  result?: unknown;
+  error?: string | null;
+  created_at: number;
+  started_at?: number | null;
+  finished_at?: number | null;
+  created?: boolean;
+}
+
 export class ApiService {
   private baseUrl = 'http://localhost:8000';
 
@@ -72,7 +151,73 @@ export class ApiService {
   }
 
   async search(request: SearchRequest): Promise<SearchResponse> {
-    const response = await fetch(`${this.baseUrl}/api/search`, {
+    // GET so the browser cache can revalidate unchanged results with If-None-Match
+    const params = new URLSearchParams({ query: request.query });
+    if (request.mmr_lambda !== undefined) {
+      params.set('mmr_lambda', String(request.mmr_lambda));
+    }
+    const response = await fetch(`${this.baseUrl}/api/search?${params}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return response.json();
+  }
+
+  async searchBatch(request: BatchSearchRequest): Promise<BatchSearchResponse> {
+    const response = await fetch(`${this.baseUrl}/api/search/batch`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(request),
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return response.json();
+  }
+
+  async getPaper(arxiv_id: string): Promise<PaperDetailResponse> {
+    const response = await fetch(`${this.baseUrl}/api/papers/${encodeURIComponent(arxiv_id)}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return response.json();
+  }
+
+  async getRelatedPapers(arxiv_id: string, k: number = 5): Promise<SearchResponse> {
+    const response = await fetch(`${this.baseUrl}/api/papers/${encodeURIComponent(arxiv_id)}/related?k=${k}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return response.json();
+  }
+
+  async createJob(request: JobRequest): Promise<Job> {
+    const response = await fetch(`${this.baseUrl}/api/jobs`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -87,6 +232,34 @@ export class ApiService {
     return response.json();
   }
 
+  async getJob(job_id: string): Promise<Job> {
+    const response = await fetch(`${this.baseUrl}/api/jobs/${encodeURIComponent(job_id)}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return response.json();
+  }
+
+  // Follows a job's progress events until it finishes; returns a function that stops listening
+  subscribeToJob(job_id: string, onUpdate: (job: Job) => void): () => void {
+    const source = new EventSource(`${this.baseUrl}/api/jobs/${encodeURIComponent(job_id)}/events`);
+    source.addEventListener('job', (event) => {
+      const job: Job = JSON.parse((event as MessageEvent).data);
+      onUpdate(job);
+      if (job.status === 'succeeded' || job.status === 'failed') {
+        source.close();
+      }
+    });
+    return () => source.close();
+  }
+
   async getLibrary(): Promise<LibraryResponse> {
     const response = await fetch(`${this.baseUrl}/api/library`, {
       method: 'GET',
@@ -102,6 +275,22 @@ export class ApiService {
     return response.json();
   }
 
+  async searchLibrary(request: LibrarySearchRequest): Promise<LibrarySearchResponse> {
+    const response = await fetch(`${this.baseUrl}/api/library/search`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(request),
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return response.json();
+  }
+
   async saveToLibrary(request: LibraryRequest): Promise<{ message: string; arxiv_id: string }> {
     const response = await fetch(`${this.baseUrl}/api/library`, {
       method: 'POST',